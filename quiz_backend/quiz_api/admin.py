@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext_lazy as _
 from .models import (
-    User, Subject, Quiz, Question, Choice, QuizAttempt, Answer
+    User, Subject, Quiz, Question, Choice, QuizAttempt, Answer, QuizStats, QuestionStats
 )
 
 
@@ -91,4 +91,18 @@ class QuizAttemptAdmin(admin.ModelAdmin):
 class AnswerAdmin(admin.ModelAdmin):
     list_display = ('attempt', 'question', 'selected_choice', 'is_correct', 'points_earned')
     search_fields = ('question__question_text',)
-    list_filter = ('is_correct',)
\ No newline at end of file
+    list_filter = ('is_correct',)
+
+
+@admin.register(QuizStats)
+class QuizStatsAdmin(admin.ModelAdmin):
+    list_display = ('quiz', 'attempt_count', 'student_count', 'pass_count', 'min_score', 'max_score', 'updated_at')
+    search_fields = ('quiz__title',)
+    readonly_fields = ('updated_at',)
+
+
+@admin.register(QuestionStats)
+class QuestionStatsAdmin(admin.ModelAdmin):
+    list_display = ('question', 'answer_count', 'correct_count', 'updated_at')
+    search_fields = ('question__question_text',)
+    readonly_fields = ('updated_at',)
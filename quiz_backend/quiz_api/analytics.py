@@ -0,0 +1,223 @@
+# quiz_api/analytics.py
+import threading
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Max, Min, Q, Sum, Value, When
+from django.db.models.functions import Least, Greatest
+from django.utils import timezone
+
+from .models import Quiz, Question, QuizAttempt, Answer, QuizStats, QuestionStats
+
+
+def difficulty_level(accuracy):
+    return 'Easy' if accuracy >= 80 else 'Medium' if accuracy >= 60 else 'Hard'
+
+
+def quiz_summary(quiz):
+    """Per-quiz attempt statistics read from the QuizStats rollup"""
+    stats = QuizStats.objects.filter(quiz=quiz).first() or QuizStats(quiz=quiz)
+    return {
+        'total_attempts': stats.attempt_count,
+        'unique_students': stats.student_count,
+        'average_score': stats.average_score,
+        'highest_score': stats.max_score or 0,
+        'lowest_score': stats.min_score or 0,
+        'average_completion_time': stats.average_completion_time,
+        'pass_rate': stats.pass_rate,
+    }
+
+
+def question_breakdown(quiz):
+    """Per-question accuracy read from the QuestionStats rollups"""
+    questions = (
+        Question.objects.filter(quiz=quiz, stats__answer_count__gt=0)
+        .order_by('order')
+        .values('id', 'question_text', 'stats__answer_count', 'stats__correct_count')
+    )
+    breakdown = []
+    for row in questions:
+        total, correct = row['stats__answer_count'], row['stats__correct_count']
+        accuracy = (correct / total) * 100
+        breakdown.append({
+            'question_id': str(row['id']),
+            'question_text': row['question_text'],
+            'total_attempts': total,
+            'correct_attempts': correct,
+            'accuracy_percentage': accuracy,
+            'average_time_spent': 0,  # Can be calculated if we track time per question
+            'difficulty_level': difficulty_level(accuracy),
+        })
+    return breakdown
+
+
+def ensure_quiz_stats(quiz_ids):
+    """
+    Create missing QuizStats rows. As a write, this also takes SQLite's write
+    lock when issued first in a transaction, so later reads cannot deadlock
+    against another writer when the transaction upgrades to writing.
+    """
+    QuizStats.objects.bulk_create([QuizStats(quiz_id=quiz_id) for quiz_id in quiz_ids], ignore_conflicts=True)
+
+
+def record_attempts(rows):
+    """
+    Fold freshly graded attempts into the rollups with F() updates; ``rows``
+    are ``(attempt, answers, first_for_student)`` tuples. Costs one UPDATE
+    per quiz however many attempts are folded in at once.
+
+    Must run inside the transaction that created the attempts, after
+    ensure_quiz_stats(), so the rollups never disagree with the attempts table.
+    """
+    now = timezone.now()
+    totals = {}
+    for attempt, answers, first_for_student in rows:
+        score = float(attempt.score)
+        quiz = totals.setdefault(attempt.quiz_id, {
+            'attempts': 0, 'students': 0, 'passes': 0, 'score_sum': 0.0, 'score_sq_sum': 0.0,
+            'min_score': score, 'max_score': score, 'timed': 0, 'time_taken_sum': 0,
+        })
+        quiz['attempts'] += 1
+        quiz['students'] += 1 if first_for_student else 0
+        quiz['passes'] += 1 if attempt.percentage >= QuizAttempt.PASS_PERCENTAGE else 0
+        quiz['score_sum'] += score
+        quiz['score_sq_sum'] += score * score
+        quiz['min_score'] = min(quiz['min_score'], score)
+        quiz['max_score'] = max(quiz['max_score'], score)
+        quiz['timed'] += 1 if attempt.time_taken > 0 else 0
+        quiz['time_taken_sum'] += max(attempt.time_taken, 0)
+
+    for quiz_id, quiz in totals.items():
+        QuizStats.objects.filter(quiz_id=quiz_id).update(
+            attempt_count=F('attempt_count') + quiz['attempts'],
+            student_count=F('student_count') + quiz['students'],
+            pass_count=F('pass_count') + quiz['passes'],
+            score_sum=F('score_sum') + quiz['score_sum'],
+            score_sq_sum=F('score_sq_sum') + quiz['score_sq_sum'],
+            min_score=Case(When(min_score__isnull=True, then=Value(quiz['min_score'])),
+                           default=Least(F('min_score'), Value(quiz['min_score'])), output_field=FloatField()),
+            max_score=Case(When(max_score__isnull=True, then=Value(quiz['max_score'])),
+                           default=Greatest(F('max_score'), Value(quiz['max_score'])), output_field=FloatField()),
+            timed_attempt_count=F('timed_attempt_count') + quiz['timed'],
+            time_taken_sum=F('time_taken_sum') + quiz['time_taken_sum'],
+            updated_at=now,
+        )
+
+    answers = [answer for _, attempt_answers, _ in rows for answer in attempt_answers]
+    answered = Counter(answer.question_id for answer in answers)
+    if not answered:
+        return
+    correct = Counter(answer.question_id for answer in answers if answer.is_correct)
+    QuestionStats.objects.bulk_create(
+        [QuestionStats(question_id=question_id) for question_id in answered],
+        ignore_conflicts=True,
+    )
+    # One UPDATE per distinct increment; a single submission only has +1s,
+    # and a plain IN filter is far cheaper to build than a CASE per question.
+    for field, counts in (('answer_count', answered), ('correct_count', correct)):
+        by_increment = defaultdict(list)
+        for question_id, n in counts.items():
+            by_increment[n].append(question_id)
+        for n, question_ids in by_increment.items():
+            QuestionStats.objects.filter(question_id__in=question_ids).update(
+                **{field: F(field) + n}, updated_at=now)
+
+
+QUIZ_ROLLUP_FIELDS = (
+    'attempt_count', 'student_count', 'pass_count', 'score_sum', 'score_sq_sum',
+    'min_score', 'max_score', 'timed_attempt_count', 'time_taken_sum',
+)
+QUESTION_ROLLUP_FIELDS = ('answer_count', 'correct_count')
+
+
+def rebuild_rollups(quiz_ids=None):
+    """
+    Recompute QuizStats and QuestionStats from the attempt and answer
+    history, updating the rows in place.
+
+    The QuizStats rows are locked before anything is read. Submissions
+    update them before their QuestionStats (see record_attempts), so one
+    that committed first is counted by the aggregates and one still running
+    adds its increments on top of the rebuilt values once this commits.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        quizzes = Quiz.objects.order_by()
+        if quiz_ids is not None:
+            quizzes = quizzes.filter(pk__in=quiz_ids)
+        ensure_quiz_stats(list(quizzes.values_list('pk', flat=True)))
+        scope = quizzes.values('pk')
+        quiz_stats = {
+            stats.quiz_id: stats
+            for stats in QuizStats.objects.select_for_update().filter(quiz_id__in=scope)
+        }
+
+        # Queued submissions are folded in by the grading workers once graded
+        attempts = QuizAttempt.objects.filter(grading_status=QuizAttempt.GRADED, quiz_id__in=scope).order_by()
+        quiz_rows = {row.pop('quiz_id'): row for row in attempts.values('quiz_id').annotate(
+            attempt_count=Count('pk'),
+            student_count=Count('user', distinct=True),
+            pass_count=Count('pk', filter=Q(percentage__gte=QuizAttempt.PASS_PERCENTAGE)),
+            score_sum=Sum('score'),
+            score_sq_sum=Sum(F('score') * F('score')),
+            min_score=Min('score'),
+            max_score=Max('score'),
+            timed_attempt_count=Count('pk', filter=Q(time_taken__gt=0)),
+            time_taken_sum=Sum('time_taken', filter=Q(time_taken__gt=0), default=0),
+        )}
+        for quiz_id, stats in quiz_stats.items():
+            row = quiz_rows.get(quiz_id) or {}
+            for field in QUIZ_ROLLUP_FIELDS:
+                setattr(stats, field, row.get(field, QuizStats._meta.get_field(field).get_default()))
+            stats.updated_at = now
+        QuizStats.objects.bulk_update(
+            quiz_stats.values(), QUIZ_ROLLUP_FIELDS + ('updated_at',), batch_size=1000)
+
+        answers = Answer.objects.filter(question__quiz_id__in=scope).order_by()
+        question_rows = {row.pop('question_id'): row for row in answers.values('question_id').annotate(
+            answer_count=Count('pk'),
+            correct_count=Count('pk', filter=Q(is_correct=True)),
+        )}
+        QuestionStats.objects.bulk_create(
+            [QuestionStats(question_id=question_id) for question_id in question_rows],
+            ignore_conflicts=True, batch_size=1000,
+        )
+        question_stats = list(QuestionStats.objects.filter(question__quiz_id__in=scope))
+        for stats in question_stats:
+            row = question_rows.get(stats.question_id) or {}
+            for field in QUESTION_ROLLUP_FIELDS:
+                setattr(stats, field, row.get(field, 0))
+            stats.updated_at = now
+        QuestionStats.objects.bulk_update(
+            question_stats, QUESTION_ROLLUP_FIELDS + ('updated_at',), batch_size=1000)
+    return len(quiz_stats), len(question_stats)
+
+
+# Quizzes that lost graded attempts in this thread, waiting for a rebuild
+_pending_rebuilds = threading.local()
+
+
+def attempt_deleted(sender, instance, **kwargs):
+    """
+    post_delete receiver for QuizAttempt; it also fires for cascades such as
+    deleting a user. Distinct students and min/max scores cannot be taken
+    back with F() updates, so the quiz is rebuilt once the delete commits.
+
+    Every delete queues a flush and the first one to run rebuilds all the
+    quizzes pending in this thread; quizzes left over by a rolled back
+    delete are simply rebuilt along with the next ones.
+    """
+    if instance.grading_status != QuizAttempt.GRADED:
+        return
+    pending = getattr(_pending_rebuilds, 'quiz_ids', None)
+    if pending is None:
+        pending = _pending_rebuilds.quiz_ids = set()
+    pending.add(instance.quiz_id)
+    transaction.on_commit(_rebuild_pending)
+
+
+def _rebuild_pending():
+    quiz_ids = getattr(_pending_rebuilds, 'quiz_ids', None)
+    if quiz_ids:
+        _pending_rebuilds.quiz_ids = set()
+        rebuild_rollups(quiz_ids)
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class QuizApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'quiz_api'
+
+    def ready(self):
+        from django.db.models.signals import post_delete
+
+        from .analytics import attempt_deleted
+
+        post_delete.connect(attempt_deleted, sender='quiz_api.QuizAttempt')
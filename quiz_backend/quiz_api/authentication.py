@@ -0,0 +1,79 @@
+# quiz_api/authentication.py
+import copy
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .documents import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# User rows of recently authenticated tokens, keyed by the token's user id
+principal_cache = LRUCache(
+    'principals',
+    getattr(settings, 'AUTH_PRINCIPAL_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'AUTH_PRINCIPAL_CACHE_SECONDS', 60),
+)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    SimpleJWT authentication that looks users up in the in-process
+    principal cache, so steady-state requests do no auth queries. Each
+    request gets its own copy of the cached row. The active and revoked
+    token checks are repeated on cache hits.
+    """
+
+    def authenticate(self, request):
+        # DRF passes its Request wrapper; remember the outcome on the HttpRequest
+        # so the middleware, the GraphQL view and DRF share one pass
+        request = getattr(request, '_request', request)
+        if not hasattr(request, '_jwt_auth'):
+            try:
+                request._jwt_auth = super().authenticate(request)
+            except AuthenticationFailed as e:
+                detail = e.detail.get('detail', e.detail) if isinstance(e.detail, dict) else e.detail
+                logger.info("JWT authentication failed: %s", detail)
+                request._jwt_auth = e
+        if isinstance(request._jwt_auth, AuthenticationFailed):
+            raise request._jwt_auth
+        return request._jwt_auth
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+        user = principal_cache.get(str(user_id))
+        if user is None:
+            user = super().get_user(validated_token)
+            principal_cache.set(str(user_id), user)
+        elif not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        elif api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return copy.copy(user)
+
+
+jwt_authentication = CachedJWTAuthentication()
+
+
+def authenticate_request(request):
+    """``(user, token)`` for the bearer token of a request, or None when it has none or it is invalid"""
+    try:
+        return jwt_authentication.authenticate(request)
+    except AuthenticationFailed:
+        return None
+
+
+def invalidate_principal(user_id):
+    """Forget a user's cached row now and again once the current transaction commits"""
+    key = str(user_id)
+    principal_cache.delete(key)
+    transaction.on_commit(lambda: principal_cache.delete(key))
@@ -0,0 +1,121 @@
+# quiz_api/autosave.py
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .batching import autosave_coalescer
+from .cache import quiz_detail
+from .models import Question, Choice, AttemptSession, SavedAnswer
+
+
+def open_session(user, quiz):
+    """The student's open session on ``quiz``, started now if there is none; starting again resumes it"""
+    session = AttemptSession.objects.filter(user=user, quiz=quiz, submitted_at__isnull=True).first()
+    if session is None:
+        session = AttemptSession.objects.create(user=user, quiz=quiz)
+    return session
+
+
+def latest_answers(session_id):
+    """The last saved answer to each question of a session, oldest first"""
+    latest = {}
+    rows = SavedAnswer.objects.filter(session_id=session_id).order_by('id').values(
+        'question_id', 'selected_choice_id', 'answer_text')
+    for row in rows:
+        latest.pop(row['question_id'], None)
+        latest[row['question_id']] = row
+    return list(latest.values())
+
+
+def time_is_up(session, now=None):
+    """
+    Whether the quiz's time limit (minutes, none when 0) has run out for a
+    session, allowing AUTOSAVE_GRACE_SECONDS for saves still in transit.
+    """
+    limit = session.quiz.time_limit
+    if not limit or limit <= 0:
+        return False
+    grace = getattr(settings, 'AUTOSAVE_GRACE_SECONDS', 30)
+    return (now or timezone.now()) > session.started_at + timedelta(minutes=limit, seconds=grace)
+
+
+def save_answer(user, session_id, question_id, choice_id=None, answer_text=''):
+    """
+    Append one answer to an open session of ``user``. The session and its
+    quiz's window and time limit are read in one query, the ids are checked
+    against the cached quizDetail tree and the row goes through the autosave
+    group commit, so a save costs one lookup plus a share of a bulk insert.
+    Raises ValueError for a closed session, a quiz that is not available,
+    time that ran out or ids outside its quiz.
+    """
+    session = AttemptSession.objects.filter(
+        pk=session_id, user=user, submitted_at__isnull=True,
+    ).select_related('quiz').only(
+        'started_at', 'quiz__is_published', 'quiz__scheduled_start', 'quiz__scheduled_end', 'quiz__time_limit',
+        'quiz__content_version',
+    ).first()
+    if session is None:
+        raise ValueError('Attempt session not found or already submitted')
+    # The same window submitQuiz enforces
+    if not session.quiz.is_available_now():
+        raise ValueError('Quiz is not available')
+    if time_is_up(session):
+        raise ValueError('Time limit exceeded')
+    quiz_id = session.quiz_id
+    question_id = Question._meta.pk.to_python(question_id)
+    choice_id = Choice._meta.pk.to_python(choice_id) if choice_id else None
+
+    question = next((q for q in quiz_detail(quiz_id, session.quiz.content_version).questions.all() if q.id == question_id), None)
+    if question is None:
+        raise ValueError('Question not found in quiz')
+    if choice_id and all(choice.id != choice_id for choice in question.choices.all()):
+        raise ValueError('Choice not found')
+    return autosave_coalescer.commit(SavedAnswer(
+        session_id=session_id,
+        question_id=question_id,
+        selected_choice_id=choice_id,
+        answer_text=answer_text or '',
+    ))
+
+
+def claim_session(user, session_id, quiz_id):
+    """
+    Close an open session for submission, or return None if it is not open
+    (e.g. already submitted by a retried request). The session comes back
+    with ``buffered_answers`` in the submitQuiz answer format and
+    ``elapsed_seconds`` since it started.
+    """
+    session = AttemptSession.objects.filter(
+        pk=session_id, user=user, quiz_id=quiz_id, submitted_at__isnull=True).first()
+    now = timezone.now()
+    if session is None or not AttemptSession.objects.filter(
+            pk=session.pk, submitted_at__isnull=True).update(submitted_at=now):
+        return None
+    session.submitted_at = now
+    session.elapsed_seconds = int((now - session.started_at).total_seconds())
+    session.buffered_answers = [
+        {
+            'questionId': str(row['question_id']),
+            'choiceId': str(row['selected_choice_id']) if row['selected_choice_id'] else None,
+            'answer_text': row['answer_text'],
+        }
+        for row in latest_answers(session.pk)
+    ]
+    return session
+
+
+def finish_session(session, attempt):
+    """
+    Link a claimed session to the attempt its submission created and drop
+    its autosave log, which the attempt's answers now supersede.
+    """
+    with transaction.atomic():
+        AttemptSession.objects.filter(pk=session.pk).update(attempt=attempt)
+        SavedAnswer.objects.filter(session_id=session.pk).delete()
+
+
+def reopen_session(session):
+    """Undo claim_session() after a failed submission so the student can retry"""
+    AttemptSession.objects.filter(pk=session.pk).update(submitted_at=None)
@@ -0,0 +1,196 @@
+# quiz_api/batching.py
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .grading import grade_submissions
+from .models import SavedAnswer
+
+logger = logging.getLogger(__name__)
+
+
+class _Pending:
+    def __init__(self, value):
+        self.value = value
+        self.error = None
+        self.enqueued = time.monotonic()
+        self.done = threading.Event()
+
+
+class _Batch:
+    def __init__(self):
+        self.items = []
+        self.full = threading.Event()
+        # Set by the leader once it has taken the items to write
+        self.taken = False
+
+
+class GroupCommit:
+    """
+    Group commit for small writes arriving concurrently.
+
+    The first write to arrive opens a batch and becomes its leader. Writes
+    arriving within the window setting join it, up to the max size setting;
+    like Postgres' commit_siblings, a leader with no other write in flight
+    skips the wait, so a quiet server adds no latency. The leader stores the
+    whole batch in one transaction through write(), and every waiting
+    request gets its own value (or error) back. If the batch transaction
+    fails, each value is retried in its own transaction so one bad write
+    cannot fail its neighbours. A follower waits at most the window plus
+    BATCH_LEASE_SECONDS for its leader.
+    """
+    window_setting = None
+    max_size_setting = None
+    default_window_ms = 20
+    default_max_size = 100
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._batch = None
+        self._in_flight = 0
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def write(self, values):
+        """Store ``values``; runs inside the batch transaction"""
+        raise NotImplementedError
+
+    def before_retry(self, value):
+        """Undo whatever a failed batch left on ``value`` before it is retried alone"""
+
+    def commit(self, value):
+        """Store ``value``, returning it once its batch has committed"""
+        window = getattr(settings, self.window_setting, self.default_window_ms) / 1000
+        max_size = getattr(settings, self.max_size_setting, self.default_max_size)
+        if window <= 0 or max_size <= 1 or connection.in_atomic_block:
+            # Inside an outer transaction the batch could not commit on its own
+            with transaction.atomic():
+                self.write([value])
+            self._record([0.0])
+            return value
+
+        item = _Pending(value)
+        with self._lock:
+            self._in_flight += 1
+            batch = self._batch
+            leader = batch is None or len(batch.items) >= max_size
+            if leader:
+                batch = self._batch = _Batch()
+            batch.items.append(item)
+            if len(batch.items) >= max_size:
+                batch.full.set()
+            alone = self._in_flight == 1
+
+        try:
+            if leader:
+                if not alone:
+                    batch.full.wait(window)
+                with self._lock:
+                    if self._batch is batch:
+                        self._batch = None
+                    batch.taken = True
+                    items = list(batch.items)
+                self._flush(items)
+            elif not item.done.wait(window + getattr(settings, 'BATCH_LEASE_SECONDS', 30)):
+                self._leader_timed_out(batch, item)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+        if item.error is not None:
+            raise item.error
+        return item.value
+
+    def _leader_timed_out(self, batch, item):
+        """Write ``item`` alone if its leader never took the batch; otherwise it may still commit, so give up"""
+        with self._lock:
+            taken = batch.taken
+            if not taken:
+                batch.items.remove(item)
+        if taken:
+            raise TimeoutError(f'{type(self).__name__} batch did not commit in time')
+        logger.warning("%s leader never took its batch; writing alone", type(self).__name__)
+        self._flush([item])
+
+    def _flush(self, items):
+        started = time.monotonic()
+        try:
+            with transaction.atomic():
+                self.write([item.value for item in items])
+        except Exception:
+            logger.exception("%s batch of %d failed; retrying one by one", type(self).__name__, len(items))
+            for item in items:
+                self.before_retry(item.value)
+                try:
+                    with transaction.atomic():
+                        self.write([item.value])
+                except Exception as e:
+                    item.error = e
+        finally:
+            self._record([started - item.enqueued for item in items])
+            for item in items:
+                item.done.set()
+
+    def _record(self, waits):
+        with self._stats_lock:
+            self._batches += 1
+            self._writes += len(waits)
+            self._max_batch_size = max(self._max_batch_size, len(waits))
+            self._wait_sum += sum(waits)
+            self._max_wait = max([self._max_wait, *waits])
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._batches = 0
+            self._writes = 0
+            self._max_batch_size = 0
+            self._wait_sum = 0.0
+            self._max_wait = 0.0
+
+    def stats(self):
+        """Batch-size and wait-time metrics since the last reset"""
+        with self._stats_lock:
+            return {
+                'batches': self._batches,
+                'writes': self._writes,
+                'average_batch_size': self._writes / self._batches if self._batches else 0,
+                'max_batch_size': self._max_batch_size,
+                'average_wait_ms': self._wait_sum / self._writes * 1000 if self._writes else 0,
+                'max_wait_ms': self._max_wait * 1000,
+            }
+
+
+class SubmissionCoalescer(GroupCommit):
+    """Synchronous quiz submissions, graded and bulk inserted together"""
+    window_setting = 'SUBMISSION_BATCH_WINDOW_MS'
+    max_size_setting = 'SUBMISSION_BATCH_MAX_SIZE'
+
+    def write(self, values):
+        grade_submissions(values)
+
+    def before_retry(self, value):
+        value[0]._state.adding = True
+
+    def submit(self, attempt, answers):
+        """Grade and store an unsaved attempt, returning it once its batch has committed"""
+        return self.commit((attempt, answers))[0]
+
+
+class AutosaveCoalescer(GroupCommit):
+    """Autosaved answers, appended to the SavedAnswer log with one bulk insert per batch"""
+    window_setting = 'AUTOSAVE_BATCH_WINDOW_MS'
+    max_size_setting = 'AUTOSAVE_BATCH_MAX_SIZE'
+    default_max_size = 500
+
+    def write(self, values):
+        SavedAnswer.objects.bulk_create(values)
+
+    def before_retry(self, value):
+        value.pk = None
+
+
+submission_coalescer = SubmissionCoalescer()
+autosave_coalescer = AutosaveCoalescer()
@@ -0,0 +1,172 @@
+# quiz_api/cache.py
+import math
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Min, Prefetch, Q
+from django.utils import timezone
+
+AVAILABLE_QUIZZES_KEY = 'quiz_api:available_quizzes'
+QUIZ_DETAIL_KEY = 'quiz_api:quiz_detail:{}:{}'
+
+# In-process locks for single_flight(), one per key being filled, with the
+# number of threads holding or waiting on it; dropped when that reaches zero
+_fill_locks = {}
+_fill_locks_guard = threading.Lock()
+
+
+class _FillLock:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.waiters = 0
+
+
+def next_schedule_boundary(now):
+    """The next moment a published quiz opens or closes, or None if none is pending."""
+    from .models import Quiz
+
+    bounds = Quiz.objects.filter(is_published=True).aggregate(
+        next_start=Min('scheduled_start', filter=Q(scheduled_start__gt=now)),
+        next_end=Min('scheduled_end', filter=Q(scheduled_end__gte=now)),
+    )
+    pending = [b for b in bounds.values() if b is not None]
+    return min(pending) if pending else None
+
+
+def available_quizzes():
+    """
+    Published quizzes that are open right now.
+
+    The list is cached until the next scheduled start/end so it can never
+    serve a quiz outside its window. AVAILABLE_QUIZZES_CACHE_SECONDS caps the
+    lifetime so edits made by other worker processes are picked up too.
+    The question count is annotated up front; attempt statistics stay live.
+    """
+    from .models import Quiz
+
+    quizzes = cache.get(AVAILABLE_QUIZZES_KEY)
+    if quizzes is not None:
+        return quizzes
+
+    now = timezone.now()
+    quizzes = list(Quiz.objects.available(now).with_stats('question_count'))
+    timeout = getattr(settings, 'AVAILABLE_QUIZZES_CACHE_SECONDS', 60)
+    boundary = next_schedule_boundary(now)
+    if boundary is not None:
+        timeout = min(timeout, max(1, math.ceil((boundary - now).total_seconds())))
+    cache.set(AVAILABLE_QUIZZES_KEY, quizzes, timeout)
+    return quizzes
+
+
+def invalidate_available_quizzes():
+    cache.delete(AVAILABLE_QUIZZES_KEY)
+
+
+def single_flight(key, build, timeout):
+    """
+    ``cache.get(key)``, calling ``build()`` to fill a miss.
+
+    Concurrent misses build the value once: threads of this process wait on
+    a per-key lock and other processes on a short-lived ``cache.add`` marker,
+    polling for the entry until the marker expires. A caller that waited
+    that long builds the value itself.
+    """
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    with _fill_locks_guard:
+        fill_lock = _fill_locks.get(key)
+        if fill_lock is None:
+            fill_lock = _fill_locks[key] = _FillLock()
+        fill_lock.waiters += 1
+    try:
+        with fill_lock.lock:
+            value = cache.get(key)
+            if value is not None:
+                return value
+
+            fill_key = f'{key}:filling'
+            wait = getattr(settings, 'CACHE_FILL_LOCK_SECONDS', 5)
+            marked = cache.add(fill_key, 1, wait)
+            if not marked:
+                deadline = time.monotonic() + wait
+                while time.monotonic() < deadline:
+                    time.sleep(0.05)
+                    value = cache.get(key)
+                    if value is not None:
+                        return value
+                # The other filler is slow or gone; build, marking it if its marker expired
+                marked = cache.add(fill_key, 1, wait)
+            try:
+                value = build()
+                cache.set(key, value, timeout)
+            finally:
+                # Only the holder removes the marker; another process's is left to it
+                if marked:
+                    cache.delete(fill_key)
+            return value
+    finally:
+        with _fill_locks_guard:
+            fill_lock.waiters -= 1
+            if not fill_lock.waiters:
+                del _fill_locks[key]
+
+
+def bump_quiz_version(quiz_id):
+    """Retire cached quizDetail trees of a quiz by renewing its content version"""
+    from .models import Quiz
+
+    Quiz.objects.filter(pk=quiz_id).update(content_version=uuid.uuid4())
+
+
+def quiz_content_changed(quiz_id):
+    """
+    Retire every cached copy of a quiz's questions and choices: quizDetail
+    trees, the availableQuizzes list (question counts) and, after commit,
+    the exam snapshot. Called by the Question and Choice save() and delete()
+    hooks, and after bulk writes that bypass them.
+    """
+    from .snapshots import sync_snapshot
+
+    bump_quiz_version(quiz_id)
+    invalidate_available_quizzes()
+    sync_snapshot(quiz_id)
+
+
+def quiz_detail(quiz_id, version=None):
+    """
+    A quiz with its author, question count and ordered questions/choices
+    prefetched, cached per Quiz.content_version.
+
+    The version is read from the quiz row unless the caller already has
+    it, so edits made through any path or process retire the tree even
+    with a per-process cache. The cached copy is unpickled per request, so
+    resolvers may annotate it freely. Attempt statistics are not part of
+    the tree and stay live.
+    """
+    from .models import Quiz, Question, Choice
+
+    def build():
+        return (
+            Quiz.objects.with_stats('question_count')
+            .select_related('created_by')
+            .prefetch_related(Prefetch(
+                'questions',
+                queryset=Question.objects.order_by('order', 'id').prefetch_related(
+                    Prefetch('choices', queryset=Choice.objects.order_by('order', 'id'))),
+            ))
+            .get(id=quiz_id)
+        )
+
+    quiz_id = Quiz._meta.pk.to_python(quiz_id)
+    if version is None:
+        version = Quiz.objects.filter(pk=quiz_id).values_list('content_version', flat=True).first()
+        if version is None:
+            raise Quiz.DoesNotExist('Quiz matching query does not exist.')
+    key = QUIZ_DETAIL_KEY.format(quiz_id, version.hex)
+    timeout = getattr(settings, 'QUIZ_DETAIL_CACHE_SECONDS', 3600)
+    return single_flight(key, build, timeout)
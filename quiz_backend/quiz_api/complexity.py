@@ -0,0 +1,133 @@
+# quiz_api/complexity.py
+from django.conf import settings
+from graphql import (
+    GraphQLError, GraphQLList, GraphQLObjectType, get_named_type, get_nullable_type,
+)
+from graphql.execution.values import get_argument_values
+from graphql.language import FieldNode, FragmentSpreadNode, InlineFragmentNode
+
+# Extra cost per resolved value for fields that run their own aggregate
+# queries, keyed by "ParentType.fieldName".
+FIELD_WEIGHTS = {
+    'QuizType.questionCount': 2,
+    'QuizType.averageScore': 2,
+    'QuizType.attemptCount': 2,
+    'QuizType.uniqueStudents': 2,
+    'QuizType.passRate': 2,
+    'AnswerType.correctChoiceText': 2,
+    'Query.quizAnalytics': 25,
+    'Query.studentPerformance': 10,
+}
+
+# Expected length of plain (unpaginated) list fields that differ from the
+# GRAPHQL_COST_LIST_SIZE default.
+LIST_SIZES = {
+    'QuestionType.choices': 4,
+    'QuizType.attempts': 100,
+}
+
+class QueryCostError(GraphQLError):
+    def __init__(self, message, depth, cost, limits):
+        super().__init__(message, extensions={
+            'code': 'QUERY_TOO_COMPLEX',
+            'cost': {'depth': depth, 'cost': cost, 'maxDepth': limits['depth'], 'maxCost': limits['cost']},
+        })
+
+
+def limits_for(user):
+    """The depth and cost limits of the user's role, from settings.GRAPHQL_QUERY_LIMITS"""
+    limits = settings.GRAPHQL_QUERY_LIMITS
+    role = getattr(user, 'role', None) if user is not None and user.is_authenticated else 'anonymous'
+    return limits.get(role) or limits['anonymous']
+
+
+class CostAnalyzer:
+    """
+    Static depth and cost estimate of one operation, computed from the
+    document before anything executes.
+
+    Every object value costs 1 and list fields multiply their subtree by
+    ``first`` (capped at the max page size) or by the expected list size
+    from LIST_SIZES. Fields in FIELD_WEIGHTS add their weight per resolved
+    value. Schema meta fields (``__schema``, ``__typename``...) are free.
+    """
+
+    def __init__(self, schema, fragments, variables):
+        self.schema = schema
+        self.fragments = fragments
+        self.variables = variables or {}
+        self.list_size = getattr(settings, 'GRAPHQL_COST_LIST_SIZE', 20)
+        self.default_page = getattr(settings, 'GRAPHQL_DEFAULT_PAGE_SIZE', 20)
+        self.max_page = getattr(settings, 'GRAPHQL_MAX_PAGE_SIZE', 100)
+
+    def analyze(self, operation):
+        root = self.schema.get_root_type(operation.operation)
+        return self._selection_set(root, operation.selection_set, 1, set())
+
+    def _fields(self, selection_set, visited):
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                yield selection
+            elif isinstance(selection, InlineFragmentNode):
+                yield from self._fields(selection.selection_set, visited)
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                fragment = self.fragments.get(name)
+                if fragment is not None and name not in visited:
+                    yield from self._fields(fragment.selection_set, visited | {name})
+
+    def _selection_set(self, parent_type, selection_set, depth, visited):
+        max_depth, total = depth - 1, 0
+        for node in self._fields(selection_set, visited):
+            name = node.name.value
+            if name.startswith('__') or not isinstance(parent_type, GraphQLObjectType):
+                continue
+            field = parent_type.fields.get(name)
+            if field is None:
+                continue
+            weight = FIELD_WEIGHTS.get(f'{parent_type.name}.{name}', 0)
+            named = get_named_type(field.type)
+            if node.selection_set is None or not isinstance(named, GraphQLObjectType):
+                total += weight
+                max_depth = max(max_depth, depth)
+                continue
+            child_depth, child_cost = self._selection_set(named, node.selection_set, depth + 1, visited)
+            max_depth = max(max_depth, child_depth)
+            multiplier = self._multiplier(field, node, f'{parent_type.name}.{name}')
+            total += multiplier * (1 + weight + child_cost)
+        return max_depth, total
+
+    def _multiplier(self, field, node, key):
+        try:
+            args = get_argument_values(field, node, self.variables)
+        except GraphQLError:
+            args = {}
+        if 'first' in field.args:
+            first = args.get('first')
+            return min(self.default_page if first is None else max(first, 0), self.max_page)
+        if key.endswith('.edges'):
+            # Already counted by the connection's ``first`` multiplier.
+            return 1
+        if isinstance(get_nullable_type(field.type), GraphQLList):
+            return LIST_SIZES.get(key, self.list_size)
+        return 1
+
+
+def analyze_operation(schema, document, operation, variables):
+    fragments = {
+        definition.name.value: definition
+        for definition in document.definitions
+        if definition.kind == 'fragment_definition'
+    }
+    return CostAnalyzer(schema, fragments, variables).analyze(operation)
+
+
+def check_operation(schema, document, operation, variables, user):
+    """Return the operation's depth and cost, raising QueryCostError past the user's limits"""
+    depth, cost = analyze_operation(schema, document, operation, variables)
+    limits = limits_for(user)
+    if depth > limits['depth']:
+        raise QueryCostError(f'Query depth {depth} exceeds the limit of {limits["depth"]}', depth, cost, limits)
+    if cost > limits['cost']:
+        raise QueryCostError(f'Query cost {cost} exceeds the limit of {limits["cost"]}', depth, cost, limits)
+    return {'depth': depth, 'cost': cost, 'maxDepth': limits['depth'], 'maxCost': limits['cost']}
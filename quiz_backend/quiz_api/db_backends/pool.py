@@ -0,0 +1,250 @@
+# quiz_api/db_backends/pool.py
+"""
+In-process database connection pool for Django's per-thread connections.
+Enabled by DB_POOL_MAX_SIZE (see settings.DATABASES), which switches the
+engine to one of the backends next to this module.
+"""
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """No connection became free within the pool's timeout"""
+
+
+class ConnectionPool:
+    """
+    At most ``max_size`` open connections shared by all threads of a
+    process. Threads borrow one when Django connects and give it back when
+    Django closes it (with CONN_MAX_AGE = 0, at the end of every request or
+    task). A borrower waits up to ``timeout`` seconds for a free connection.
+    Idle connections are reused newest first, pinged when they sat idle
+    longer than ``ping_after`` seconds, and retired after ``max_lifetime``.
+    """
+
+    def __init__(self, alias, database, max_size, timeout=10, max_lifetime=1800, ping_after=30):
+        self.alias = alias
+        self.database = database
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.ping_after = ping_after
+        self._cond = threading.Condition()
+        self._idle = []
+        self._opened_at = {}
+        self._size = self._in_use = self._waiting = 0
+        self._peak_in_use = self._peak_waiting = 0
+        self._acquired = self._waits = self._timeouts = self._created = self._discarded = 0
+        self._wait_total = self._wait_max = 0.0
+
+    def acquire(self, connect, ping):
+        """
+        An open connection, reused or made with ``connect()``; ``ping(conn)``
+        must raise when an idle connection no longer works.
+        """
+        started = time.monotonic()
+        deadline = started + self.timeout
+        conn = None
+        with self._cond:
+            self._waiting += 1
+            self._peak_waiting = max(self._peak_waiting, self._waiting)
+            try:
+                while True:
+                    conn, idle_since = self._take_idle()
+                    if conn is not None or self._size < self.max_size:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(
+                            f'No database connection free in the {self.alias} pool '
+                            f'({self.max_size} connections) after {self.timeout}s')
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+            if conn is None:
+                self._size += 1
+            self._in_use += 1
+            self._peak_in_use = max(self._peak_in_use, self._in_use)
+            waited = time.monotonic() - started
+            self._acquired += 1
+            self._waits += waited > 0.001
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+
+        try:
+            if conn is not None and time.monotonic() - idle_since > self.ping_after:
+                try:
+                    ping(conn)
+                except Exception:
+                    logger.info("Replacing a dead pooled connection to %s", self.alias)
+                    with self._cond:
+                        self._forget(conn)
+                    self._close(conn)
+                    conn = None
+            if conn is None:
+                conn = connect()
+                with self._cond:
+                    self._created += 1
+                    self._opened_at[id(conn)] = time.monotonic()
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def release(self, conn, reusable=True):
+        """Give a borrowed connection back, or close it when it is not ``reusable`` or too old"""
+        opened_at = self._opened_at.get(id(conn), 0)
+        if reusable and time.monotonic() - opened_at < self.max_lifetime:
+            with self._cond:
+                self._in_use -= 1
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+            return
+        with self._cond:
+            self._forget(conn)
+            self._size -= 1
+            self._in_use -= 1
+            self._cond.notify()
+        self._close(conn)
+
+    def close_idle(self):
+        """Close every idle connection, e.g. before its database is dropped"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            for conn, _ in idle:
+                self._forget(conn)
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._close(conn)
+
+    def _take_idle(self):
+        # Called with the lock held; retires expired connections on the way
+        now = time.monotonic()
+        while self._idle:
+            conn, idle_since = self._idle.pop()
+            if now - self._opened_at.get(id(conn), 0) < self.max_lifetime:
+                return conn, idle_since
+            self._size -= 1
+            self._forget(conn)
+            self._close(conn)
+        return None, None
+
+    def _forget(self, conn):
+        # Called with the lock held
+        self._opened_at.pop(id(conn), None)
+        self._discarded += 1
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def stats(self):
+        with self._cond:
+            return {
+                'alias': self.alias,
+                'database': self.database,
+                'max_size': self.max_size,
+                'size': self._size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+                'peak_in_use': self._peak_in_use,
+                'peak_waiting': self._peak_waiting,
+                'acquired': self._acquired,
+                'waits': self._waits,
+                'timeouts': self._timeouts,
+                'created': self._created,
+                'discarded': self._discarded,
+                'average_wait_ms': self._wait_total / self._acquired * 1000 if self._acquired else 0.0,
+                'max_wait_ms': self._wait_max * 1000,
+                'saturation': self._in_use / self.max_size if self.max_size else 0.0,
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_pools_pid = os.getpid()
+
+
+def get_pool(alias, settings_dict):
+    """The pool of this process for a database alias and name"""
+    global _pools, _pools_pid
+    key = (alias, str(settings_dict['NAME']))
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            # Forked: the parent's connections belong to the parent
+            _pools, _pools_pid = {}, os.getpid()
+        pool = _pools.get(key)
+        if pool is None:
+            options = settings_dict.get('POOL') or {}
+            pool = _pools[key] = ConnectionPool(
+                alias,
+                key[1],
+                max_size=options.get('MAX_SIZE', 10),
+                timeout=options.get('TIMEOUT', 10),
+                max_lifetime=options.get('MAX_LIFETIME', 1800),
+                ping_after=options.get('PING_AFTER', 30),
+            )
+        return pool
+
+
+def pool_stats():
+    with _pools_lock:
+        pools = list(_pools.values()) if _pools_pid == os.getpid() else []
+    return [pool.stats() for pool in pools]
+
+
+def _ping(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT 1')
+    finally:
+        cursor.close()
+
+
+class PooledDatabaseWrapperMixin:
+    """
+    Mixed into a backend's DatabaseWrapper: connect() borrows from the pool
+    and close() gives the connection back after rolling back whatever the
+    thread left open. Connections that saw errors, or are closed inside an
+    atomic block, are discarded rather than reused.
+    """
+
+    def get_new_connection(self, conn_params):
+        connect = super().get_new_connection
+        try:
+            return get_pool(self.alias, self.settings_dict).acquire(lambda: connect(conn_params), _ping)
+        except PoolTimeout as e:
+            logger.warning("%s", e)
+            # wrap_database_errors turns this into django.db.OperationalError
+            raise self.Database.OperationalError(str(e)) from e
+
+    def _close(self):
+        if self.connection is None:
+            return
+        reusable = not self.errors_occurred and not self.in_atomic_block
+        if reusable:
+            try:
+                self.connection.rollback()
+            except Exception:
+                reusable = False
+        get_pool(self.alias, self.settings_dict).release(self.connection, reusable)
+
+
+class PooledDatabaseCreationMixin:
+    """Close the pooled connections to a test database before it is dropped"""
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        get_pool(self.connection.alias, {**self.connection.settings_dict, 'NAME': test_database_name}).close_idle()
+        super()._destroy_test_db(test_database_name, verbosity)
@@ -0,0 +1,13 @@
+# quiz_api/db_backends/postgresql/base.py
+"""Django's PostgreSQL backend with connections borrowed from quiz_api.db_backends.pool"""
+from django.db.backends.postgresql import base, creation
+
+from ..pool import PooledDatabaseCreationMixin, PooledDatabaseWrapperMixin
+
+
+class DatabaseCreation(PooledDatabaseCreationMixin, creation.DatabaseCreation):
+    pass
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    creation_class = DatabaseCreation
@@ -0,0 +1,19 @@
+# quiz_api/db_backends/sqlite3/base.py
+"""Django's SQLite backend with connections borrowed from quiz_api.db_backends.pool"""
+from django.db.backends.sqlite3 import base, creation
+
+from ..pool import PooledDatabaseCreationMixin, PooledDatabaseWrapperMixin
+
+
+class DatabaseCreation(PooledDatabaseCreationMixin, creation.DatabaseCreation):
+    pass
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def get_new_connection(self, conn_params):
+        # In-memory databases (e.g. the test database) are never closed, so never given back
+        if self.is_in_memory_db():
+            return base.DatabaseWrapper.get_new_connection(self, conn_params)
+        return super().get_new_connection(conn_params)
@@ -0,0 +1,116 @@
+# quiz_api/documents.py
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from graphql import GraphQLError, OperationType, parse, validate
+from graphql.language import FieldNode
+
+# Every LRUCache created in this process, reported by cache_stats()
+ALL_CACHES = []
+
+
+class LRUCache:
+    """Small thread-safe LRU map with hit/miss counters; entries expire after ``ttl`` seconds if given"""
+
+    def __init__(self, name, maxsize, ttl=None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        ALL_CACHES.append(self)
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value, expires = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            if expires is not None and expires <= time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'name': self.name,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups) * 100 if lookups else 0,
+            }
+
+
+document_cache = LRUCache('documents', getattr(settings, 'GRAPHQL_DOCUMENT_CACHE_SIZE', 256))
+introspection_cache = LRUCache('introspection', getattr(settings, 'GRAPHQL_INTROSPECTION_CACHE_SIZE', 16))
+
+
+def query_hash(query):
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()
+
+
+def parse_and_validate(schema, query):
+    """
+    Return ``(document, errors)`` for ``query``, parsing and validating each
+    distinct query text against ``schema`` only once.
+    """
+    key = query_hash(query)
+    entry = document_cache.get(key)
+    if entry is None:
+        try:
+            document = parse(query)
+        except GraphQLError as error:
+            entry = (None, [error])
+        else:
+            entry = (document, validate(schema, document))
+        document_cache.set(key, entry)
+    return entry
+
+
+def is_introspection(operation_ast):
+    """True when every root field of a query operation is a schema meta field"""
+    if operation_ast is None or operation_ast.operation != OperationType.QUERY:
+        return False
+    selections = operation_ast.selection_set.selections
+    return bool(selections) and all(
+        isinstance(selection, FieldNode) and selection.name.value.startswith('__')
+        for selection in selections
+    )
+
+
+def introspection_key(query, operation_name, variables):
+    return (query_hash(query), operation_name, json.dumps(variables or {}, sort_keys=True))
+
+
+def cache_stats():
+    return [cache.stats() for cache in ALL_CACHES]
@@ -0,0 +1,94 @@
+# quiz_api/executors.py
+"""
+Thread pools behind the async GraphQL view (quiz_api.views.AsyncGraphQLView).
+ORM work runs on ``orm_executor``, whose size bounds the database
+connections a process uses. Password hashing and token signing run on
+``cpu_executor``, sized to the cores, so a burst of logins hashes at most
+one password per core instead of one per busy ORM thread.
+"""
+import asyncio
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+_local = threading.local()
+
+
+class BoundedExecutor:
+    """
+    A named ThreadPoolExecutor that tracks how many tasks are queued and
+    running. Each task runs in a copy of the caller's context (request id,
+    operation name). Stale database connections are closed around it, as
+    Django does around a request.
+    """
+
+    def __init__(self, name, max_workers):
+        self.name = name
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._submitted = self._queued = self._active = 0
+        self._max_queued = self._max_active = 0
+
+    def _run(self, func, args, kwargs):
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+            self._max_active = max(self._max_active, self._active)
+        _local.executor = self
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+            _local.executor = None
+            with self._lock:
+                self._active -= 1
+
+    def submit(self, func, *args, **kwargs):
+        """Schedule ``func``; returns a concurrent.futures.Future"""
+        with self._lock:
+            self._submitted += 1
+            self._queued += 1
+            self._max_queued = max(self._max_queued, self._queued)
+        context = contextvars.copy_context()
+        return self._pool.submit(context.run, self._run, func, args, kwargs)
+
+    async def run(self, func, *args, **kwargs):
+        """Await ``func`` run on this pool without blocking the event loop"""
+        return await asyncio.wrap_future(self.submit(func, *args, **kwargs))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'name': self.name,
+                'max_workers': self.max_workers,
+                'submitted': self._submitted,
+                'queued': self._queued,
+                'active': self._active,
+                'max_queued': self._max_queued,
+                'max_active': self._max_active,
+            }
+
+
+orm_executor = BoundedExecutor('graphql-orm', getattr(settings, 'GRAPHQL_ORM_THREADS', 16))
+cpu_executor = BoundedExecutor('graphql-cpu', getattr(settings, 'GRAPHQL_CPU_THREADS', os.cpu_count() or 1))
+
+
+def cpu_bound(func, *args, **kwargs):
+    """
+    Call ``func`` on the CPU pool when running on an ORM pool thread (i.e.
+    under the async view) and wait for it; elsewhere (WSGI, workers,
+    management commands) call it inline.
+    """
+    if getattr(_local, 'executor', None) is not orm_executor:
+        return func(*args, **kwargs)
+    return cpu_executor.submit(func, *args, **kwargs).result()
+
+
+def executor_stats():
+    return [orm_executor.stats(), cpu_executor.stats()]
@@ -0,0 +1,190 @@
+# quiz_api/google_auth.py
+"""
+Local verification of Google ID tokens against Google's published signing
+keys (JWKS), so signing in costs no round trip to Google once the keys are
+cached.
+"""
+import email.utils
+import json
+import logging
+import re
+import threading
+import time
+import urllib.request
+
+import jwt
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+
+_MAX_AGE = re.compile(r'max-age=(\d+)')
+
+
+class GoogleTokenError(Exception):
+    """An ID token that is malformed, badly signed, expired or not meant for this app"""
+
+
+class UrlKeySource:
+    """Google's JWKS endpoint; keys live as long as its Cache-Control max-age says"""
+
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+
+    def fetch(self):
+        """``(jwks, max_age)``; max_age is None when the response does not say"""
+        with urllib.request.urlopen(self.url, timeout=self.timeout) as resp:
+            jwks = json.load(resp)
+            return jwks, self.max_age(resp.headers)
+
+    @staticmethod
+    def max_age(headers):
+        match = _MAX_AGE.search(headers.get('Cache-Control') or '')
+        if match:
+            return max(int(match.group(1)) - int(headers.get('Age') or 0), 0)
+        if headers.get('Expires'):
+            try:
+                expires = email.utils.parsedate_to_datetime(headers['Expires']).timestamp()
+            except (TypeError, ValueError):
+                return None
+            return max(expires - time.time(), 0)
+        return None
+
+
+class FileKeySource:
+    """A JWKS document on disk, for offline development and tests"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def fetch(self):
+        with open(self.path) as f:
+            return json.load(f), None
+
+
+class SigningKeyCache:
+    """
+    Google's public keys by ``kid``. The first lookup loads them; after that
+    a background thread refreshes them shortly before they expire, so
+    lookups never wait on the network. A ``kid`` that is not cached (Google
+    rotated its keys early) forces a refresh, at most once per
+    ``min_refresh`` seconds. When a refresh fails the old keys are kept.
+    """
+
+    def __init__(self, source, default_max_age=3600, min_refresh=60):
+        self.source = source
+        self.default_max_age = default_max_age
+        self.min_refresh = min_refresh
+        self._keys = {}
+        self._expires_at = 0
+        self._last_fetch = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def get(self, kid):
+        """The public key for ``kid``, or None if Google does not publish it"""
+        now = time.monotonic()
+        if not self._keys:
+            self.refresh()
+        elif kid not in self._keys:
+            if self._last_fetch is None or now - self._last_fetch >= self.min_refresh:
+                self.refresh()
+        elif now >= self._expires_at - min(60, self.default_max_age / 10):
+            self._refresh_in_background()
+        return self._keys.get(kid)
+
+    def refresh(self):
+        """Fetch the keys now; several threads asking at once share one fetch"""
+        started = time.monotonic()
+        with self._lock:
+            if self._last_fetch is not None and self._last_fetch >= started:
+                return
+            self._last_fetch = time.monotonic()
+            try:
+                jwks, max_age = self.source.fetch()
+                keys = {}
+                for data in jwks.get('keys', []):
+                    try:
+                        key = jwt.PyJWK(data)
+                    except jwt.PyJWKError:
+                        logger.warning("Skipping unusable Google signing key %s", data.get('kid'))
+                        continue
+                    keys[key.key_id] = key.key
+            except Exception:
+                logger.exception("Refreshing Google signing keys failed")
+                return
+            self._keys = keys
+            self._expires_at = self._last_fetch + (self.default_max_age if max_age is None else max_age)
+            logger.info("Loaded %d Google signing keys", len(keys))
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name='google-jwks-refresh', daemon=True).start()
+
+
+def _key_source():
+    path = getattr(settings, 'GOOGLE_JWKS_FILE', '')
+    if path:
+        return FileKeySource(path)
+    return UrlKeySource(getattr(settings, 'GOOGLE_JWKS_URL', 'https://www.googleapis.com/oauth2/v3/certs'))
+
+
+signing_keys = SigningKeyCache(
+    _key_source(),
+    default_max_age=getattr(settings, 'GOOGLE_JWKS_DEFAULT_MAX_AGE', 3600),
+    min_refresh=getattr(settings, 'GOOGLE_JWKS_MIN_REFRESH_SECONDS', 60),
+)
+
+
+def _audiences():
+    client_id = getattr(settings, 'GOOGLE_CLIENT_ID', '')
+    if isinstance(client_id, str):
+        client_id = client_id.split(',')
+    return [aud.strip() for aud in client_id if aud.strip()]
+
+
+def verify_id_token(token, keys=None):
+    """
+    The claims of a Google ID token, checked locally: RS256 signature by a
+    current Google key, ``aud`` among settings.GOOGLE_CLIENT_ID (a string,
+    comma separated for several clients, or a list), a Google ``iss``, and
+    ``exp``/``iat`` with GOOGLE_TOKEN_LEEWAY seconds of clock skew. Raises
+    GoogleTokenError otherwise.
+    """
+    audiences = _audiences()
+    if not audiences:
+        raise GoogleTokenError('GOOGLE_CLIENT_ID is not configured')
+    try:
+        kid = jwt.get_unverified_header(token).get('kid')
+    except jwt.InvalidTokenError as e:
+        raise GoogleTokenError(str(e))
+    key = (keys or signing_keys).get(kid)
+    if key is None:
+        raise GoogleTokenError('Token signed with an unknown key')
+    try:
+        claims = jwt.decode(
+            token,
+            key,
+            algorithms=['RS256'],
+            audience=audiences,
+            leeway=getattr(settings, 'GOOGLE_TOKEN_LEEWAY', 30),
+            options={'require': ['exp', 'iat', 'iss', 'aud', 'sub']},
+        )
+    except jwt.InvalidTokenError as e:
+        raise GoogleTokenError(str(e))
+    # PyJWT only compares iss to a single value
+    if claims['iss'] not in GOOGLE_ISSUERS:
+        raise GoogleTokenError('Invalid issuer')
+    return claims
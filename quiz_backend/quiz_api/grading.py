@@ -0,0 +1,142 @@
+# quiz_api/grading.py
+import json
+import logging
+
+from .analytics import ensure_quiz_stats, record_attempts
+from .models import Question, Choice, QuizAttempt, Answer
+
+logger = logging.getLogger(__name__)
+
+
+class AnswerKey:
+    """Points and correct/valid choice ids of every question of a quiz, loaded in one query"""
+
+    def __init__(self, quiz_id):
+        self.points = {}
+        self.correct = {}
+        self.choices = {}
+        rows = Question.objects.filter(quiz_id=quiz_id).order_by().values_list(
+            'id', 'points', 'choices__id', 'choices__is_correct')
+        for question_id, points, choice_id, is_correct in rows:
+            self.points[question_id] = points
+            self.correct.setdefault(question_id, set())
+            self.choices.setdefault(question_id, set())
+            if choice_id is not None:
+                self.choices[question_id].add(choice_id)
+                if is_correct:
+                    self.correct[question_id].add(choice_id)
+
+    def __len__(self):
+        return len(self.points)
+
+
+def parse_answer(answer_item):
+    """Submitted answers arrive as JSON strings or already parsed dicts"""
+    if isinstance(answer_item, str):
+        return json.loads(answer_item)
+    return answer_item
+
+
+def grade_answers(key, answers):
+    """
+    Grade submitted answers against ``key`` in memory.
+
+    Returns ``(answers, score, correct)`` with unsaved Answer rows (no attempt
+    set yet). Unknown questions, choices of another question and repeated
+    answers to the same question are skipped.
+    """
+    question_pk, choice_pk = Question._meta.pk, Choice._meta.pk
+    graded = {}
+    score = correct_count = 0
+    for answer_item in answers:
+        try:
+            answer_data = parse_answer(answer_item)
+            question_id = answer_data.get('questionId')
+            if not question_id:
+                continue
+            question_id = question_pk.to_python(question_id)
+            selected_choice_id = answer_data.get('choiceId')
+            if selected_choice_id:
+                selected_choice_id = choice_pk.to_python(selected_choice_id)
+        except Exception as e:
+            logger.info("Skipping malformed answer: %s", e)
+            continue
+
+        if question_id not in key.points:
+            logger.info("Skipping answer to question %s, which is not in the quiz", question_id)
+            continue
+        if question_id in graded:
+            continue
+        if selected_choice_id and selected_choice_id not in key.choices[question_id]:
+            logger.info("Skipping choice %s, which is not a choice of question %s", selected_choice_id, question_id)
+            continue
+
+        is_correct = bool(selected_choice_id) and selected_choice_id in key.correct[question_id]
+        points_earned = key.points[question_id] if is_correct else 0
+        score += points_earned
+        correct_count += is_correct
+        graded[question_id] = Answer(
+            question_id=question_id,
+            selected_choice_id=selected_choice_id or None,
+            answer_text=answer_data.get('answer_text', ''),
+            is_correct=is_correct,
+            points_earned=points_earned,
+        )
+    return list(graded.values()), score, correct_count
+
+
+def grade_submissions(submissions):
+    """
+    Grade ``(attempt, answers)`` pairs, store their Answer rows and fold them
+    into the analytics rollups; call inside a transaction.
+
+    Unsaved attempts are bulk inserted with their final scores and pending
+    ones from the grading queue are updated. Every Answer goes into a single
+    bulk_create, so the query count grows with neither the number of
+    questions nor the number of submissions graded together.
+    """
+    quiz_ids = list(dict.fromkeys(attempt.quiz_id for attempt, _ in submissions))
+    ensure_quiz_stats(quiz_ids)
+    keys = {quiz_id: AnswerKey(quiz_id) for quiz_id in quiz_ids}
+    graded_before = set(
+        QuizAttempt.objects.filter(
+            quiz_id__in=keys,
+            user_id__in={attempt.user_id for attempt, _ in submissions},
+            grading_status=QuizAttempt.GRADED,
+        ).exclude(pk__in=[attempt.pk for attempt, _ in submissions])
+        .values_list('quiz_id', 'user_id').distinct()
+    )
+
+    new_attempts, all_answers, rollup = [], [], []
+    for attempt, answers in submissions:
+        key = keys[attempt.quiz_id]
+        graded, score, correct_answers = grade_answers(key, answers)
+        student = (attempt.quiz_id, attempt.user_id)
+        first_for_student = student not in graded_before
+        graded_before.add(student)
+
+        attempt.total_questions = len(key)
+        attempt.score = score
+        attempt.correct_answers = correct_answers
+        attempt.grading_status = QuizAttempt.GRADED
+        if attempt._state.adding:
+            # bulk_create skips QuizAttempt.save(), which derives these
+            attempt.percentage = attempt.calculate_percentage()
+            attempt.status = attempt.determine_status()
+            new_attempts.append(attempt)
+        else:
+            attempt.save()  # This will auto-calculate percentage and status
+        for answer in graded:
+            answer.attempt = attempt
+        all_answers.extend(graded)
+        rollup.append((attempt, graded, first_for_student))
+
+    QuizAttempt.objects.bulk_create(new_attempts)
+    Answer.objects.bulk_create(all_answers)
+    record_attempts(rollup)
+    return [attempt for attempt, _ in submissions]
+
+
+def grade_submission(attempt, answers):
+    """Grade a single submission; see grade_submissions()"""
+    return grade_submissions([(attempt, answers)])[0]
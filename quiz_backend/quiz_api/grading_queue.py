@@ -0,0 +1,133 @@
+# quiz_api/grading_queue.py
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .grading import grade_submission, parse_answer
+from .models import QuizAttempt, GradingJob
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_submission(user, quiz, answers, time_taken):
+    """
+    Record a pending attempt and its raw answers for the grading workers;
+    call inside a transaction. Costs two INSERTs whatever the quiz size.
+    """
+    attempt = QuizAttempt.objects.create(
+        user=user,
+        quiz=quiz,
+        time_taken=time_taken,
+        grading_status=QuizAttempt.GRADING_PENDING,
+    )
+    GradingJob.objects.create(attempt=attempt, answers=[parse_answer(item) for item in answers])
+    transaction.on_commit(grading_pool.notify)
+    return attempt
+
+
+def _claimable(now):
+    stale = now - timedelta(seconds=getattr(settings, 'GRADING_LEASE_SECONDS', 60))
+    return Q(claimed_at__isnull=True) | Q(claimed_at__lt=stale)
+
+
+def claim_job():
+    """
+    Lease the oldest unclaimed job, or None if the queue is empty. The
+    conditional UPDATE makes the claim safe across threads and processes
+    without row locks.
+    """
+    now = timezone.now()
+    max_tries = getattr(settings, 'GRADING_MAX_TRIES', 3)
+    candidates = GradingJob.objects.filter(_claimable(now), tries__lt=max_tries).values_list('pk', flat=True)[:10]
+    for pk in candidates:
+        if GradingJob.objects.filter(_claimable(now), pk=pk).update(claimed_at=now):
+            return GradingJob.objects.select_related('attempt').get(pk=pk)
+    return None
+
+
+def run_job(job):
+    """Grade a claimed job and remove it from the queue; failures are retried up to GRADING_MAX_TRIES"""
+    try:
+        with transaction.atomic():
+            grade_submission(job.attempt, job.answers)
+            job.delete()
+    except Exception as e:
+        logger.exception("Grading attempt %s failed", job.pk)
+        tries = job.tries + 1
+        GradingJob.objects.filter(pk=job.pk).update(tries=tries, last_error=str(e), claimed_at=None)
+        if tries >= getattr(settings, 'GRADING_MAX_TRIES', 3):
+            QuizAttempt.objects.filter(pk=job.pk).update(grading_status=QuizAttempt.GRADING_FAILED)
+
+
+def process_next_job():
+    """Grade one queued submission; False when there was nothing to do"""
+    job = claim_job()
+    if job is None:
+        return False
+    run_job(job)
+    return True
+
+
+def process_next_task():
+    """Grade one queued submission, or else run one queued regrade; False when both queues are empty"""
+    from .regrade import process_next_regrade
+    return process_next_job() or process_next_regrade()
+
+
+class GradingWorkerPool:
+    """
+    Daemon threads draining the grading and regrade queues. New jobs wake one
+    worker; idle workers also poll every GRADING_POLL_SECONDS so jobs queued
+    by other processes, or left behind by a crash, are picked up.
+    """
+
+    def __init__(self):
+        self._wakeup = threading.Semaphore(0)
+        self._stopping = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def start(self, workers=None):
+        with self._lock:
+            if self._threads:
+                return
+            workers = getattr(settings, 'GRADING_WORKERS', 2) if workers is None else workers
+            self._stopping.clear()
+            for n in range(workers):
+                thread = threading.Thread(target=self._run, name=f'grading-worker-{n}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def notify(self):
+        self.start()
+        self._wakeup.release()
+
+    def stop(self):
+        with self._lock:
+            self._stopping.set()
+            for _ in self._threads:
+                self._wakeup.release()
+            for thread in self._threads:
+                thread.join()
+            self._threads = []
+
+    def _run(self):
+        poll = getattr(settings, 'GRADING_POLL_SECONDS', 2)
+        while not self._stopping.is_set():
+            try:
+                worked = process_next_task()
+            except Exception:
+                logger.exception("Grading worker error")
+                worked = False
+            finally:
+                close_old_connections()
+            if not worked:
+                self._wakeup.acquire(timeout=poll)
+
+
+grading_pool = GradingWorkerPool()
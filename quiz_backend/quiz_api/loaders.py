@@ -0,0 +1,192 @@
+# quiz_api/loaders.py
+from collections import defaultdict
+
+from django.db.models import QuerySet
+
+from .models import User, Quiz, Question, Choice, QuizAttempt
+
+
+class BatchLoader:
+    """
+    Per-request loader that resolves every queued key with a single query.
+
+    Keys are queued ("primed") as soon as the parent rows are known, so the
+    first load() for any of them fetches the whole level with one IN (...)
+    query and every sibling is then served from the cache.
+    """
+    # (model, attribute) pairs naming the parent rows that carry keys for
+    # this loader.
+    sources = ()
+
+    def __init__(self, registry=None):
+        self.registry = registry
+        self._cache = {}
+        self._queue = set()
+
+    def batch_load(self, keys):
+        """Return a dict mapping each key to its value."""
+        raise NotImplementedError
+
+    def default(self):
+        return None
+
+    def prime(self, keys):
+        for key in keys:
+            if key is not None and key not in self._cache:
+                self._queue.add(key)
+
+    def load(self, key):
+        if key not in self._cache:
+            self._queue.add(key)
+            self.dispatch()
+        return self._cache[key]
+
+    def load_many(self, keys):
+        keys = list(keys)
+        self.prime(keys)
+        if self._queue:
+            self.dispatch()
+        return [self._cache[key] for key in keys]
+
+    def dispatch(self):
+        keys = list(self._queue)
+        self._queue.clear()
+        results = self.batch_load(keys)
+        for key in keys:
+            self._cache[key] = results.get(key, self.default())
+        if self.registry is not None:
+            self.registry.prime_from(self._loaded_instances(results.values()))
+
+    @staticmethod
+    def _loaded_instances(values):
+        for value in values:
+            if isinstance(value, list):
+                yield from value
+            elif value is not None:
+                yield value
+
+
+class RelatedListLoader(BatchLoader):
+    """Loads the reverse side of a foreign key, grouped by the parent id."""
+    model = None
+    fk_attr = None
+
+    def get_queryset(self):
+        return self.model.objects.all()
+
+    def default(self):
+        return []
+
+    def batch_load(self, keys):
+        grouped = defaultdict(list)
+        queryset = self.get_queryset().filter(**{f'{self.fk_attr}__in': keys})
+        for obj in queryset:
+            grouped[getattr(obj, self.fk_attr)].append(obj)
+        return grouped
+
+
+class InstanceLoader(BatchLoader):
+    """Loads model instances by primary key."""
+    model = None
+
+    def batch_load(self, keys):
+        return self.model.objects.in_bulk(keys)
+
+
+class QuestionsByQuizLoader(RelatedListLoader):
+    sources = ((Quiz, 'pk'),)
+    model = Question
+    fk_attr = 'quiz_id'
+
+
+class ChoicesByQuestionLoader(RelatedListLoader):
+    sources = ((Question, 'pk'),)
+    model = Choice
+    fk_attr = 'question_id'
+
+
+class AttemptsByQuizLoader(RelatedListLoader):
+    sources = ((Quiz, 'pk'),)
+    model = QuizAttempt
+    fk_attr = 'quiz_id'
+
+
+class QuizLoader(InstanceLoader):
+    sources = ((QuizAttempt, 'quiz_id'),)
+    model = Quiz
+
+
+class UserLoader(InstanceLoader):
+    sources = ((QuizAttempt, 'user_id'), (Quiz, 'created_by_id'))
+    model = User
+
+
+class Loaders:
+    """The set of loaders attached to one GraphQL request context."""
+
+    def __init__(self):
+        self.questions_by_quiz = QuestionsByQuizLoader(self)
+        self.choices_by_question = ChoicesByQuestionLoader(self)
+        self.attempts_by_quiz = AttemptsByQuizLoader(self)
+        self.quiz = QuizLoader(self)
+        self.user = UserLoader(self)
+
+    def __iter__(self):
+        return iter([
+            self.questions_by_quiz, self.choices_by_question,
+            self.attempts_by_quiz, self.quiz, self.user,
+        ])
+
+    def prime_from(self, instances):
+        """Queue the keys found on freshly loaded parent rows."""
+        instances = list(instances)
+        if not instances:
+            return
+        for loader in self:
+            for model, attr in loader.sources:
+                loader.prime(
+                    getattr(obj, attr) for obj in instances
+                    # Reading a column pruned with only() would cost a query per row
+                    if isinstance(obj, model) and attr not in obj.get_deferred_fields()
+                )
+
+
+def get_loaders(info):
+    """Return the request's loaders, attaching a fresh set if missing."""
+    context = info.context
+    loaders = getattr(context, 'loaders', None)
+    if loaders is None:
+        loaders = Loaders()
+        context.loaders = loaders
+    return loaders
+
+
+def load_related(instance, field_name, loader):
+    """Use an already cached relation, otherwise go through the loader."""
+    field = instance._meta.get_field(field_name)
+    if field.is_cached(instance):
+        return getattr(instance, field_name)
+    return loader.load(getattr(instance, field.attname))
+
+
+def load_reverse(instance, related_name, loader):
+    """Use a prefetched reverse relation, otherwise go through the loader."""
+    prefetched = getattr(instance, '_prefetched_objects_cache', {})
+    if related_name in prefetched:
+        return list(prefetched[related_name])
+    return loader.load(instance.pk)
+
+
+class LoaderPrimingMiddleware:
+    """
+    Graphene middleware that primes the request loaders with every list of
+    model instances a resolver returns, so nested fields batch per level.
+    """
+
+    def resolve(self, next, root, info, **kwargs):
+        result = next(root, info, **kwargs)
+        if isinstance(result, QuerySet):
+            result = list(result)
+        if isinstance(result, list) and result and hasattr(result[0], '_meta'):
+            get_loaders(info).prime_from(result)
+        return result
@@ -0,0 +1,106 @@
+# quiz_api/management/commands/_benchmark.py
+"""Shared helpers for the benchmark management commands."""
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from quiz_api.models import User, Subject, Quiz, Question, Choice, QuizAttempt, Answer
+
+
+class BenchmarkCommand(BaseCommand):
+    """Runs ``run_benchmark`` against a throwaway test database."""
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.run_benchmark(**options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run_benchmark(self, **options):
+        raise NotImplementedError
+
+
+def make_users(count, role='student', prefix='bench'):
+    users = []
+    for i in range(count):
+        user = User(
+            username=f'{prefix}_{role}_{i}',
+            email=f'{prefix}_{role}_{i}@example.com',
+            first_name='Bench',
+            last_name=f'{role.title()} {i}',
+            role=role,
+            is_approved=True,
+        )
+        user.set_unusable_password()
+        users.append(user)
+    return User.objects.bulk_create(users)
+
+
+def make_quiz(teacher, subject=None, questions=10, choices=4, **fields):
+    """Create a published quiz whose first choice is always the correct one."""
+    if subject is None:
+        subject = Subject.objects.create(name='Benchmark', created_by=teacher)
+    fields.setdefault('title', 'Benchmark Quiz')
+    fields.setdefault('is_published', True)
+    quiz = Quiz.objects.create(subject=subject, created_by=teacher, **fields)
+    question_rows = Question.objects.bulk_create([
+        Question(quiz=quiz, question_text=f'Question {i}', points=1, order=i)
+        for i in range(questions)
+    ])
+    Choice.objects.bulk_create([
+        Choice(question=question, choice_text=f'Choice {j}', is_correct=(j == 0), order=j)
+        for question in question_rows
+        for j in range(choices)
+    ])
+    return quiz
+
+
+def make_attempts(quiz, students, correct_every=2, batch_size=2000):
+    """Create one graded attempt with answers for every student."""
+    questions = list(quiz.questions.prefetch_related('choices'))
+    attempts = []
+    answers = []
+    for n, student in enumerate(students):
+        attempt = QuizAttempt(user=student, quiz=quiz, total_questions=len(questions),
+                              time_taken=60 + n % 600)
+        correct = 0
+        for i, question in enumerate(questions):
+            choices = list(question.choices.all())
+            is_correct = (i + n) % correct_every == 0
+            correct += is_correct
+            answers.append(Answer(
+                attempt=attempt,
+                question=question,
+                selected_choice=choices[0] if is_correct else choices[-1],
+                is_correct=is_correct,
+                points_earned=question.points if is_correct else 0,
+            ))
+        attempt.correct_answers = correct
+        attempt.score = correct
+        attempt.percentage = attempt.calculate_percentage()
+        attempt.status = attempt.determine_status()
+        attempts.append(attempt)
+    QuizAttempt.objects.bulk_create(attempts, batch_size=batch_size)
+    Answer.objects.bulk_create(answers, batch_size=batch_size)
+    return attempts
+
+
+def graphql(user, query, variables=None, client=None):
+    """POST a query to /graphql/ as ``user``; return (payload, queries, seconds)."""
+    client = client or Client()
+    headers = {}
+    if user is not None:
+        headers['HTTP_AUTHORIZATION'] = f'Bearer {RefreshToken.for_user(user).access_token}'
+    body = json.dumps({'query': query, 'variables': variables or {}})
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        response = client.post('/graphql/', body, content_type='application/json', **headers)
+        elapsed = time.perf_counter() - started
+    return response.json(), len(queries), elapsed
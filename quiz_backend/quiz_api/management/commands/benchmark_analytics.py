@@ -0,0 +1,50 @@
+# quiz_api/management/commands/benchmark_analytics.py
+import tracemalloc
+
+from quiz_api.analytics import rebuild_rollups
+
+from ._benchmark import BenchmarkCommand, make_users, make_quiz, make_attempts, graphql
+
+QUERY = """
+query ($quizId: String!) {
+  quizAnalytics(quizId: $quizId) {
+    totalAttempts uniqueStudents averageScore highestScore lowestScore
+    averageCompletionTime passRate
+    questionAnalytics { questionId totalAttempts correctAttempts accuracyPercentage difficultyLevel }
+  }
+}
+"""
+
+
+class Command(BenchmarkCommand):
+    help = 'Measure quizAnalytics queries, time and peak memory as attempts grow'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--attempts', type=int, default=100000)
+        parser.add_argument('--steps', type=int, default=4,
+                            help='Number of measurements on the way to --attempts')
+        parser.add_argument('--questions', type=int, default=5)
+        parser.add_argument('--students', type=int, default=1000)
+
+    def run_benchmark(self, attempts, steps, questions, students, **options):
+        teacher = make_users(1, role='teacher')[0]
+        learners = make_users(students)
+        quiz = make_quiz(teacher, questions=questions)
+
+        created = 0
+        self.stdout.write(f'{"attempts":>9} {"queries":>8} {"seconds":>8} {"peak KiB":>9}')
+        for step in range(1, steps + 1):
+            target = attempts * step // steps
+            while created < target:
+                chunk = min(5000, target - created)
+                make_attempts(quiz, [learners[(created + i) % students] for i in range(chunk)])
+                created += chunk
+            rebuild_rollups([quiz.id])
+            tracemalloc.start()
+            payload, queries, elapsed = graphql(teacher, QUERY, {'quizId': str(quiz.id)})
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            if payload.get('errors'):
+                self.stderr.write(str(payload['errors']))
+                return
+            self.stdout.write(f'{created:>9} {queries:>8} {elapsed:>8.3f} {peak // 1024:>9}')
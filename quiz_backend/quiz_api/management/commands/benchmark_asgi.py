@@ -0,0 +1,156 @@
+# quiz_api/management/commands/benchmark_asgi.py
+import asyncio
+import json
+import logging
+import os
+import queue
+import statistics
+import tempfile
+import threading
+import time
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.contrib.auth.hashers import make_password
+from django.db import close_old_connections, connection
+from django.test import AsyncClient, Client, override_settings
+from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from quiz_api.executors import cpu_executor, executor_stats, orm_executor
+from quiz_api.models import User, Subject
+from quiz_api.schema import schema
+from quiz_api.views import AsyncGraphQLView, CustomGraphQLView
+
+from ._benchmark import BenchmarkCommand, make_users
+
+# Both views side by side; the benchmark points ROOT_URLCONF at this module
+urlpatterns = [
+    path('sync/graphql/', csrf_exempt(CustomGraphQLView.as_view(schema=schema))),
+    path('async/graphql/', csrf_exempt(AsyncGraphQLView.as_view(schema=schema))),
+]
+
+PASSWORD = 'benchmark-password'
+LOGIN = 'mutation Login($email: String!, $password: String!) { login(email: $email, password: $password) { success token } }'
+SUBJECTS = 'query Subjects { allSubjects { id name } }'
+
+
+class Command(BenchmarkCommand):
+    help = ('Compare the WSGI GraphQL path with the ASGI one (sync view and async view) '
+            'on a mix of logins (password hashing) and cheap queries')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300)
+        parser.add_argument('--login-share', type=float, default=0.1,
+                            help='Fraction of requests that are login mutations')
+        parser.add_argument('--wsgi-threads', type=int, default=4,
+                            help='Threads of the simulated WSGI worker, i.e. its in-flight limit')
+        parser.add_argument('--concurrency', type=int, default=64,
+                            help='Requests the client keeps open against each server')
+
+    def handle(self, *args, **options):
+        # Pool threads need a database they can all open
+        if connection.vendor == 'sqlite':
+            connection.settings_dict['TEST']['NAME'] = os.path.join(tempfile.gettempdir(), 'benchmark_asgi.sqlite3')
+        super().handle(*args, **options)
+
+    def run_benchmark(self, requests, login_share, wsgi_threads, concurrency, **options):
+        teacher = make_users(1, role='teacher')[0]
+        students = make_users(50)
+        User.objects.update(password=make_password(PASSWORD))
+        Subject.objects.bulk_create([Subject(name=f'Subject {i}', created_by=teacher) for i in range(20)])
+        tokens = [f'Bearer {RefreshToken.for_user(student).access_token}' for student in students]
+
+        every = max(1, round(1 / login_share)) if login_share else 0
+        workload = []
+        for i in range(requests):
+            student = students[i % len(students)]
+            if every and i % every == 0:
+                workload.append(('login', {'query': LOGIN, 'variables': {'email': student.email, 'password': PASSWORD}}, None))
+            else:
+                workload.append(('query', {'query': SUBJECTS}, tokens[i % len(tokens)]))
+        self.stdout.write(f'{requests} requests, {sum(kind == "login" for kind, _, _ in workload)} logins, '
+                          f'ORM pool {orm_executor.max_workers} threads, CPU pool {cpu_executor.max_workers} threads')
+
+        # One access record per request would drown the results
+        logging.getLogger('quiz_api.requests').setLevel(logging.WARNING)
+        with override_settings(ROOT_URLCONF=__name__):
+            self.report(f'WSGI, {wsgi_threads} threads', wsgi_threads,
+                        *self.run_wsgi('/sync/graphql/', workload, wsgi_threads, concurrency))
+            self.report(f'ASGI, sync view', concurrency,
+                        *asyncio.run(self.run_asgi('/sync/graphql/', workload, concurrency)))
+            self.report(f'ASGI, async view', concurrency,
+                        *asyncio.run(self.run_asgi('/async/graphql/', workload, concurrency)))
+        for stats in executor_stats():
+            self.stdout.write(f"  {stats['name']}: {stats['submitted']} tasks, "
+                              f"max {stats['max_active']} running / {stats['max_queued']} queued")
+
+    def run_wsgi(self, url, workload, threads, concurrency):
+        # The client keeps ``concurrency`` requests open like the ASGI run; the
+        # worker serves ``threads`` of them at a time and the rest wait in its backlog
+        pending = queue.Queue()
+        for item in workload:
+            pending.put(item)
+        server = threading.Semaphore(threads)
+        results = []
+
+        def client_loop():
+            client = Client()
+            while True:
+                try:
+                    kind, body, token = pending.get_nowait()
+                except queue.Empty:
+                    return
+                headers = {'Authorization': token} if token else {}
+                started = time.perf_counter()
+                with server:
+                    response = client.post(url, json.dumps(body), content_type='application/json', headers=headers)
+                    # The test client skips the request_finished cleanup a server does
+                    close_old_connections()
+                results.append((kind, time.perf_counter() - started, self.ok(response.json())))
+
+        started = time.perf_counter()
+        clients = [threading.Thread(target=client_loop) for _ in range(concurrency)]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        return results, time.perf_counter() - started
+
+    async def run_asgi(self, url, workload, concurrency):
+        client = AsyncClient()
+        slots = asyncio.Semaphore(concurrency)
+        results = []
+
+        async def send(kind, body, token):
+            async with slots:
+                headers = {'Authorization': token} if token else {}
+                started = time.perf_counter()
+                # As ASGIHandler does: sync code of one request shares one thread
+                async with ThreadSensitiveContext():
+                    response = await client.post(url, json.dumps(body), content_type='application/json',
+                                                 headers=headers)
+                    await sync_to_async(close_old_connections)()
+                results.append((kind, time.perf_counter() - started, self.ok(response.json())))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(send(*item) for item in workload))
+        return results, time.perf_counter() - started
+
+    @staticmethod
+    def ok(payload):
+        data = payload.get('data') or {}
+        return not payload.get('errors') and (data.get('login') or {}).get('success', True)
+
+    def report(self, label, in_flight, results, elapsed):
+        line = f'{label}: {len(results) / elapsed:.1f} req/s, up to {in_flight} in flight'
+        for kind in ('login', 'query'):
+            latencies = sorted(seconds for k, seconds, _ in results if k == kind)
+            if latencies:
+                p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+                line += (f', {kind} p50 {statistics.median(latencies) * 1000:.0f} ms'
+                         f' / p95 {p95 * 1000:.0f} ms')
+        failures = sum(not ok for _, _, ok in results)
+        if failures:
+            line += f', {failures} failed'
+        self.stdout.write(line)
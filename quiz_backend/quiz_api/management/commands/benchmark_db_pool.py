@@ -0,0 +1,81 @@
+# quiz_api/management/commands/benchmark_db_pool.py
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.db.utils import load_backend
+
+from quiz_api.db_backends.pool import get_pool
+
+
+class Command(BaseCommand):
+    help = ('Run short request-like units of work on many threads against the configured database '
+            'with a connection per request, persistent connections and the connection pool')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--requests', type=int, default=200, help='Requests per thread')
+        parser.add_argument('--queries', type=int, default=3, help='Queries per request')
+        parser.add_argument('--pool-size', type=int, default=4)
+
+    def handle(self, threads, requests, queries, pool_size, **options):
+        base = dict(connection.settings_dict)
+        stock = base['ENGINE'].replace('quiz_api.db_backends.', 'django.db.backends.')
+        self.stdout.write(f'{base["ENGINE"].rsplit(".", 1)[-1]} database {base["NAME"]}: '
+                          f'{threads} threads x {requests} requests x {queries} queries')
+        modes = [
+            ('connection per request', {'ENGINE': stock, 'CONN_MAX_AGE': 0}),
+            ('persistent', {'ENGINE': stock, 'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True}),
+            (f'pooled ({pool_size})', {'ENGINE': stock.replace('django.db.backends.', 'quiz_api.db_backends.'),
+                                       'CONN_MAX_AGE': 0, 'POOL': {'MAX_SIZE': pool_size, 'TIMEOUT': 30}}),
+        ]
+        for n, (label, overrides) in enumerate(modes):
+            settings_dict = {**base, **overrides}
+            self.run_mode(label, f'benchmark_{n}', settings_dict, threads, requests, queries)
+
+    def run_mode(self, label, alias, settings_dict, threads, requests, queries):
+        backend = load_backend(settings_dict['ENGINE'])
+        connects = []
+
+        def count(sender, connection, **kwargs):
+            if connection.alias == alias:
+                connects.append(1)
+
+        def worker():
+            db = backend.DatabaseWrapper(dict(settings_dict), alias)
+            for _ in range(requests):
+                # What the request_started / request_finished handlers do
+                db.close_if_unusable_or_obsolete()
+                for _ in range(queries):
+                    with db.cursor() as cursor:
+                        cursor.execute('SELECT 1')
+                        cursor.fetchone()
+                db.close_if_unusable_or_obsolete()
+            db.close()
+
+        connection_created.connect(count)
+        try:
+            started = time.perf_counter()
+            workers = [threading.Thread(target=worker) for _ in range(threads)]
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+            elapsed = time.perf_counter() - started
+        finally:
+            connection_created.disconnect(count)
+
+        line = f'{label}: {threads * requests / elapsed:.0f} req/s'
+        if 'POOL' in settings_dict:
+            pool = get_pool(alias, settings_dict)
+            stats = pool.stats()
+            pool.close_idle()
+            line += (f', {stats["created"]} connections opened, peak {stats["peak_in_use"]} in use / '
+                     f'{stats["peak_waiting"]} waiting, {stats["waits"]} waits '
+                     f'(avg {stats["average_wait_ms"]:.2f} ms, max {stats["max_wait_ms"]:.1f} ms), '
+                     f'{stats["timeouts"]} timeouts')
+        else:
+            line += f', {len(connects)} connections opened'
+        self.stdout.write(line)
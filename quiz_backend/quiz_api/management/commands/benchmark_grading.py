@@ -0,0 +1,57 @@
+# quiz_api/management/commands/benchmark_grading.py
+import json
+
+from django.test import override_settings
+
+from quiz_api.grading_queue import process_next_job
+from quiz_api.models import Choice
+
+from ._benchmark import BenchmarkCommand, make_users, make_quiz, graphql
+
+MUTATION = """
+mutation ($quizId: String!, $answers: [JSONString], $defer: Boolean) {
+  submitQuiz(quizId: $quizId, answers: $answers, timeTaken: 120, deferGrading: $defer) {
+    success message attempt { id score correctAnswers percentage gradingStatus }
+  }
+}
+"""
+
+
+class Command(BenchmarkCommand):
+    help = 'Measure submitQuiz queries and time as the number of questions grows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, nargs='+', default=[10, 50, 200])
+        parser.add_argument('--submissions', type=int, default=5,
+                            help='Submissions measured per quiz size (first one is discarded)')
+        parser.add_argument('--defer', action='store_true',
+                            help='Submit with deferGrading and time only the enqueue')
+
+    # Queued submissions are graded inline below rather than by worker threads
+    @override_settings(GRADING_WORKERS=0)
+    def run_benchmark(self, questions, submissions, defer, **options):
+        teacher = make_users(1, role='teacher')[0]
+        students = make_users(submissions)
+
+        self.stdout.write(f'{"questions":>9} {"queries":>8} {"ms/submit":>10}')
+        for count in questions:
+            quiz = make_quiz(teacher, questions=count)
+            choices = Choice.objects.filter(question__quiz=quiz, is_correct=True)
+            answers = [
+                json.dumps({'questionId': str(choice.question_id), 'choiceId': str(choice.id)})
+                for choice in choices
+            ]
+            timings = []
+            for student in students:
+                payload, queries, elapsed = graphql(
+                    student, MUTATION, {'quizId': str(quiz.id), 'answers': answers, 'defer': defer})
+                result = payload.get('data', {}).get('submitQuiz') or {}
+                if not result.get('success'):
+                    self.stderr.write(str(payload))
+                    return
+                timings.append(elapsed)
+            while process_next_job():
+                pass
+            steady = timings[1:] or timings
+            self.stdout.write(
+                f'{count:>9} {queries:>8} {sum(steady) / len(steady) * 1000:>10.1f}')
@@ -0,0 +1,44 @@
+# quiz_api/management/commands/benchmark_loaders.py
+from quiz_api.models import Subject
+
+from ._benchmark import BenchmarkCommand, make_users, make_quiz, make_attempts, graphql
+
+QUERY = """
+query {
+  allQuizzes {
+    id title
+    createdBy { email }
+    questions { id questionText choices { id choiceText } }
+    attempts { id quizTitle studentName studentEmail }
+  }
+}
+"""
+
+
+class Command(BenchmarkCommand):
+    help = 'Show that nested allQuizzes fields cost a flat number of SQL queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1,10,50,100',
+                            help='Comma separated quiz counts to measure')
+        parser.add_argument('--questions', type=int, default=10)
+        parser.add_argument('--students', type=int, default=5)
+
+    def run_benchmark(self, sizes, questions, students, **options):
+        admin = make_users(1, role='admin')[0]
+        teacher = make_users(1, role='teacher')[0]
+        learners = make_users(students)
+        subject = Subject.objects.create(name='Benchmark', created_by=teacher)
+
+        created = 0
+        self.stdout.write(f'{"quizzes":>8} {"queries":>8} {"seconds":>8}')
+        for size in sorted(int(s) for s in sizes.split(',')):
+            while created < size:
+                quiz = make_quiz(teacher, subject, questions=questions, title=f'Quiz {created}')
+                make_attempts(quiz, learners)
+                created += 1
+            payload, queries, elapsed = graphql(admin, QUERY)
+            if payload.get('errors'):
+                self.stderr.write(str(payload['errors']))
+                return
+            self.stdout.write(f'{size:>8} {queries:>8} {elapsed:>8.3f}')
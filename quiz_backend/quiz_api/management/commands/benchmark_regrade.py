@@ -0,0 +1,95 @@
+# quiz_api/management/commands/benchmark_regrade.py
+import time
+
+from django.db import connection
+from django.db.models import Case, Value, When
+from django.test import override_settings
+
+from quiz_api.grading import AnswerKey
+from quiz_api.models import Choice, QuizAttempt, Answer, RegradeJob
+from quiz_api.regrade import enqueue_regrade, process_next_regrade
+
+from ._benchmark import BenchmarkCommand, make_users, make_quiz, make_attempts
+
+
+class Command(BenchmarkCommand):
+    help = 'Measure a whole-quiz regrade after the answer key changes, against per-row saves'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--answers', type=int, default=1000000)
+        parser.add_argument('--questions', type=int, default=50)
+        parser.add_argument('--students', type=int, default=1000)
+        parser.add_argument('--baseline', type=int, default=200,
+                            help='Attempts regraded row by row with save() to estimate the old cost')
+        parser.add_argument('--sample', type=int, default=200,
+                            help='Attempts checked against an in-memory regrade afterwards')
+
+    # The regrade runs inline below rather than on worker threads
+    @override_settings(GRADING_WORKERS=0)
+    def run_benchmark(self, answers, questions, students, baseline, sample, **options):
+        teacher = make_users(1, role='teacher')[0]
+        learners = make_users(students)
+        quiz = make_quiz(teacher, questions=questions)
+
+        attempts = answers // questions
+        started = time.perf_counter()
+        created = 0
+        while created < attempts:
+            chunk = min(5000, attempts - created)
+            make_attempts(quiz, [learners[(created + i) % students] for i in range(chunk)])
+            created += chunk
+        self.stdout.write(f'Created {attempts} attempts / {attempts * questions} answers '
+                          f'in {time.perf_counter() - started:.1f}s')
+
+        # Fix the key: the last choice (picked by every wrong answer) becomes the correct one
+        Choice.objects.filter(question__quiz=quiz).update(
+            is_correct=Case(When(order=3, then=Value(True)), default=Value(False)))
+
+        if baseline:
+            key = AnswerKey(quiz.id)
+            started = time.perf_counter()
+            for attempt in QuizAttempt.objects.filter(quiz=quiz)[:baseline]:
+                score = correct = 0
+                for answer in attempt.answers.all():
+                    answer.is_correct = answer.selected_choice_id in key.correct[answer.question_id]
+                    answer.points_earned = key.points[answer.question_id] if answer.is_correct else 0
+                    answer.save()
+                    score += answer.points_earned
+                    correct += answer.is_correct
+                attempt.score, attempt.correct_answers = score, correct
+                attempt.save()
+            per_attempt = (time.perf_counter() - started) / baseline
+            self.stdout.write(f'Row by row: {per_attempt * 1000:.1f} ms/attempt, '
+                              f'~{per_attempt * attempts:.0f}s estimated for the whole quiz')
+
+        job = enqueue_regrade(quiz.id)
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            started = time.perf_counter()
+            process_next_regrade()
+            elapsed = time.perf_counter() - started
+        job.refresh_from_db()
+        self.stdout.write(f'Set-based: {elapsed:.1f}s, {len(queries)} queries, status {job.status}, '
+                          f'{job.processed_attempts}/{job.total_attempts} attempts')
+
+        key = AnswerKey(quiz.id)
+        mismatches = 0
+        for attempt in QuizAttempt.objects.filter(quiz=quiz).order_by('?')[:sample]:
+            expected = attempt.correct_answers
+            stored = list(Answer.objects.filter(attempt=attempt).values_list('question_id', 'selected_choice_id', 'is_correct'))
+            correct = sum(choice_id in key.correct[question_id] for question_id, choice_id, _ in stored)
+            check = QuizAttempt(total_questions=attempt.total_questions, correct_answers=correct)
+            if (expected != correct or attempt.score != correct
+                    or attempt.percentage != check.calculate_percentage()
+                    or attempt.status != check.determine_status()
+                    or any(is_correct != (choice_id in key.correct[question_id])
+                           for question_id, choice_id, is_correct in stored)):
+                mismatches += 1
+        self.stdout.write(f'{mismatches} of {min(sample, attempts)} sampled attempts differ from an in-memory regrade')
+        if job.status != RegradeJob.DONE:
+            self.stderr.write(job.error)
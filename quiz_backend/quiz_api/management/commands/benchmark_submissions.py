@@ -0,0 +1,73 @@
+# quiz_api/management/commands/benchmark_submissions.py
+import json
+import os
+import tempfile
+import threading
+import time
+
+from django.db import connection, connections
+from django.test import Client, override_settings
+
+from quiz_api.batching import submission_coalescer
+from quiz_api.models import Choice, QuizAttempt
+
+from ._benchmark import BenchmarkCommand, make_users, make_quiz, graphql
+from .benchmark_grading import MUTATION
+
+
+class Command(BenchmarkCommand):
+    help = 'Fire concurrent submitQuiz requests with and without group commit'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=100)
+        parser.add_argument('--questions', type=int, default=20)
+        parser.add_argument('--windows', type=int, nargs='+', default=[0, 20],
+                            help='SUBMISSION_BATCH_WINDOW_MS values to compare')
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite':
+            # Request threads need a shared on-disk database; in-memory test
+            # databases lock whole tables and fail instead of waiting.
+            connection.settings_dict['TEST']['NAME'] = os.path.join(
+                tempfile.gettempdir(), 'quiz_benchmark_submissions.sqlite3')
+        super().handle(*args, **options)
+
+    def run_benchmark(self, students, questions, windows, **options):
+        teacher = make_users(1, role='teacher')[0]
+        learners = make_users(students)
+
+        self.stdout.write(f'{"window ms":>9} {"ok":>5} {"failed":>6} {"seconds":>8} '
+                          f'{"batches":>7} {"avg size":>8} {"avg wait ms":>11}')
+        for window in windows:
+            quiz = make_quiz(teacher, questions=questions)
+            answers = [
+                json.dumps({'questionId': str(choice.question_id), 'choiceId': str(choice.id)})
+                for choice in Choice.objects.filter(question__quiz=quiz, is_correct=True)
+            ]
+            results = []
+
+            def submit(student):
+                try:
+                    payload = graphql(student, MUTATION, {'quizId': str(quiz.id), 'answers': answers},
+                                      client=Client())[0]
+                    results.append(bool((payload.get('data') or {}).get('submitQuiz', {}).get('success')))
+                finally:
+                    connections.close_all()
+
+            threads = [threading.Thread(target=submit, args=(student,)) for student in learners]
+            with override_settings(SUBMISSION_BATCH_WINDOW_MS=window):
+                submission_coalescer.reset_stats()
+                started = time.perf_counter()
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                elapsed = time.perf_counter() - started
+            stats = submission_coalescer.stats()
+            stored = QuizAttempt.objects.filter(quiz=quiz).count()
+            ok = sum(results)
+            self.stdout.write(
+                f'{window:>9} {ok:>5} {students - ok:>6} {elapsed:>8.2f} {stats["batches"]:>7} '
+                f'{stats["average_batch_size"]:>8.1f} {stats["average_wait_ms"]:>11.1f}')
+            if stored != ok:
+                self.stderr.write(f'{stored} attempts stored for {ok} successful submits')
@@ -0,0 +1,17 @@
+# quiz_api/management/commands/build_exam_snapshots.py
+from django.core.management.base import BaseCommand
+
+from quiz_api.models import Quiz, ExamSnapshot
+from quiz_api.snapshots import build_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Compile exam snapshots for every published quiz and drop those of unpublished ones'
+
+    def handle(self, *args, **options):
+        quizzes = Quiz.objects.filter(is_published=True)
+        for quiz in quizzes:
+            build_snapshot(quiz)
+        dropped, _ = ExamSnapshot.objects.filter(quiz__is_published=False).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'Built {quizzes.count()} snapshots, dropped {dropped}'))
@@ -0,0 +1,17 @@
+# quiz_api/management/commands/rebuild_analytics.py
+from django.core.management.base import BaseCommand
+
+from quiz_api.analytics import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the QuizStats / QuestionStats rollups from attempt and answer history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quiz', action='append', dest='quiz_ids',
+                            help='Only rebuild this quiz id (may be repeated)')
+
+    def handle(self, *args, quiz_ids=None, **options):
+        quizzes, questions = rebuild_rollups(quiz_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt stats for {quizzes} quizzes and {questions} questions'))
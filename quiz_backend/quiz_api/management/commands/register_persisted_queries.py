@@ -0,0 +1,36 @@
+# quiz_api/management/commands/register_persisted_queries.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from graphql import GraphQLError, parse, validate
+
+from quiz_api.persisted import load_manifest, register, PersistedQueryError
+from quiz_api.schema import schema
+
+
+class Command(BaseCommand):
+    help = 'Register GraphQL queries from a persisted query manifest (JSON)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('manifest', help='Path to the manifest JSON file')
+
+    def handle(self, manifest, **options):
+        try:
+            with open(manifest) as fh:
+                entries = list(load_manifest(json.load(fh)))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            raise CommandError(f'Could not read manifest: {e}')
+
+        for sha256, query, operation_name in entries:
+            try:
+                errors = validate(schema.graphql_schema, parse(query))
+            except GraphQLError as e:
+                errors = [e]
+            if errors:
+                raise CommandError(f'Invalid query {operation_name or sha256}: {errors[0].message}')
+            try:
+                digest = register(query, sha256, operation_name)
+            except PersistedQueryError as e:
+                raise CommandError(f'{operation_name or sha256}: {e.message}')
+            self.stdout.write(f'{digest} {operation_name}')
+        self.stdout.write(self.style.SUCCESS(f'Registered {len(entries)} queries'))
@@ -0,0 +1,32 @@
+# quiz_api/management/commands/run_grading_workers.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from quiz_api.grading_queue import grading_pool, process_next_task
+
+
+class Command(BaseCommand):
+    help = 'Grade queued (deferred) quiz submissions and run queued regrades until interrupted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Worker threads (default: GRADING_WORKERS)')
+        parser.add_argument('--drain', action='store_true',
+                            help='Grade everything queued, then exit')
+
+    def handle(self, *args, workers=None, drain=False, **options):
+        if drain:
+            done = 0
+            while process_next_task():
+                done += 1
+            self.stdout.write(self.style.SUCCESS(f'Ran {done} queued grading and regrade jobs'))
+            return
+
+        grading_pool.start(workers)
+        self.stdout.write('Grading workers running; press Ctrl+C to stop')
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            grading_pool.stop()
@@ -1,42 +1,81 @@
 # quiz_api/middleware.py
-from rest_framework_simplejwt.authentication import JWTAuthentication
+import time
+import uuid
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.utils.deprecation import MiddlewareMixin
-from django.contrib.auth.models import AnonymousUser
 import logging
 
+from .authentication import authenticate_request
+from .executors import orm_executor
+from .logs import request_id_var, operation_name_var
+
 logger = logging.getLogger(__name__)
+access_logger = logging.getLogger('quiz_api.requests')
+
+class RequestContextMiddleware:
+    """
+    Give every request an id (the client's X-Request-ID, or a new one) that
+    is attached to all of its log records and echoed in the response, and
+    log one access record per request (sampled, see LOG_SAMPLE_RATES).
+    Works on both the WSGI and the ASGI handler.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        tokens, started = self.start(request)
+        try:
+            return self.finish(request, self.get_response(request), started)
+        finally:
+            self.reset(tokens)
+
+    async def __acall__(self, request):
+        tokens, started = self.start(request)
+        try:
+            return self.finish(request, await self.get_response(request), started)
+        finally:
+            self.reset(tokens)
+
+    def start(self, request):
+        request.request_id = (request.headers.get('X-Request-ID') or uuid.uuid4().hex)[:64]
+        return (request_id_var.set(request.request_id), operation_name_var.set(None)), time.perf_counter()
+
+    def finish(self, request, response, started):
+        response['X-Request-ID'] = request.request_id
+        access_logger.info(
+            '%s %s %s', request.method, request.path, response.status_code,
+            extra={'status': response.status_code, 'duration_ms': round((time.perf_counter() - started) * 1000, 2)},
+        )
+        return response
+
+    def reset(self, tokens):
+        request_id_var.reset(tokens[0])
+        operation_name_var.reset(tokens[1])
 
 class JWTAuthenticationMiddleware(MiddlewareMixin):
     """
     Try to authenticate the incoming request using SimpleJWT.
     If successful, put the user on request.user so GraphQL resolvers (info.context.user)
-    see the authenticated user.
+    see the authenticated user. Runs after AuthenticationMiddleware, so requests
+    without a bearer token keep their session user (e.g. the admin site).
     """
-    def __init__(self, get_response=None):
-        super().__init__(get_response)
-        self.auth = JWTAuthentication()
 
-    def __call__(self, request):
-        try:
-            # Log the authorization header for debugging
-            auth_header = request.META.get('HTTP_AUTHORIZATION', '')
-            if auth_header:
-                logger.info(f"Authorization header found: {auth_header[:20]}...")
-            
-            user_auth_tuple = self.auth.authenticate(request)
-            if user_auth_tuple is not None:
-                user, validated_token = user_auth_tuple
-                request.user = user
-                logger.info(f"User authenticated: {user.email} (role: {user.role})")
-            else:
-                logger.info("No authentication tuple returned")
-                if not hasattr(request, 'user'):
-                    request.user = AnonymousUser()
-        except Exception as e:
-            # Log the exception for debugging
-            logger.error(f"JWT Authentication failed: {str(e)}")
-            if not hasattr(request, 'user'):
-                request.user = AnonymousUser()
-        
-        response = self.get_response(request)
-        return response
\ No newline at end of file
+    def process_request(self, request):
+        user_auth_tuple = authenticate_request(request)
+        if user_auth_tuple is not None:
+            user, validated_token = user_auth_tuple
+            request.user = user
+            logger.debug('User authenticated: %s (role: %s)', user.pk, user.role)
+
+    async def __acall__(self, request):
+        # Under ASGI a principal cache miss queries on the ORM pool, like the rest of the request
+        await orm_executor.run(self.process_request, request)
+        return await self.get_response(request)
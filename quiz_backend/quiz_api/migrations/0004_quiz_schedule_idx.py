@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz_api', '0003_user_is_approved'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(fields=['is_published', 'scheduled_start', 'scheduled_end'], name='quiz_schedule_idx'),
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:18
+
+from django.db import migrations, models
+from django.db.models import Count, F, Max, Min, Q, Sum
+import django.db.models.deletion
+
+
+# QuizAttempt.PASS_PERCENTAGE when the rollups were introduced
+PASS_PERCENTAGE = 60
+
+
+def backfill_rollups(apps, schema_editor):
+    """Seed the rollups from existing attempts; submits only add increments to them"""
+    QuizAttempt = apps.get_model('quiz_api', 'QuizAttempt')
+    Answer = apps.get_model('quiz_api', 'Answer')
+    QuizStats = apps.get_model('quiz_api', 'QuizStats')
+    QuestionStats = apps.get_model('quiz_api', 'QuestionStats')
+    db = schema_editor.connection.alias
+
+    quiz_rows = QuizAttempt.objects.using(db).order_by().values('quiz_id').annotate(
+        attempt_count=Count('pk'),
+        student_count=Count('user', distinct=True),
+        pass_count=Count('pk', filter=Q(percentage__gte=PASS_PERCENTAGE)),
+        score_sum=Sum('score'),
+        score_sq_sum=Sum(F('score') * F('score')),
+        min_score=Min('score'),
+        max_score=Max('score'),
+        timed_attempt_count=Count('pk', filter=Q(time_taken__gt=0)),
+        time_taken_sum=Sum('time_taken', filter=Q(time_taken__gt=0), default=0),
+    )
+    QuizStats.objects.using(db).bulk_create([QuizStats(**row) for row in quiz_rows], batch_size=1000)
+    question_rows = Answer.objects.using(db).order_by().values('question_id').annotate(
+        answer_count=Count('pk'),
+        correct_count=Count('pk', filter=Q(is_correct=True)),
+    )
+    QuestionStats.objects.using(db).bulk_create([QuestionStats(**row) for row in question_rows], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz_api', '0004_quiz_schedule_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionStats',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='quiz_api.question')),
+                ('answer_count', models.IntegerField(default=0)),
+                ('correct_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Question stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='QuizStats',
+            fields=[
+                ('quiz', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='quiz_api.quiz')),
+                ('attempt_count', models.IntegerField(default=0)),
+                ('student_count', models.IntegerField(default=0)),
+                ('pass_count', models.IntegerField(default=0)),
+                ('score_sum', models.FloatField(default=0)),
+                ('score_sq_sum', models.FloatField(default=0)),
+                ('min_score', models.FloatField(blank=True, null=True)),
+                ('max_score', models.FloatField(blank=True, null=True)),
+                ('timed_attempt_count', models.IntegerField(default=0)),
+                ('time_taken_sum', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Quiz stats',
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz_api', '0006_persisted_queries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamSnapshot',
+            fields=[
+                ('quiz', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='snapshot', serialize=False, to='quiz_api.quiz')),
+                ('etag', models.CharField(max_length=64)),
+                ('blob', models.BinaryField()),
+                ('scheduled_start', models.DateTimeField(blank=True, null=True)),
+                ('scheduled_end', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:56
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz_api', '0010_regrade_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='content_version',
+            field=models.UUIDField(default=uuid.uuid4, editable=False),
+        ),
+    ]
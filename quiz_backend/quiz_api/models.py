@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Count, ExpressionWrapper, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, NullIf
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 import uuid
@@ -24,6 +26,19 @@ class User(AbstractUser):
     
     class Meta:
         ordering = ['-created_at']
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Role, approval, suspension and password live in the cached principal
+        from .authentication import invalidate_principal
+        invalidate_principal(self.pk)
+    
+    def delete(self, *args, **kwargs):
+        pk = self.pk
+        result = super().delete(*args, **kwargs)
+        from .authentication import invalidate_principal
+        invalidate_principal(pk)
+        return result
 
 class Subject(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -35,6 +50,38 @@ class Subject(models.Model):
     class Meta:
         ordering = ['name']
 
+class QuizQuerySet(models.QuerySet):
+    def available(self, now=None):
+        """Published quizzes whose scheduled window is open (NULL means open)"""
+        now = now or timezone.now()
+        return self.filter(
+            Q(scheduled_start__isnull=True) | Q(scheduled_start__lte=now),
+            Q(scheduled_end__isnull=True) | Q(scheduled_end__gte=now),
+            is_published=True,
+        )
+    
+    def with_stats(self, *names):
+        """
+        Annotate per-quiz statistics computed in SQL (all of them by default).
+        Attempt statistics are read from the QuizStats rollup row.
+        """
+        stats = {
+            'question_count': lambda: _per_quiz(Question, Count('pk'), 0),
+            'attempt_count': lambda: Coalesce(F('stats__attempt_count'), 0),
+            'unique_students': lambda: Coalesce(F('stats__student_count'), 0),
+            'pass_count': lambda: Coalesce(F('stats__pass_count'), 0),
+            'average_score': lambda: Coalesce(ExpressionWrapper(
+                F('stats__score_sum') / NullIf(F('stats__attempt_count'), 0),
+                output_field=models.FloatField()), 0.0),
+        }
+        return self.annotate(**{name: stats[name]() for name in names or stats})
+
+def _per_quiz(model, aggregate, default, **filters):
+    """Correlated subquery aggregating ``model`` rows of the outer quiz"""
+    rows = (model.objects.filter(quiz=OuterRef('pk'), **filters).order_by()
+            .values('quiz').annotate(value=aggregate).values('value'))
+    return Coalesce(Subquery(rows), Value(default))
+
 class Quiz(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     title = models.CharField(max_length=200)
@@ -51,13 +98,41 @@ class Quiz(models.Model):
     show_score = models.BooleanField(default=True, help_text="Show score to students")
     randomize_questions = models.BooleanField(default=False)
     randomize_choices = models.BooleanField(default=False)
+    # Renewed by every write to the quiz, its questions or their choices;
+    # cached quizDetail trees are keyed by it
+    content_version = models.UUIDField(default=uuid.uuid4, editable=False)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = QuizQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = 'Quizzes'
+        indexes = [
+            models.Index(fields=['is_published', 'scheduled_start', 'scheduled_end'],
+                         name='quiz_schedule_idx'),
+        ]
+    
+    def save(self, *args, **kwargs):
+        self.content_version = uuid.uuid4()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'content_version'}
+        super().save(*args, **kwargs)
+        from .cache import invalidate_available_quizzes
+        from .snapshots import sync_snapshot
+        invalidate_available_quizzes()
+        sync_snapshot(self.pk)
+    
+    def delete(self, *args, **kwargs):
+        pk = self.pk
+        result = super().delete(*args, **kwargs)
+        from .cache import invalidate_available_quizzes
+        from .snapshots import sync_snapshot
+        invalidate_available_quizzes()
+        sync_snapshot(pk)
+        return result
     
     def is_available_now(self):
         """Check if quiz is available for students right now"""
@@ -99,6 +174,17 @@ class Question(models.Model):
     
     class Meta:
         ordering = ['order']
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .cache import quiz_content_changed
+        quiz_content_changed(self.quiz_id)
+    
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        from .cache import quiz_content_changed
+        quiz_content_changed(self.quiz_id)
+        return result
 
 class Choice(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -109,6 +195,17 @@ class Choice(models.Model):
     
     class Meta:
         ordering = ['order']
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .cache import quiz_content_changed
+        quiz_content_changed(self.question.quiz_id)
+    
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        from .cache import quiz_content_changed
+        quiz_content_changed(self.question.quiz_id)
+        return result
 
 class QuizAttempt(models.Model):
     STATUS_CHOICES = (
@@ -118,6 +215,16 @@ class QuizAttempt(models.Model):
         ('fair', 'Fair'),
         ('poor', 'Poor'),
     )
+    PASS_PERCENTAGE = 60
+    
+    GRADING_PENDING = 'pending'
+    GRADED = 'graded'
+    GRADING_FAILED = 'failed'
+    GRADING_STATUS_CHOICES = (
+        (GRADING_PENDING, 'Pending'),
+        (GRADED, 'Graded'),
+        (GRADING_FAILED, 'Failed'),
+    )
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='quiz_attempts')
@@ -129,6 +236,7 @@ class QuizAttempt(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='fair')
     time_taken = models.IntegerField(help_text="Time taken in seconds", default=0)
     completed_at = models.DateTimeField(auto_now_add=True)
+    grading_status = models.CharField(max_length=10, choices=GRADING_STATUS_CHOICES, default=GRADED)
     
     class Meta:
         ordering = ['-completed_at']
@@ -166,4 +274,151 @@ class Answer(models.Model):
     points_earned = models.IntegerField(default=0)
     
     class Meta:
-        ordering = ['question__order']
\ No newline at end of file
+        ordering = ['question__order']
+
+class QuizStats(models.Model):
+    """Running attempt totals for a quiz, updated on every submission"""
+    quiz = models.OneToOneField(Quiz, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    attempt_count = models.IntegerField(default=0)
+    student_count = models.IntegerField(default=0)
+    pass_count = models.IntegerField(default=0)
+    score_sum = models.FloatField(default=0)
+    score_sq_sum = models.FloatField(default=0)
+    min_score = models.FloatField(null=True, blank=True)
+    max_score = models.FloatField(null=True, blank=True)
+    timed_attempt_count = models.IntegerField(default=0)
+    time_taken_sum = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = 'Quiz stats'
+    
+    @property
+    def average_score(self):
+        return self.score_sum / self.attempt_count if self.attempt_count else 0
+    
+    @property
+    def score_stddev(self):
+        if not self.attempt_count:
+            return 0
+        mean = self.average_score
+        return max(0, self.score_sq_sum / self.attempt_count - mean * mean) ** 0.5
+    
+    @property
+    def pass_rate(self):
+        return (self.pass_count / self.attempt_count) * 100 if self.attempt_count else 0
+    
+    @property
+    def average_completion_time(self):
+        return self.time_taken_sum / self.timed_attempt_count if self.timed_attempt_count else 0
+
+class QuestionStats(models.Model):
+    """Running answer totals for a question, updated on every submission"""
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    answer_count = models.IntegerField(default=0)
+    correct_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = 'Question stats'
+
+class PersistedQuery(models.Model):
+    """GraphQL query text registered under its SHA-256 hash"""
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    query = models.TextField()
+    operation_name = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+
+class ExamSnapshot(models.Model):
+    """Gzipped JSON exam package of a published quiz, without correct answers"""
+    quiz = models.OneToOneField(Quiz, on_delete=models.CASCADE, primary_key=True, related_name='snapshot')
+    etag = models.CharField(max_length=64)
+    blob = models.BinaryField()
+    scheduled_start = models.DateTimeField(null=True, blank=True)
+    scheduled_end = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now=True)
+    
+    def is_available_now(self):
+        """Same window check as Quiz.is_available_now; only published quizzes have snapshots"""
+        now = timezone.now()
+        if self.scheduled_start and now < self.scheduled_start:
+            return False
+        if self.scheduled_end and now > self.scheduled_end:
+            return False
+        return True
+
+class GradingJob(models.Model):
+    """Raw answers of a deferred submission, waiting in the DB-backed grading queue"""
+    attempt = models.OneToOneField(QuizAttempt, on_delete=models.CASCADE, primary_key=True, related_name='grading_job')
+    answers = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Lease taken by the worker grading it; expired leases are picked up again
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    tries = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    
+    class Meta:
+        ordering = ['created_at']
+
+class RegradeJob(models.Model):
+    """Background recomputation of stored grades after the answer key of a quiz changed"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='regrade_jobs')
+    # Only answers to this question are regraded; null regrades the whole quiz
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, null=True, blank=True)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    total_attempts = models.IntegerField(default=0)
+    processed_attempts = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Lease of the running worker, renewed after every chunk
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    tries = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    
+    class Meta:
+        ordering = ['created_at']
+    
+    @property
+    def progress(self):
+        if self.status == self.DONE:
+            return 1.0
+        return self.processed_attempts / self.total_attempts if self.total_attempts else 0.0
+
+class AttemptSession(models.Model):
+    """An attempt in progress, opened when a student starts a quiz and closed by its submission"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='attempt_sessions')
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='attempt_sessions')
+    started_at = models.DateTimeField(auto_now_add=True)
+    submitted_at = models.DateTimeField(null=True, blank=True)
+    attempt = models.OneToOneField(QuizAttempt, on_delete=models.SET_NULL, null=True, blank=True, related_name='session')
+    
+    class Meta:
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['user', 'quiz', 'submitted_at'], name='attempt_session_open_idx'),
+        ]
+
+class SavedAnswer(models.Model):
+    """Append-only autosave log of an attempt session; the latest row per question wins"""
+    session = models.ForeignKey(AttemptSession, on_delete=models.CASCADE, related_name='saved_answers')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE)
+    selected_choice = models.ForeignKey(Choice, on_delete=models.SET_NULL, null=True, blank=True)
+    answer_text = models.TextField(blank=True)
+    saved_at = models.DateTimeField(auto_now_add=True)
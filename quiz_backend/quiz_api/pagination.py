@@ -0,0 +1,110 @@
+# quiz_api/pagination.py
+import base64
+import json
+
+import graphene
+from django.conf import settings
+from django.db.models import Q, QuerySet
+from graphql import GraphQLError
+
+from .loaders import get_loaders
+from .planner import plan_queryset, selected_fields
+
+# Keyset orderings; each matches the model's Meta.ordering with the primary
+# key appended so every row has a unique, stable position.
+QUIZ_ORDERING = ('-created_at', '-id')
+USER_ORDERING = ('-created_at', '-id')
+ATTEMPT_ORDERING = ('-completed_at', '-id')
+SUBJECT_ORDERING = ('name', 'id')
+
+
+class CountableConnection(graphene.relay.Connection):
+    """Relay connection whose totalCount is only computed when selected"""
+    total_count = graphene.Int()
+
+    class Meta:
+        abstract = True
+
+    def resolve_total_count(self, info):
+        return self.total_queryset.count()
+
+
+def encode_cursor(values):
+    raw = json.dumps([str(value) for value in values]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor, count):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise GraphQLError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != count:
+        raise GraphQLError('Invalid cursor')
+    return values
+
+
+def _after(queryset, ordering, cursor):
+    """Filter to the rows strictly after ``cursor`` in ``ordering``"""
+    condition = Q()
+    equal = {}
+    for key, raw in zip(ordering, decode_cursor(cursor, len(ordering))):
+        name = key.lstrip('-')
+        try:
+            value = queryset.model._meta.get_field(name).to_python(raw)
+        except Exception:
+            raise GraphQLError('Invalid cursor')
+        lookup = 'lt' if key.startswith('-') else 'gt'
+        condition |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    return queryset.filter(condition)
+
+
+def as_queryset(result, model):
+    """Resolvers return [] for callers who may not see anything; page over none() instead"""
+    return result if isinstance(result, QuerySet) else model.objects.none()
+
+
+def page_size(first):
+    default = getattr(settings, 'GRAPHQL_DEFAULT_PAGE_SIZE', 20)
+    maximum = getattr(settings, 'GRAPHQL_MAX_PAGE_SIZE', 100)
+    if first is None:
+        return min(default, maximum)
+    if first < 0:
+        raise GraphQLError('first must be a positive integer')
+    return min(first, maximum)
+
+
+def paginate(queryset, info, connection_type, ordering, first=None, after=None):
+    """Return one keyset page of ``queryset`` as a ``connection_type`` instance"""
+    limit = page_size(first)
+    edges = selected_fields(info).get('edges', [])
+    node_nodes = [node for edge in edges for node in selected_fields(info, [edge]).get('node', [])]
+    keys = [key.lstrip('-') for key in ordering]
+
+    page = plan_queryset(queryset, info, node_nodes, also=keys).order_by(*ordering)
+    if after:
+        page = _after(page, ordering, after)
+    rows = list(page[:limit + 1]) if limit else []
+    has_next = len(rows) > limit
+    rows = rows[:limit]
+    get_loaders(info).prime_from(rows)
+
+    edge_type = connection_type.Edge
+    connection = connection_type(
+        edges=[
+            edge_type(node=row, cursor=encode_cursor(getattr(row, key) for key in keys))
+            for row in rows
+        ],
+        page_info=graphene.relay.PageInfo(
+            has_next_page=has_next,
+            has_previous_page=bool(after),
+            start_cursor=None,
+            end_cursor=None,
+        ),
+    )
+    if connection.edges:
+        connection.page_info.start_cursor = connection.edges[0].cursor
+        connection.page_info.end_cursor = connection.edges[-1].cursor
+    connection.total_queryset = queryset
+    return connection
@@ -0,0 +1,141 @@
+# quiz_api/persisted.py
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from graphql import GraphQLError
+
+from .documents import LRUCache, query_hash
+from .models import PersistedQuery
+
+persisted_cache = LRUCache('persisted_queries', getattr(settings, 'GRAPHQL_PERSISTED_CACHE_SIZE', 512))
+
+ANONYMOUS_REGISTRATIONS_KEY = 'quiz_api:persisted_registrations:{}'
+
+
+class PersistedQueryError(GraphQLError):
+    def __init__(self, message, code):
+        super().__init__(message, extensions={'code': code})
+
+
+def allow_list_only():
+    return getattr(settings, 'GRAPHQL_PERSISTED_QUERIES_ONLY', False)
+
+
+def lookup(sha256):
+    query = persisted_cache.get(sha256)
+    if query is None:
+        query = PersistedQuery.objects.filter(sha256=sha256).values_list('query', flat=True).first()
+        if query is not None:
+            persisted_cache.set(sha256, query)
+    return query
+
+
+def register(query, sha256=None, operation_name=''):
+    """Store ``query`` under its hash; ``sha256`` must match when given."""
+    digest = query_hash(query)
+    if sha256 is not None and sha256 != digest:
+        raise PersistedQueryError('provided sha does not match query', 'PERSISTED_QUERY_HASH_MISMATCH')
+    PersistedQuery.objects.get_or_create(
+        sha256=digest, defaults={'query': query, 'operation_name': operation_name or ''})
+    persisted_cache.set(digest, query)
+    return digest
+
+
+def persisted_hash(extensions):
+    """The sha256Hash from an Automatic Persisted Queries ``extensions`` payload"""
+    if isinstance(extensions, str):
+        try:
+            extensions = json.loads(extensions)
+        except ValueError:
+            raise PersistedQueryError('extensions are invalid JSON', 'BAD_REQUEST')
+    persisted = (extensions or {}).get('persistedQuery') if isinstance(extensions, dict) else None
+    if not persisted:
+        return None
+    if persisted.get('version') != 1:
+        raise PersistedQueryError('Unsupported persisted query version', 'PERSISTED_QUERY_NOT_SUPPORTED')
+    return persisted.get('sha256Hash')
+
+
+def resolve_query(query, extensions):
+    """
+    Return ``(query, sha256, unregistered)`` for a request: the text to
+    execute, the persisted hash it was sent with, if any, and whether that
+    hash still has to be registered.
+
+    Hash-only requests are served from the registry. A request carrying
+    both text and an unknown hash is flagged for registration; the caller
+    registers it with register_validated() once the document passed
+    validation. In allow-list mode (GRAPHQL_PERSISTED_QUERIES_ONLY) only
+    queries registered ahead of time from a manifest may run at all.
+    """
+    sha256 = persisted_hash(extensions)
+    if sha256 is None:
+        if query and allow_list_only() and lookup(query_hash(query)) is None:
+            raise PersistedQueryError('Query is not on the allow-list', 'PERSISTED_QUERY_NOT_ALLOWED')
+        return query, None, False
+
+    if not query:
+        query = lookup(sha256)
+        if query is None:
+            if allow_list_only():
+                raise PersistedQueryError('Query is not on the allow-list', 'PERSISTED_QUERY_NOT_ALLOWED')
+            raise PersistedQueryError('PersistedQueryNotFound', 'PERSISTED_QUERY_NOT_FOUND')
+        return query, sha256, False
+
+    if query_hash(query) != sha256:
+        raise PersistedQueryError('provided sha does not match query', 'PERSISTED_QUERY_HASH_MISMATCH')
+    if lookup(sha256) is None:
+        if allow_list_only():
+            raise PersistedQueryError('Query is not on the allow-list', 'PERSISTED_QUERY_NOT_ALLOWED')
+        return query, sha256, True
+    return query, sha256, False
+
+
+def may_register(user, client):
+    """
+    Whether a caller may add a query to the registry. Signed-in users
+    always may; anonymous clients (by address) at most
+    GRAPHQL_PERSISTED_ANONYMOUS_REGISTRATIONS times per hour, 0 to refuse.
+    """
+    if user is not None and user.is_authenticated:
+        return True
+    limit = getattr(settings, 'GRAPHQL_PERSISTED_ANONYMOUS_REGISTRATIONS', 20)
+    if limit <= 0:
+        return False
+    key = ANONYMOUS_REGISTRATIONS_KEY.format(client)
+    if cache.add(key, 1, 3600):
+        return True
+    try:
+        return cache.incr(key) <= limit
+    except ValueError:
+        # Expired between add() and incr()
+        cache.add(key, 1, 3600)
+        return True
+
+
+def register_validated(query, sha256, operation_name, user, client):
+    """
+    Register a query sent with an unknown hash, after it parsed, validated
+    and passed the cost check. Over the anonymous quota the query still
+    runs, it just is not stored; the client sends the text again next time.
+    """
+    if may_register(user, client):
+        register(query, sha256, operation_name)
+
+
+def load_manifest(manifest):
+    """Yield ``(sha256, query, operation_name)`` from a manifest document.
+
+    Accepts Apollo's ``{"operations": [{"id", "body", "name"}]}`` format, a
+    plain ``{sha256: query}`` object, or a list of query strings.
+    """
+    if isinstance(manifest, dict) and 'operations' in manifest:
+        for operation in manifest['operations']:
+            yield operation.get('id'), operation['body'], operation.get('name', '')
+    elif isinstance(manifest, dict):
+        for sha256, query in manifest.items():
+            yield sha256, query, ''
+    else:
+        for query in manifest:
+            yield None, query, ''
@@ -0,0 +1,186 @@
+# quiz_api/planner.py
+import functools
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch, QuerySet
+from graphene.utils.str_converters import to_snake_case
+from graphql import GraphQLList, get_nullable_type
+from graphql.language import FieldNode, FragmentSpreadNode, InlineFragmentNode
+
+from .models import Quiz, QuizAttempt, Answer
+
+# GraphQL fields that are not model columns, mapped to the ORM paths their
+# resolvers read. Paths containing "__" are followed with select_related.
+COMPUTED_FIELDS = {
+    Quiz: {
+        'is_available': ('is_published', 'scheduled_start', 'scheduled_end'),
+        'time_until_start': ('scheduled_start',),
+        'time_until_end': ('scheduled_end',),
+    },
+    QuizAttempt: {
+        'quiz_title': ('quiz__title',),
+        'student_name': ('user__first_name', 'user__last_name', 'user__username'),
+        'student_email': ('user__email',),
+    },
+    Answer: {
+        'question_text': ('question__question_text',),
+        'selected_choice_text': ('selected_choice__choice_text',),
+        'correct_choice_text': ('question__id',),
+    },
+}
+
+# GraphQL fields served from Quiz.objects.with_stats() annotations when the
+# quiz list is planned at the top level; nested quizzes fall back per object.
+ANNOTATED_FIELDS = {
+    Quiz: {
+        'question_count': ('question_count',),
+        'average_score': ('average_score',),
+        'attempt_count': ('attempt_count',),
+        'unique_students': ('unique_students',),
+        'pass_rate': ('attempt_count', 'pass_count'),
+    },
+}
+
+
+def selected_fields(info, field_nodes=None):
+    """Map snake_case field names selected under ``field_nodes`` to their nodes."""
+    fields = {}
+
+    def collect(selection_set):
+        if selection_set is None:
+            return
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                name = selection.name.value
+                if not name.startswith('__'):
+                    fields.setdefault(to_snake_case(name), []).append(selection)
+            elif isinstance(selection, FragmentSpreadNode):
+                fragment = info.fragments.get(selection.name.value)
+                if fragment is not None:
+                    collect(fragment.selection_set)
+            elif isinstance(selection, InlineFragmentNode):
+                collect(selection.selection_set)
+
+    for node in field_nodes if field_nodes is not None else info.field_nodes:
+        collect(node.selection_set)
+    return fields
+
+
+class QueryPlan:
+    """The select_related / prefetch_related / only() calls for one model level."""
+
+    def __init__(self, model):
+        self.model = model
+        self.only = {model._meta.pk.name}
+        self.select_related = set()
+        self.prefetches = []
+        self.stats = set()
+        self.prune = True
+
+    def add_path(self, path):
+        """Load a column, following and selecting any relations on the way."""
+        model = self.model
+        parts = path.split('__')
+        for depth, part in enumerate(parts[:-1]):
+            field = model._meta.get_field(part)
+            prefix = '__'.join(parts[:depth + 1])
+            self.select_related.add(prefix)
+            self.only.add(prefix)
+            model = field.related_model
+        self.only.add(path)
+
+    def apply(self, queryset):
+        existing = queryset.query.select_related
+        if existing is True:
+            self.prune = False
+        elif isinstance(existing, dict):
+            self.only.update(_flatten_select_related(existing))
+        if self.select_related:
+            queryset = queryset.select_related(*sorted(self.select_related))
+        if self.prefetches:
+            queryset = queryset.prefetch_related(*self.prefetches)
+        if self.prune:
+            queryset = queryset.only(*sorted(self.only))
+        if self.stats:
+            queryset = queryset.with_stats(*sorted(self.stats))
+        return queryset
+
+
+def _flatten_select_related(tree, prefix=''):
+    for name, children in tree.items():
+        path = f'{prefix}{name}'
+        yield path
+        yield from _flatten_select_related(children, f'{path}__')
+
+
+def build_plan(model, info, fields, plan=None, prefix=''):
+    """Fill ``plan`` with everything needed to resolve ``fields`` on ``model``."""
+    plan = plan or QueryPlan(model)
+    computed = COMPUTED_FIELDS.get(model, {})
+    annotated = ANNOTATED_FIELDS.get(model, {})
+    for name, nodes in fields.items():
+        if name in annotated:
+            if not prefix:
+                plan.stats.update(annotated[name])
+            continue
+        if name in computed:
+            for path in computed[name]:
+                plan.add_path(f'{prefix}{path}')
+            continue
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # A resolver we know nothing about may read any column.
+            plan.prune = False
+            continue
+
+        if field.one_to_many and field.auto_created:
+            plan.prefetches.append(_plan_prefetch(field, info, nodes, prefix))
+        elif field.is_relation and field.concrete and not field.many_to_many:
+            plan.select_related.add(f'{prefix}{name}')
+            plan.only.add(f'{prefix}{name}')
+            related = field.related_model
+            plan.only.add(f'{prefix}{name}__{related._meta.pk.name}')
+            build_plan(related, info, selected_fields(info, nodes), plan, f'{prefix}{name}__')
+        elif field.concrete and not field.many_to_many:
+            plan.only.add(f'{prefix}{name}')
+        else:
+            plan.prune = False
+    return plan
+
+
+def _plan_prefetch(field, info, nodes, prefix):
+    """Prefetch a reverse relation with an ordered, pruned inner queryset."""
+    related = field.related_model
+    inner = build_plan(related, info, selected_fields(info, nodes))
+    inner.only.add(field.field.name)
+    queryset = related.objects.order_by(*related._meta.ordering)
+    return Prefetch(f'{prefix}{field.get_accessor_name()}', queryset=inner.apply(queryset))
+
+
+def plan_queryset(queryset, info, field_nodes=None, also=()):
+    """
+    Shape ``queryset`` to load exactly what the GraphQL selection needs,
+    plus the columns in ``also`` that the caller reads itself.
+    """
+    fields = selected_fields(info, field_nodes)
+    plan = build_plan(queryset.model, info, fields)
+    plan.only.update(also)
+    return plan.apply(queryset)
+
+
+def optimize_queryset(resolver):
+    """
+    Decorate a resolver so any queryset it returns follows the selection set.
+    Planning only applies when the resolver serves a list field, so the same
+    resolver can be reused to build the queryset behind a connection.
+    """
+
+    @functools.wraps(resolver)
+    def wrapper(root, info, **kwargs):
+        result = resolver(root, info, **kwargs)
+        if isinstance(result, QuerySet) and isinstance(get_nullable_type(info.return_type), GraphQLList):
+            result = plan_queryset(result, info)
+        return result
+
+    return wrapper
@@ -0,0 +1,154 @@
+# quiz_api/regrade.py
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (
+    Case, Count, Exists, F, FloatField, IntegerField, OuterRef, Q, Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Cast, Coalesce
+from django.db.models.lookups import GreaterThanOrEqual
+from django.utils import timezone
+
+from .analytics import rebuild_rollups
+from .models import Question, Choice, QuizAttempt, Answer, RegradeJob
+
+logger = logging.getLogger(__name__)
+
+
+def _percentage():
+    # Same operation order as QuizAttempt.calculate_percentage, so SQL and
+    # Python agree to the last bit
+    return Case(
+        When(total_questions__gt=0,
+             then=Cast('correct_answers', FloatField()) / F('total_questions') * Value(100.0)),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def _status():
+    # QuizAttempt.determine_status as a CASE over the same expression
+    percentage = _percentage()
+    return Case(
+        *[When(GreaterThanOrEqual(percentage, Value(bound)), then=Value(status)) for bound, status in (
+            (90.0, 'excellent'), (80.0, 'very_good'), (70.0, 'good'), (60.0, 'fair'))],
+        default=Value('poor'),
+    )
+
+
+def regrade_attempts(attempt_ids, question_ids=None):
+    """
+    Recompute the answers (optionally only those to ``question_ids``) and the
+    totals of the given attempts against the current answer key, with three
+    set-based UPDATEs whatever the number of rows. total_questions is kept:
+    it describes the quiz the student actually sat.
+    """
+    answers = Answer.objects.filter(attempt_id__in=attempt_ids)
+    if question_ids is not None:
+        answers = answers.filter(question_id__in=question_ids)
+    is_correct = Exists(Choice.objects.filter(
+        pk=OuterRef('selected_choice_id'), question_id=OuterRef('question_id'), is_correct=True))
+    answers.update(
+        is_correct=is_correct,
+        points_earned=Case(
+            When(is_correct, then=Subquery(Question.objects.filter(pk=OuterRef('question_id')).values('points'))),
+            default=Value(0),
+            output_field=IntegerField(),
+        ),
+    )
+
+    per_attempt = Answer.objects.filter(attempt_id=OuterRef('pk')).order_by().values('attempt_id')
+    attempts = QuizAttempt.objects.filter(pk__in=attempt_ids)
+    attempts.update(
+        score=Coalesce(Subquery(per_attempt.annotate(total=Sum('points_earned')).values('total')),
+                       Value(0), output_field=FloatField()),
+        correct_answers=Coalesce(Subquery(per_attempt.annotate(n=Count('pk', filter=Q(is_correct=True))).values('n')),
+                                 Value(0), output_field=IntegerField()),
+    )
+    # A second pass, because an UPDATE's expressions see the old correct_answers
+    attempts.update(percentage=_percentage(), status=_status())
+
+
+def enqueue_regrade(quiz_id, question_id=None, user=None):
+    """
+    Queue a regrade of a quiz, or of one question's answers. A job still
+    waiting for the same quiz is reused (widened to the whole quiz when the
+    scopes differ), so a burst of edits leads to a single pass.
+    """
+    from .grading_queue import grading_pool
+
+    job = RegradeJob.objects.filter(quiz_id=quiz_id, status=RegradeJob.QUEUED).first()
+    if job is not None and job.question_id not in (None, question_id):
+        # Conditional, in case a worker claimed the job in the meantime
+        if RegradeJob.objects.filter(pk=job.pk, status=RegradeJob.QUEUED).update(question=None):
+            job.question_id = None
+        else:
+            job = None
+    if job is None:
+        job = RegradeJob.objects.create(quiz_id=quiz_id, question_id=question_id, requested_by=user)
+    transaction.on_commit(grading_pool.notify)
+    return job
+
+
+def _claimable(now):
+    stale = now - timedelta(seconds=getattr(settings, 'GRADING_LEASE_SECONDS', 60))
+    return Q(status=RegradeJob.QUEUED) | Q(status=RegradeJob.RUNNING, claimed_at__lt=stale)
+
+
+def claim_regrade():
+    """Lease the oldest queued regrade (or one whose worker died), or None"""
+    now = timezone.now()
+    max_tries = getattr(settings, 'GRADING_MAX_TRIES', 3)
+    candidates = RegradeJob.objects.filter(_claimable(now), tries__lt=max_tries).values_list('pk', flat=True)[:10]
+    for pk in candidates:
+        if RegradeJob.objects.filter(_claimable(now), pk=pk).update(
+                status=RegradeJob.RUNNING, claimed_at=now, processed_attempts=0, tries=F('tries') + 1):
+            return RegradeJob.objects.get(pk=pk)
+    return None
+
+
+def run_regrade(job):
+    """
+    Regrade the attempts of a claimed job in chunks of REGRADE_CHUNK_SIZE,
+    each in its own short transaction that also records progress and renews
+    the lease, then rebuild the quiz's rollups. Regrading is idempotent, so
+    a job picked up again after a crash simply starts over.
+    """
+    chunk_size = getattr(settings, 'REGRADE_CHUNK_SIZE', 2000)
+    question_ids = None if job.question_id is None else [job.question_id]
+    attempts = QuizAttempt.objects.filter(quiz_id=job.quiz_id, grading_status=QuizAttempt.GRADED)
+    if question_ids is not None:
+        attempts = attempts.filter(answers__question_id__in=question_ids)
+    attempts = attempts.order_by('pk').values_list('pk', flat=True)
+
+    try:
+        RegradeJob.objects.filter(pk=job.pk).update(total_attempts=attempts.count())
+        last = None
+        while True:
+            chunk = list((attempts if last is None else attempts.filter(pk__gt=last))[:chunk_size])
+            if not chunk:
+                break
+            with transaction.atomic():
+                regrade_attempts(chunk, question_ids)
+                RegradeJob.objects.filter(pk=job.pk).update(
+                    processed_attempts=F('processed_attempts') + len(chunk), claimed_at=timezone.now())
+            last = chunk[-1]
+        rebuild_rollups([job.quiz_id])
+        RegradeJob.objects.filter(pk=job.pk).update(status=RegradeJob.DONE, finished_at=timezone.now())
+    except Exception as e:
+        logger.exception("Regrade %s failed", job.pk)
+        failed = job.tries >= getattr(settings, 'GRADING_MAX_TRIES', 3)
+        RegradeJob.objects.filter(pk=job.pk).update(
+            status=RegradeJob.FAILED if failed else RegradeJob.QUEUED, claimed_at=None, error=str(e),
+            finished_at=timezone.now() if failed else None)
+
+
+def process_next_regrade():
+    """Run one queued regrade; False when there was nothing to do"""
+    job = claim_regrade()
+    if job is None:
+        return False
+    run_regrade(job)
+    return True
@@ -1,14 +1,37 @@
 
+import logging
 import urllib.request
 import json
 from django.conf import settings
 
 import graphene
 from graphene_django import DjangoObjectType
+from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.utils import timezone
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
-from .models import User, Subject, Quiz, Question, Choice, QuizAttempt, Answer
+from django.contrib.auth.hashers import make_password
+from .models import User, Subject, Quiz, Question, Choice, QuizAttempt, Answer, AttemptSession, RegradeJob
+from .loaders import get_loaders, load_related, load_reverse
+from .analytics import quiz_summary, question_breakdown
+from .cache import available_quizzes, quiz_content_changed, quiz_detail
+from .batching import submission_coalescer, autosave_coalescer
+from .autosave import open_session, latest_answers, save_answer, claim_session, finish_session, reopen_session
+from .grading_queue import enqueue_submission, grading_pool
+from .regrade import enqueue_regrade
+from .documents import cache_stats
+from .tracing import trace_buffer
+from .google_auth import verify_id_token
+from .executors import cpu_bound
+from .db_backends.pool import pool_stats
+from .pagination import (
+    CountableConnection, paginate, as_queryset,
+    QUIZ_ORDERING, USER_ORDERING, ATTEMPT_ORDERING, SUBJECT_ORDERING,
+)
+from .planner import optimize_queryset, plan_queryset, selected_fields
+
+logger = logging.getLogger(__name__)
 
 class UserType(DjangoObjectType):
     class Meta:
@@ -20,10 +43,94 @@ class SubjectType(DjangoObjectType):
         model = Subject
         fields = ['id', 'name', 'description', 'created_by']
 
+def answers_visible(info, quiz_id):
+    """
+    Whether the caller may see which choices of a quiz are correct: admins,
+    the quiz's author, and students who submitted it when review is allowed.
+    Decided once per quiz per request.
+    """
+    user = info.context.user
+    if not user.is_authenticated:
+        return False
+    if user.role == 'admin':
+        return True
+    visible = getattr(info.context, 'answers_visible', None)
+    if visible is None:
+        visible = info.context.answers_visible = {}
+    if quiz_id not in visible:
+        if user.role == 'teacher':
+            visible[quiz_id] = Quiz.objects.filter(pk=quiz_id, created_by=user).exists()
+        else:
+            visible[quiz_id] = QuizAttempt.objects.filter(
+                quiz_id=quiz_id, user=user, quiz__allow_review=True).exists()
+    return visible[quiz_id]
+
+def parse_choice(choice_data):
+    """Choice payloads arrive as JSON strings, dicts or other mappings"""
+    if isinstance(choice_data, str):
+        return json.loads(choice_data)
+    return dict(choice_data)
+
+def sync_choices(question, choices_data):
+    """
+    Reconcile a question's choices with an edited list, in list order.
+    Payloads carrying the ``id`` of an existing choice update it; payloads
+    without one reuse an unmatched choice with the same text, so clients
+    that don't send ids keep past answers pointing at their choices.
+    Unchanged rows are left alone; the rest costs one bulk_update, one
+    bulk_create and one DELETE. Call inside a transaction. Returns whether
+    the set of correct choices changed, i.e. past answers need a regrade.
+    """
+    existing = {choice.id: choice for choice in question.choices.all()}
+    unmatched = dict(existing)
+    correct_before = {choice.id for choice in existing.values() if choice.is_correct}
+    changed, created = [], []
+    for idx, choice_data in enumerate(choices_data):
+        choice_data = parse_choice(choice_data)
+        values = {
+            'choice_text': choice_data.get('text', ''),
+            'is_correct': bool(choice_data.get('isCorrect', False)),
+            'order': idx,
+        }
+        choice = None
+        if choice_data.get('id'):
+            choice = unmatched.pop(Choice._meta.pk.to_python(choice_data['id']), None)
+            if choice is None:
+                raise ValueError(f"Choice {choice_data['id']} does not belong to this question")
+        else:
+            for candidate in unmatched.values():
+                if candidate.choice_text == values['choice_text']:
+                    choice = unmatched.pop(candidate.id)
+                    break
+        if choice is None:
+            created.append(Choice(question=question, **values))
+        elif any(getattr(choice, field) != value for field, value in values.items()):
+            for field, value in values.items():
+                setattr(choice, field, value)
+            changed.append(choice)
+    
+    if unmatched:
+        Choice.objects.filter(pk__in=list(unmatched)).delete()
+    if changed:
+        Choice.objects.bulk_update(changed, ['choice_text', 'is_correct', 'order'])
+    if created:
+        Choice.objects.bulk_create(created)
+    
+    kept = [choice for choice in existing.values() if choice.id not in unmatched]
+    correct_after = {choice.id for choice in kept + created if choice.is_correct}
+    return correct_after != correct_before
+
 class ChoiceType(DjangoObjectType):
+    # Nullable: hidden (null) unless answers_visible() allows it
+    is_correct = graphene.Boolean()
+    
     class Meta:
         model = Choice
         fields = ['id', 'choice_text', 'order', 'is_correct']
+    
+    def resolve_is_correct(self, info):
+        quiz_id = getattr(self, 'quiz_id', None) or self.question.quiz_id
+        return self.is_correct if answers_visible(info, quiz_id) else None
 
 class QuestionType(DjangoObjectType):
     choices = graphene.List(ChoiceType)
@@ -36,7 +143,10 @@ class QuestionType(DjangoObjectType):
         """Ensures the choices field always returns a QuerySet (an iterable), 
            even if empty, preventing the 'Expected Iterable' error."""
         # The related_name in your models.py is 'choices'
-        return list(self.choices.all())
+        choices = load_reverse(self, 'choices', get_loaders(info).choices_by_question)
+        for choice in choices:
+            choice.quiz_id = self.quiz_id
+        return choices
 
 class QuizAttemptType(DjangoObjectType):
     quiz_title = graphene.String()
@@ -45,16 +155,32 @@ class QuizAttemptType(DjangoObjectType):
     
     class Meta:
         model = QuizAttempt
-        fields = ['id', 'quiz', 'user', 'score', 'total_questions', 'correct_answers', 'percentage', 'status', 'time_taken', 'completed_at']
+        fields = ['id', 'quiz', 'user', 'score', 'total_questions', 'correct_answers', 'percentage', 'status', 'time_taken', 'completed_at', 'grading_status']
+    
+    def resolve_quiz(self, info):
+        return load_related(self, 'quiz', get_loaders(info).quiz)
+    
+    def resolve_user(self, info):
+        return load_related(self, 'user', get_loaders(info).user)
     
     def resolve_quiz_title(self, info):
-        return self.quiz.title
+        return load_related(self, 'quiz', get_loaders(info).quiz).title
     
     def resolve_student_name(self, info):
-        return f"{self.user.first_name} {self.user.last_name}".strip() or self.user.username
+        user = load_related(self, 'user', get_loaders(info).user)
+        return f"{user.first_name} {user.last_name}".strip() or user.username
     
     def resolve_student_email(self, info):
-        return self.user.email
+        return load_related(self, 'user', get_loaders(info).user).email
+
+def quiz_stats(quiz, *names):
+    """Read statistics annotated by Quiz.objects.with_stats(), querying only missing ones"""
+    missing = [name for name in names if not hasattr(quiz, name)]
+    if missing:
+        values = Quiz.objects.filter(pk=quiz.pk).with_stats(*missing).values(*missing).get()
+        for name, value in values.items():
+            setattr(quiz, name, value)
+    return [getattr(quiz, name) for name in names]
 
 class QuizType(DjangoObjectType):
     questions = graphene.List(QuestionType)
@@ -64,6 +190,9 @@ class QuizType(DjangoObjectType):
     question_count = graphene.Int()
     attempts = graphene.List(QuizAttemptType)
     average_score = graphene.Float()
+    attempt_count = graphene.Int()
+    unique_students = graphene.Int()
+    pass_rate = graphene.Float()
     
     class Meta:
         model = Quiz
@@ -71,14 +200,14 @@ class QuizType(DjangoObjectType):
             'id', 'title', 'description', 'time_limit', 'is_published',
             'scheduled_start', 'scheduled_end', 'allow_review', 'show_score',
             'randomize_questions', 'randomize_choices', 'created_by', 'questions',
-            'attempts', 'average_score'
+            'attempts', 'average_score', 'attempt_count', 'unique_students', 'pass_rate'
         ]
     
     def resolve_questions(self, info):
         """Ensures the questions field always returns a QuerySet (an iterable), 
            even if empty, preventing the 'Expected Iterable' error."""
         # The related_name in your models.py is 'questions'
-        return list(self.questions.all())
+        return load_reverse(self, 'questions', get_loaders(info).questions_by_quiz)
     
     def resolve_is_available(self, info):
         return self.is_available_now()
@@ -91,17 +220,27 @@ class QuizType(DjangoObjectType):
         result = self.time_until_end()
         return result if result is not None else 0
     
+    def resolve_created_by(self, info):
+        return load_related(self, 'created_by', get_loaders(info).user)
+    
     def resolve_question_count(self, info):
-        return self.questions.count()
+        return quiz_stats(self, 'question_count')[0]
     
     def resolve_attempts(self, info):
-        return self.attempts.all()
+        return load_reverse(self, 'attempts', get_loaders(info).attempts_by_quiz)
     
     def resolve_average_score(self, info):
-        attempts = self.attempts.all()
-        if not attempts:
-            return 0
-        return sum(a.score for a in attempts) / len(attempts)
+        return quiz_stats(self, 'average_score')[0]
+    
+    def resolve_attempt_count(self, info):
+        return quiz_stats(self, 'attempt_count')[0]
+    
+    def resolve_unique_students(self, info):
+        return quiz_stats(self, 'unique_students')[0]
+    
+    def resolve_pass_rate(self, info):
+        attempt_count, pass_count = quiz_stats(self, 'attempt_count', 'pass_count')
+        return (pass_count / attempt_count) * 100 if attempt_count else 0
 
 class AnswerType(DjangoObjectType):
     question_text = graphene.String()
@@ -123,6 +262,48 @@ class AnswerType(DjangoObjectType):
         return correct_choice.choice_text if correct_choice else None
 
 
+class RegradeJobType(DjangoObjectType):
+    progress = graphene.Float()
+    
+    class Meta:
+        model = RegradeJob
+        fields = ['id', 'quiz', 'question', 'status', 'total_attempts', 'processed_attempts',
+                  'created_at', 'finished_at', 'error']
+    
+    def resolve_quiz(self, info):
+        return load_related(self, 'quiz', get_loaders(info).quiz)
+    
+    def resolve_progress(self, info):
+        return self.progress
+
+
+class SavedAnswerType(graphene.ObjectType):
+    question_id = graphene.String()
+    choice_id = graphene.String()
+    answer_text = graphene.String()
+
+
+class AttemptSessionType(DjangoObjectType):
+    answers = graphene.List(SavedAnswerType)
+    
+    class Meta:
+        model = AttemptSession
+        fields = ['id', 'quiz', 'started_at', 'submitted_at']
+    
+    def resolve_quiz(self, info):
+        return load_related(self, 'quiz', get_loaders(info).quiz)
+    
+    def resolve_answers(self, info):
+        return [
+            SavedAnswerType(
+                question_id=row['question_id'],
+                choice_id=row['selected_choice_id'],
+                answer_text=row['answer_text'],
+            )
+            for row in latest_answers(self.pk)
+        ]
+
+
 class QuestionAnalyticsType(graphene.ObjectType):
     question_id = graphene.String()
     question_text = graphene.String()
@@ -155,6 +336,59 @@ class StudentPerformanceType(graphene.ObjectType):
     time_per_question = graphene.List(graphene.Float)
 
 
+class CacheStatsType(graphene.ObjectType):
+    name = graphene.String()
+    size = graphene.Int()
+    maxsize = graphene.Int()
+    hits = graphene.Int()
+    misses = graphene.Int()
+    hit_rate = graphene.Float()
+
+
+class BatchStatsType(graphene.ObjectType):
+    batches = graphene.Int()
+    writes = graphene.Int()
+    average_batch_size = graphene.Float()
+    max_batch_size = graphene.Int()
+    average_wait_ms = graphene.Float()
+    max_wait_ms = graphene.Float()
+
+
+class DatabasePoolStatsType(graphene.ObjectType):
+    alias = graphene.String()
+    database = graphene.String()
+    max_size = graphene.Int()
+    size = graphene.Int()
+    in_use = graphene.Int()
+    idle = graphene.Int()
+    waiting = graphene.Int()
+    peak_in_use = graphene.Int()
+    peak_waiting = graphene.Int()
+    acquired = graphene.Int()
+    waits = graphene.Int()
+    timeouts = graphene.Int()
+    created = graphene.Int()
+    discarded = graphene.Int()
+    average_wait_ms = graphene.Float()
+    max_wait_ms = graphene.Float()
+    saturation = graphene.Float()
+
+
+class ResolverTimingType(graphene.ObjectType):
+    path = graphene.String()
+    calls = graphene.Int()
+    total_ms = graphene.Float()
+
+
+class OperationTraceType(graphene.ObjectType):
+    operation_name = graphene.String()
+    started_at = graphene.DateTime()
+    duration_ms = graphene.Float()
+    sql_count = graphene.Int()
+    sql_ms = graphene.Float()
+    resolvers = graphene.List(ResolverTimingType)
+
+
 class GoogleAuthMutation(graphene.Mutation):
     class Arguments:
         id_token = graphene.String(required=False)
@@ -173,21 +407,18 @@ class GoogleAuthMutation(graphene.Mutation):
         payload = None
         try:
             if id_token:
-                url = f'https://oauth2.googleapis.com/tokeninfo?id_token={id_token}'
-                with urllib.request.urlopen(url) as resp:
-                    payload = json.load(resp)
-                client_id = getattr(settings, 'GOOGLE_CLIENT_ID', None)
-                if client_id:
-                    aud = payload.get('aud') or payload.get('audience')
-                    if aud and aud != client_id:
-                        return GoogleAuthMutation(success=False, message='Token audience mismatch')
+                payload = cpu_bound(verify_id_token, id_token)
             else:
+                # Access tokens are opaque; only Google can tell whose they are
                 url = f'https://www.googleapis.com/oauth2/v3/userinfo?access_token={access_token}'
-                with urllib.request.urlopen(url) as resp:
+                with urllib.request.urlopen(url, timeout=5) as resp:
                     payload = json.load(resp)
         except Exception as e:
             return GoogleAuthMutation(success=False, message=f'Google token verification failed: {str(e)}')
 
+        if payload.get('email') and payload.get('email_verified') in (False, 'false'):
+            return GoogleAuthMutation(success=False, message='Google account email is not verified')
+
         google_id = payload.get('sub')
         email = payload.get('email')
         picture = payload.get('picture')
@@ -224,7 +455,7 @@ class GoogleAuthMutation(graphene.Mutation):
             user.save()
 
         try:
-            refresh = RefreshToken.for_user(user)
+            refresh = cpu_bound(RefreshToken.for_user, user)
             return GoogleAuthMutation(
                 success=True,
                 token=str(refresh.access_token),
@@ -255,7 +486,7 @@ class LoginMutation(graphene.Mutation):
         try:
             user = User.objects.get(email=email)
             
-            if user.check_password(password):
+            if cpu_bound(user.check_password, password):
                 # Check if user account is suspended
                 if not user.is_active:
                     return LoginMutation(success=False, message='Your account has been suspended. Please contact an administrator.')
@@ -265,7 +496,7 @@ class LoginMutation(graphene.Mutation):
                     return LoginMutation(success=False, message='Your account is pending admin approval.')
                 
                 # If all checks pass, generate token
-                refresh = RefreshToken.for_user(user)
+                refresh = cpu_bound(RefreshToken.for_user, user)
                 return LoginMutation(
                     success=True,
                     token=str(refresh.access_token),
@@ -295,8 +526,9 @@ class SignupMutation(graphene.Mutation):
             return SignupMutation(success=False, message='Email already exists')
 
         try:
-            user = User.objects.create_user(username=username, email=email, password=password,
+            user = User.objects.create_user(username=username, email=email, password=None,
                                             first_name=first_name, last_name=last_name)
+            user.password = cpu_bound(make_password, password)
             user.role = role or 'student'
             # Auto-approve students and admins, only teachers need manual approval
             if user.role in ['student', 'admin']:
@@ -456,6 +688,105 @@ class CreateQuestionMutation(graphene.Mutation):
         except Exception as e:
             return CreateQuestionMutation(success=False, message=str(e))
 
+def build_questions(quiz, questions_data, first_order=0):
+    """
+    Validate a batch of question payloads and build their unsaved Question
+    and Choice rows, numbering ``order`` from ``first_order``. Nothing is
+    built unless every payload is valid; errors name the offending index.
+    """
+    question_types = dict(Question.QUESTION_TYPES)
+    max_size = getattr(settings, 'QUESTION_BATCH_MAX_SIZE', 200)
+    if not questions_data:
+        raise ValueError('No questions given')
+    if len(questions_data) > max_size:
+        raise ValueError(f'At most {max_size} questions per request')
+    
+    questions, choices = [], []
+    for n, question_data in enumerate(questions_data):
+        try:
+            question_data = parse_choice(question_data)
+            question_text = (question_data.get('questionText') or '').strip()
+            question_type = question_data.get('questionType', 'mcq')
+            points = int(question_data.get('points', 1))
+            choices_data = [parse_choice(choice) for choice in question_data.get('choices') or []]
+        except (TypeError, ValueError) as e:
+            raise ValueError(f'Question {n + 1}: malformed payload ({e})')
+        if not question_text:
+            raise ValueError(f'Question {n + 1}: questionText is required')
+        if question_type not in question_types:
+            raise ValueError(f'Question {n + 1}: unknown questionType {question_type!r}')
+        if points < 0:
+            raise ValueError(f'Question {n + 1}: points must not be negative')
+        if question_type != 'short_answer':
+            if len(choices_data) < 2:
+                raise ValueError(f'Question {n + 1}: needs at least two choices')
+            if not any(choice.get('isCorrect') for choice in choices_data):
+                raise ValueError(f'Question {n + 1}: needs a correct choice')
+        if any(not str(choice.get('text', '')).strip() for choice in choices_data):
+            raise ValueError(f'Question {n + 1}: choices need a text')
+        
+        question = Question(quiz=quiz, question_text=question_text, question_type=question_type,
+                            points=points, order=first_order + n)
+        question_choices = [
+            Choice(question=question, choice_text=choice['text'], is_correct=bool(choice.get('isCorrect')), order=idx)
+            for idx, choice in enumerate(choices_data)
+        ]
+        # Serve the response from memory instead of reloading the choices
+        question._prefetched_objects_cache = {'choices': question_choices}
+        questions.append(question)
+        choices.extend(question_choices)
+    return questions, choices
+
+class CreateQuestionsMutation(graphene.Mutation):
+    class Arguments:
+        quiz_id = graphene.String(required=True)
+        # [{"questionText", "questionType", "points", "choices": [{"text", "isCorrect"}]}]
+        questions = graphene.List(graphene.types.json.JSONString, required=True)
+        # Delete the quiz's current questions first; refused once the quiz has attempts
+        replace = graphene.Boolean()
+    
+    questions = graphene.List(QuestionType)
+    success = graphene.Boolean()
+    message = graphene.String()
+    
+    def mutate(self, info, quiz_id, questions, replace=False):
+        """Add a batch of questions after the existing ones with two bulk inserts"""
+        if not info.context.user.is_authenticated:
+            return CreateQuestionsMutation(success=False, message='Not authenticated')
+        
+        try:
+            quiz = Quiz.objects.get(id=quiz_id, created_by=info.context.user)
+        except (Quiz.DoesNotExist, ValidationError):
+            return CreateQuestionsMutation(success=False, message='Quiz not found')
+        
+        try:
+            with transaction.atomic():
+                if replace:
+                    if QuizAttempt.objects.filter(quiz=quiz).exists():
+                        raise ValueError('Quiz already has attempts; edit its questions one by one')
+                    quiz.questions.all().delete()
+                    first_order = 0
+                else:
+                    last = quiz.questions.order_by('-order').values_list('order', flat=True).first()
+                    first_order = 0 if last is None else last + 1
+                question_rows, choice_rows = build_questions(quiz, questions, first_order)
+                Question.objects.bulk_create(question_rows)
+                Choice.objects.bulk_create(choice_rows)
+            quiz_content_changed(quiz.id)
+            return CreateQuestionsMutation(success=True, questions=question_rows,
+                                           message=f'{len(question_rows)} questions saved')
+        except ValueError as e:
+            return CreateQuestionsMutation(success=False, message=str(e))
+
+class ReplaceQuizQuestionsMutation(CreateQuestionsMutation):
+    class Arguments:
+        quiz_id = graphene.String(required=True)
+        questions = graphene.List(graphene.types.json.JSONString, required=True)
+    
+    def mutate(self, info, quiz_id, questions):
+        """Replace every question of a quiz that has no attempts yet"""
+        return CreateQuestionsMutation.mutate(self, info, quiz_id, questions, replace=True)
+
 class UpdateQuestionMutation(graphene.Mutation):
     class Arguments:
         question_id = graphene.String(required=True)
@@ -475,6 +806,7 @@ class UpdateQuestionMutation(graphene.Mutation):
         
         try:
             question = Question.objects.get(id=question_id, quiz__created_by=info.context.user)
+            old_points = question.points
             
             choices_data = kwargs.pop('choices', None)
             
@@ -482,36 +814,49 @@ class UpdateQuestionMutation(graphene.Mutation):
                 if value is not None:
                     setattr(question, key, value)
             
-            question.save()
-            
-            if choices_data is not None:
-                # For simplicity, we'll replace all choices
-                question.choices.all().delete()
-                import json
-                for idx, choice_data in enumerate(choices_data):
-                    # Handle both string and dict formats
-                    if isinstance(choice_data, str):
-                        choice_data = json.loads(choice_data)
-                    elif isinstance(choice_data, dict):
-                        # Already a dict, use as is
-                        pass
-                    else:
-                        # Convert to dict if needed
-                        choice_data = dict(choice_data)
-                    
-                    Choice.objects.create(
-                        question=question,
-                        choice_text=choice_data.get('text', ''),
-                        is_correct=choice_data.get('isCorrect', False),
-                        order=idx
-                    )
+            key_changed = kwargs.get('points') is not None and kwargs['points'] != old_points
+            with transaction.atomic():
+                question.save()
+                if choices_data is not None:
+                    key_changed |= sync_choices(question, choices_data)
             
+            quiz_content_changed(question.quiz_id)
+            if key_changed:
+                enqueue_regrade(question.quiz_id, question.id, info.context.user)
             return UpdateQuestionMutation(success=True, question=question)
         except Question.DoesNotExist:
             return UpdateQuestionMutation(success=False, message='Question not found')
         except Exception as e:
             return UpdateQuestionMutation(success=False, message=str(e))
 
+class RegradeQuizMutation(graphene.Mutation):
+    class Arguments:
+        quiz_id = graphene.String(required=True)
+        # Only regrade answers to this question
+        question_id = graphene.String()
+    
+    job = graphene.Field(RegradeJobType)
+    success = graphene.Boolean()
+    message = graphene.String()
+    
+    def mutate(self, info, quiz_id, question_id=None):
+        """Queue a background regrade of stored answers and attempts; poll regradeJob(id) for progress"""
+        user = info.context.user
+        if not user.is_authenticated:
+            return RegradeQuizMutation(success=False, message='Not authenticated')
+        
+        try:
+            quiz = Quiz.objects.get(id=quiz_id)
+            if user.role != 'admin' and quiz.created_by_id != user.id:
+                return RegradeQuizMutation(success=False, message='Quiz not found')
+            if question_id and not quiz.questions.filter(id=question_id).exists():
+                return RegradeQuizMutation(success=False, message='Question not found')
+            
+            job = enqueue_regrade(quiz.id, question_id or None, user)
+            return RegradeQuizMutation(success=True, job=job, message='Regrade queued')
+        except (Quiz.DoesNotExist, ValidationError):
+            return RegradeQuizMutation(success=False, message='Quiz not found')
+
 class DeleteQuizMutation(graphene.Mutation):
     class Arguments:
         quiz_id = graphene.String(required=True)
@@ -552,98 +897,110 @@ class DeleteQuestionMutation(graphene.Mutation):
         except Exception as e:
             return DeleteQuestionMutation(success=False, message=str(e))
 
+class StartQuizAttemptMutation(graphene.Mutation):
+    class Arguments:
+        quiz_id = graphene.String(required=True)
+    
+    session = graphene.Field(AttemptSessionType)
+    success = graphene.Boolean()
+    message = graphene.String()
+    
+    def mutate(self, info, quiz_id):
+        """Open an attempt session, or resume the open one with its saved answers after a reconnect"""
+        if not info.context.user.is_authenticated:
+            return StartQuizAttemptMutation(success=False, message='Not authenticated')
+        
+        try:
+            quiz = Quiz.objects.get(id=quiz_id)
+            if not quiz.is_available_now():
+                return StartQuizAttemptMutation(success=False, message='Quiz is not available')
+            
+            session = open_session(info.context.user, quiz)
+            return StartQuizAttemptMutation(success=True, session=session, message='Attempt started')
+        except (Quiz.DoesNotExist, ValidationError):
+            return StartQuizAttemptMutation(success=False, message='Quiz not found')
+
+class SaveAnswerMutation(graphene.Mutation):
+    class Arguments:
+        session_id = graphene.String(required=True)
+        question_id = graphene.String(required=True)
+        choice_id = graphene.String()
+        answer_text = graphene.String()
+    
+    success = graphene.Boolean()
+    message = graphene.String()
+    
+    def mutate(self, info, session_id, question_id, choice_id=None, answer_text=''):
+        """Autosave one answer; saving the same question again replaces it"""
+        if not info.context.user.is_authenticated:
+            return SaveAnswerMutation(success=False, message='Not authenticated')
+        
+        try:
+            save_answer(info.context.user, session_id, question_id, choice_id, answer_text)
+            return SaveAnswerMutation(success=True, message='Answer saved')
+        except ValidationError:
+            return SaveAnswerMutation(success=False, message='Invalid id')
+        except ValueError as e:
+            return SaveAnswerMutation(success=False, message=str(e))
+
 class SubmitQuizMutation(graphene.Mutation):
     class Arguments:
         quiz_id = graphene.String(required=True)
         answers = graphene.List(graphene.types.json.JSONString)
         time_taken = graphene.Int()
+        # Queue the answers and return a pending attempt; poll quizAttempt(id) for the grade
+        defer_grading = graphene.Boolean()
+        # Grade the answers autosaved in this session; `answers` then only
+        # needs the ones not saved yet and wins over saved ones
+        session_id = graphene.String()
     
     attempt = graphene.Field(QuizAttemptType)
     success = graphene.Boolean()
     message = graphene.String()
     
-    def mutate(self, info, quiz_id, answers, time_taken=0):
+    def mutate(self, info, quiz_id, answers=None, time_taken=None, defer_grading=None, session_id=None):
         if not info.context.user.is_authenticated:
             return SubmitQuizMutation(success=False, message='Not authenticated')
         
+        session = None
         try:
-            import json
-            
             quiz = Quiz.objects.get(id=quiz_id)
             
             if not quiz.is_available_now():
                 return SubmitQuizMutation(success=False, message='Quiz is not available')
             
-            attempt = QuizAttempt.objects.create(
-                user=info.context.user,
-                quiz=quiz,
-                total_questions=quiz.questions.count(),
-                time_taken=time_taken
-            )
-            
-            total_score = 0
-            correct_answers = 0
-            
-            # Handle answers - they can be JSON strings or already parsed dicts
-            for answer_item in answers:
-                try:
-                    # Try to parse as JSON string first
-                    if isinstance(answer_item, str):
-                        answer_data = json.loads(answer_item)
-                    else:
-                        # Already a dict
-                        answer_data = answer_item
-                    
-                    question_id = answer_data.get('questionId')
-                    selected_choice_id = answer_data.get('choiceId')
-                    answer_text = answer_data.get('answer_text', '')
-                    
-                    if not question_id:
-                        continue
-                    
-                    question = Question.objects.get(id=question_id, quiz=quiz)
-                    selected_choice = None
-                    is_correct = False
-                    points_earned = 0
-                    
-                    if selected_choice_id:
-                        selected_choice = Choice.objects.get(id=selected_choice_id)
-                        is_correct = selected_choice.is_correct
-                    
-                    if is_correct:
-                        points_earned = question.points
-                        total_score += points_earned
-                        correct_answers += 1
-                    
-                    Answer.objects.create(
-                        attempt=attempt,
-                        question=question,
-                        selected_choice=selected_choice,
-                        answer_text=answer_text,
-                        is_correct=is_correct,
-                        points_earned=points_earned
-                    )
-                except Question.DoesNotExist:
-                    print(f"Question {question_id} not found in quiz {quiz_id}")
-                    continue
-                except Choice.DoesNotExist:
-                    print(f"Choice {selected_choice_id} not found")
-                    continue
-                except Exception as e:
-                    print(f"Error processing answer: {e}")
-                    continue
+            answers = list(answers or [])
+            if session_id:
+                session = claim_session(info.context.user, session_id, quiz.id)
+                if session is None:
+                    return SubmitQuizMutation(success=False, message='Attempt session not found or already submitted')
+                # Grading keeps the first answer to each question
+                answers += session.buffered_answers
+                if time_taken is None:
+                    time_taken = session.elapsed_seconds
+            time_taken = time_taken or 0
             
-            attempt.score = total_score
-            attempt.correct_answers = correct_answers
-            attempt.save()  # This will auto-calculate percentage and status
+            if defer_grading is None:
+                defer_grading = getattr(settings, 'GRADING_DEFER_BY_DEFAULT', False)
+            if defer_grading:
+                with transaction.atomic():
+                    attempt = enqueue_submission(info.context.user, quiz, answers, time_taken)
+                    if session is not None:
+                        finish_session(session, attempt)
+            else:
+                # Group-committed with other submissions arriving at the same moment
+                attempt = submission_coalescer.submit(
+                    QuizAttempt(user=info.context.user, quiz=quiz, time_taken=time_taken), answers)
+                if session is not None:
+                    finish_session(session, attempt)
             
             return SubmitQuizMutation(success=True, attempt=attempt, message='Quiz submitted successfully')
         except Quiz.DoesNotExist:
             return SubmitQuizMutation(success=False, message='Quiz not found')
         except Exception as e:
-            print(f"Submit quiz error: {e}")
-            import traceback
-            traceback.print_exc()
+            if session is not None:
+                reopen_session(session)
+            logger.exception('Submitting quiz %s failed', quiz_id)
             return SubmitQuizMutation(success=False, message=f'Error: {str(e)}')
 
 class UpdateUserRoleMutation(graphene.Mutation):
@@ -864,7 +1221,8 @@ class UpdateProfileMutation(graphene.Mutation):
             user.first_name = first_name
             user.last_name = last_name
             user.email = email
-            user.save()
+            # The request user is a copy of the cached row; only write what changed
+            user.save(update_fields=['first_name', 'last_name', 'email', 'updated_at'])
             
             return UpdateProfileMutation(success=True, message='Profile updated successfully', user=user)
         except Exception as e:
@@ -886,7 +1244,7 @@ class ChangePasswordMutation(graphene.Mutation):
             user = info.context.user
             
             # Check current password
-            if not user.check_password(current_password):
+            if not cpu_bound(user.check_password, current_password):
                 return ChangePasswordMutation(success=False, message='Current password is incorrect')
             
             # Validate new password
@@ -894,8 +1252,8 @@ class ChangePasswordMutation(graphene.Mutation):
                 return ChangePasswordMutation(success=False, message='New password must be at least 6 characters')
             
             # Set new password
-            user.set_password(new_password)
-            user.save()
+            cpu_bound(user.set_password, new_password)
+            user.save(update_fields=['password', 'updated_at'])
             
             return ChangePasswordMutation(success=True, message='Password changed successfully')
         except Exception as e:
@@ -909,9 +1267,14 @@ class Mutation(graphene.ObjectType):
     create_quiz = CreateQuizMutation.Field()
     update_quiz = UpdateQuizMutation.Field()
     create_question = CreateQuestionMutation.Field()
+    create_questions = CreateQuestionsMutation.Field()
+    replace_quiz_questions = ReplaceQuizQuestionsMutation.Field()
     update_question = UpdateQuestionMutation.Field()
+    regrade_quiz = RegradeQuizMutation.Field()
     delete_quiz = DeleteQuizMutation.Field()
     delete_question = DeleteQuestionMutation.Field()
+    start_quiz_attempt = StartQuizAttemptMutation.Field()
+    save_answer = SaveAnswerMutation.Field()
     submit_quiz = SubmitQuizMutation.Field()
     update_user_role = UpdateUserRoleMutation.Field()
     update_user_approval = UpdateUserApprovalMutation.Field()
@@ -923,6 +1286,22 @@ class Mutation(graphene.ObjectType):
     update_profile = UpdateProfileMutation.Field()
     change_password = ChangePasswordMutation.Field()
 
+class QuizConnection(CountableConnection):
+    class Meta:
+        node = QuizType
+
+class UserConnection(CountableConnection):
+    class Meta:
+        node = UserType
+
+class QuizAttemptConnection(CountableConnection):
+    class Meta:
+        node = QuizAttemptType
+
+class SubjectConnection(CountableConnection):
+    class Meta:
+        node = SubjectType
+
 class Query(graphene.ObjectType):
     all_quizzes = graphene.List(QuizType)
     all_users = graphene.List(UserType)
@@ -935,9 +1314,27 @@ class Query(graphene.ObjectType):
     
     # New teacher analytics queries
     quiz_attempts = graphene.List(QuizAttemptType, quiz_id=graphene.String(required=True))
+    quiz_attempt = graphene.Field(QuizAttemptType, id=graphene.String(required=True))
+    regrade_job = graphene.Field(RegradeJobType, id=graphene.String(required=True))
     quiz_analytics = graphene.Field(QuizAnalyticsType, quiz_id=graphene.String(required=True))
     student_performance = graphene.Field(StudentPerformanceType, quiz_id=graphene.String(required=True), user_id=graphene.String(required=True))
     
+    # Admin-only server diagnostics
+    graphql_cache_stats = graphene.List(CacheStatsType)
+    slow_operations = graphene.List(OperationTraceType, limit=graphene.Int(), operation_name=graphene.String())
+    submission_batch_stats = graphene.Field(BatchStatsType)
+    autosave_batch_stats = graphene.Field(BatchStatsType)
+    database_pool_stats = graphene.List(DatabasePoolStatsType)
+    
+    # Keyset-paginated versions of the unbounded list queries
+    all_quizzes_connection = graphene.Field(QuizConnection, first=graphene.Int(), after=graphene.String())
+    all_users_connection = graphene.Field(UserConnection, first=graphene.Int(), after=graphene.String())
+    quiz_results_connection = graphene.Field(QuizAttemptConnection, first=graphene.Int(), after=graphene.String())
+    quiz_attempts_connection = graphene.Field(QuizAttemptConnection, quiz_id=graphene.String(required=True),
+                                              first=graphene.Int(), after=graphene.String())
+    all_subjects_connection = graphene.Field(SubjectConnection, first=graphene.Int(), after=graphene.String())
+    
+    @optimize_queryset
     def resolve_all_quizzes(self, info):
         if not info.context.user.is_authenticated:
             return []
@@ -947,8 +1344,9 @@ class Query(graphene.ObjectType):
         return Quiz.objects.filter(is_published=True)
     
     def resolve_quiz_detail(self, info, id):
-        return Quiz.objects.get(id=id)
+        return quiz_detail(id)
     
+    @optimize_queryset
     def resolve_my_quizzes(self, info):
         if not info.context.user.is_authenticated:
             return []
@@ -957,9 +1355,9 @@ class Query(graphene.ObjectType):
         return []
     
     def resolve_available_quizzes(self, info):
-        quizzes = Quiz.objects.filter(is_published=True)
-        return [q for q in quizzes if q.is_available_now()]
+        return available_quizzes()
     
+    @optimize_queryset
     def resolve_all_users(self, info):
         if not info.context.user.is_authenticated:
             return []
@@ -968,6 +1366,7 @@ class Query(graphene.ObjectType):
             return User.objects.all()
         return []
     
+    @optimize_queryset
     def resolve_quiz_results(self, info):
         if not info.context.user.is_authenticated:
             return []
@@ -982,6 +1381,7 @@ class Query(graphene.ObjectType):
         return Subject.objects.all()
     
     # New teacher analytics resolvers
+    @optimize_queryset
     def resolve_quiz_attempts(self, info, quiz_id):
         if not info.context.user.is_authenticated:
             return []
@@ -995,6 +1395,92 @@ class Query(graphene.ObjectType):
         except Quiz.DoesNotExist:
             return []
     
+    def resolve_quiz_attempt(self, info, id):
+        """One attempt for its student, the quiz author or an admin; poll this for deferred grading"""
+        user = info.context.user
+        if not user.is_authenticated:
+            return None
+        try:
+            attempt = QuizAttempt.objects.select_related('quiz').get(id=id)
+        except (QuizAttempt.DoesNotExist, ValidationError):
+            return None
+        if user.role != 'admin' and attempt.user_id != user.id and attempt.quiz.created_by_id != user.id:
+            return None
+        if attempt.grading_status == QuizAttempt.GRADING_PENDING:
+            # Make sure this process drains the queue even after a restart
+            grading_pool.start()
+        return attempt
+    
+    def resolve_regrade_job(self, info, id):
+        """Progress of a regrade, for the quiz author or an admin"""
+        user = info.context.user
+        if not user.is_authenticated:
+            return None
+        try:
+            job = RegradeJob.objects.select_related('quiz').get(id=id)
+        except (RegradeJob.DoesNotExist, ValidationError):
+            return None
+        if user.role != 'admin' and job.quiz.created_by_id != user.id:
+            return None
+        if job.status == RegradeJob.QUEUED:
+            grading_pool.start()
+        return job
+    
+    def resolve_all_quizzes_connection(self, info, first=None, after=None):
+        quizzes = as_queryset(Query.resolve_all_quizzes(self, info), Quiz)
+        return paginate(quizzes, info, QuizConnection, QUIZ_ORDERING, first, after)
+    
+    def resolve_all_users_connection(self, info, first=None, after=None):
+        users = as_queryset(Query.resolve_all_users(self, info), User)
+        return paginate(users, info, UserConnection, USER_ORDERING, first, after)
+    
+    def resolve_quiz_results_connection(self, info, first=None, after=None):
+        attempts = as_queryset(Query.resolve_quiz_results(self, info), QuizAttempt)
+        return paginate(attempts, info, QuizAttemptConnection, ATTEMPT_ORDERING, first, after)
+    
+    def resolve_quiz_attempts_connection(self, info, quiz_id, first=None, after=None):
+        attempts = as_queryset(Query.resolve_quiz_attempts(self, info, quiz_id=quiz_id), QuizAttempt)
+        return paginate(attempts, info, QuizAttemptConnection, ATTEMPT_ORDERING, first, after)
+    
+    def resolve_all_subjects_connection(self, info, first=None, after=None):
+        subjects = as_queryset(Query.resolve_all_subjects(self, info), Subject)
+        return paginate(subjects, info, SubjectConnection, SUBJECT_ORDERING, first, after)
+    
+    def resolve_graphql_cache_stats(self, info):
+        if not info.context.user.is_authenticated or info.context.user.role != 'admin':
+            return []
+        return [CacheStatsType(**stats) for stats in cache_stats()]
+    
+    def resolve_submission_batch_stats(self, info):
+        if not info.context.user.is_authenticated or info.context.user.role != 'admin':
+            return None
+        return BatchStatsType(**submission_coalescer.stats())
+    
+    def resolve_autosave_batch_stats(self, info):
+        if not info.context.user.is_authenticated or info.context.user.role != 'admin':
+            return None
+        return BatchStatsType(**autosave_coalescer.stats())
+    
+    def resolve_database_pool_stats(self, info):
+        if not info.context.user.is_authenticated or info.context.user.role != 'admin':
+            return []
+        return [DatabasePoolStatsType(**stats) for stats in pool_stats()]
+    
+    def resolve_slow_operations(self, info, limit=10, operation_name=None):
+        if not info.context.user.is_authenticated or info.context.user.role != 'admin':
+            return []
+        return [
+            OperationTraceType(
+                operation_name=trace.operation_name,
+                started_at=trace.started_at,
+                duration_ms=trace.duration * 1000,
+                sql_count=trace.sql_count,
+                sql_ms=trace.sql_time * 1000,
+                resolvers=[ResolverTimingType(**timing) for timing in trace.slowest_resolvers()],
+            )
+            for trace in trace_buffer.slowest(min(limit, 100), operation_name)
+        ]
+    
     def resolve_quiz_analytics(self, info, quiz_id):
         if not info.context.user.is_authenticated:
             return None
@@ -1004,58 +1490,16 @@ class Query(graphene.ObjectType):
             if info.context.user.role != 'admin' and quiz.created_by != info.context.user:
                 return None
             
-            attempts = QuizAttempt.objects.filter(quiz=quiz)
-            if not attempts.exists():
-                return QuizAnalyticsType(
-                    quiz_id=quiz_id,
-                    quiz_title=quiz.title,
-                    total_attempts=0,
-                    unique_students=0,
-                    average_score=0,
-                    highest_score=0,
-                    lowest_score=0,
-                    average_completion_time=0,
-                    pass_rate=0,
-                    question_analytics=[]
-                )
-            
-            # Calculate basic stats
-            scores = [attempt.score for attempt in attempts]
-            completion_times = [attempt.time_taken for attempt in attempts if attempt.time_taken > 0]
-            pass_count = attempts.filter(percentage__gte=60).count()
-            
-            # Question analytics
+            summary = quiz_summary(quiz)
             question_analytics = []
-            for question in quiz.questions.all():
-                answers = Answer.objects.filter(question=question, attempt__quiz=quiz)
-                total_answers = answers.count()
-                correct_answers = answers.filter(is_correct=True).count()
-                
-                if total_answers > 0:
-                    accuracy = (correct_answers / total_answers) * 100
-                    difficulty = 'Easy' if accuracy >= 80 else 'Medium' if accuracy >= 60 else 'Hard'
-                    
-                    question_analytics.append(QuestionAnalyticsType(
-                        question_id=str(question.id),
-                        question_text=question.question_text,
-                        total_attempts=total_answers,
-                        correct_attempts=correct_answers,
-                        accuracy_percentage=accuracy,
-                        average_time_spent=0,  # Can be calculated if we track time per question
-                        difficulty_level=difficulty
-                    ))
+            if summary['total_attempts']:
+                question_analytics = [QuestionAnalyticsType(**row) for row in question_breakdown(quiz)]
             
             return QuizAnalyticsType(
                 quiz_id=quiz_id,
                 quiz_title=quiz.title,
-                total_attempts=attempts.count(),
-                unique_students=attempts.values('user').distinct().count(),
-                average_score=sum(scores) / len(scores) if scores else 0,
-                highest_score=max(scores) if scores else 0,
-                lowest_score=min(scores) if scores else 0,
-                average_completion_time=sum(completion_times) / len(completion_times) if completion_times else 0,
-                pass_rate=(pass_count / attempts.count()) * 100 if attempts.count() > 0 else 0,
-                question_analytics=question_analytics
+                question_analytics=question_analytics,
+                **summary
             )
             
         except Quiz.DoesNotExist:
@@ -1075,6 +1519,9 @@ class Query(graphene.ObjectType):
                 return None
             
             answers = Answer.objects.filter(attempt=attempt).select_related('question', 'selected_choice')
+            answer_nodes = selected_fields(info).get('answers')
+            if answer_nodes:
+                answers = plan_queryset(answers, info, answer_nodes)
             
             return StudentPerformanceType(
                 student_id=user_id,
@@ -0,0 +1,113 @@
+# quiz_api/snapshots.py
+import gzip
+import hashlib
+import json
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Prefetch
+
+from .models import Quiz, Choice, ExamSnapshot
+
+EXAM_SNAPSHOT_KEY = 'quiz_api:exam_snapshot:{}'
+
+# Quizzes changed in this thread whose snapshots wait for the commit
+_pending_syncs = threading.local()
+
+
+def exam_package(quiz):
+    """The quiz settings and ordered questions/choices a student needs to sit it"""
+    questions = quiz.questions.order_by('order', 'id').prefetch_related(
+        Prefetch('choices', queryset=Choice.objects.order_by('order', 'id')))
+    return {
+        'id': quiz.id,
+        'title': quiz.title,
+        'description': quiz.description,
+        'timeLimit': quiz.time_limit,
+        'scheduledStart': quiz.scheduled_start,
+        'scheduledEnd': quiz.scheduled_end,
+        'allowReview': quiz.allow_review,
+        'showScore': quiz.show_score,
+        'randomizeQuestions': quiz.randomize_questions,
+        'randomizeChoices': quiz.randomize_choices,
+        'questions': [
+            {
+                'id': question.id,
+                'questionText': question.question_text,
+                'questionType': question.question_type,
+                'points': question.points,
+                'order': question.order,
+                'choices': [
+                    {'id': choice.id, 'choiceText': choice.choice_text, 'order': choice.order}
+                    for choice in question.choices.all()
+                ],
+            }
+            for question in questions
+        ],
+    }
+
+
+def build_snapshot(quiz):
+    """Compile and store the exam package of ``quiz``; its ETag is the hash of the JSON"""
+    raw = json.dumps(exam_package(quiz), cls=DjangoJSONEncoder, sort_keys=True, separators=(',', ':')).encode()
+    snapshot, _ = ExamSnapshot.objects.update_or_create(quiz=quiz, defaults={
+        'etag': hashlib.sha256(raw).hexdigest(),
+        # mtime=0 keeps the blob byte-identical for identical content
+        'blob': gzip.compress(raw, mtime=0),
+        'scheduled_start': quiz.scheduled_start,
+        'scheduled_end': quiz.scheduled_end,
+    })
+    cache.set(EXAM_SNAPSHOT_KEY.format(quiz.pk), snapshot, getattr(settings, 'EXAM_SNAPSHOT_CACHE_SECONDS', 3600))
+    return snapshot
+
+
+def sync_snapshot(quiz_id):
+    """
+    After commit, rebuild the snapshot of a published quiz or drop the one
+    of an unpublished quiz. Called by the Quiz, Question and Choice save()
+    and delete() hooks and after bulk writes; a quiz changed several times
+    in one transaction is synced once by the first flush that runs.
+    """
+    pending = getattr(_pending_syncs, 'quiz_ids', None)
+    if pending is None:
+        pending = _pending_syncs.quiz_ids = set()
+    pending.add(quiz_id)
+    transaction.on_commit(_sync_pending)
+
+
+def _sync_pending():
+    quiz_ids = getattr(_pending_syncs, 'quiz_ids', None)
+    if not quiz_ids:
+        return
+    _pending_syncs.quiz_ids = set()
+    published = {quiz.pk: quiz for quiz in Quiz.objects.filter(pk__in=quiz_ids, is_published=True)}
+    for quiz_id in quiz_ids:
+        cache.delete(EXAM_SNAPSHOT_KEY.format(quiz_id))
+        if quiz_id in published:
+            build_snapshot(published[quiz_id])
+    ExamSnapshot.objects.filter(quiz_id__in=quiz_ids).exclude(quiz_id__in=published).delete()
+
+
+def get_snapshot(quiz_id):
+    """
+    The stored snapshot of a published quiz, or None. The blob is cached,
+    but the ETag is checked against the row on every call so a rebuild or
+    unpublish in another process is seen at once. Raises ValidationError
+    for a malformed id.
+    """
+    quiz_id = Quiz._meta.pk.to_python(quiz_id)
+    etag = ExamSnapshot.objects.filter(quiz_id=quiz_id).values_list('etag', flat=True).first()
+    if etag is None:
+        return None
+    key = EXAM_SNAPSHOT_KEY.format(quiz_id)
+    snapshot = cache.get(key)
+    if snapshot is None or snapshot.etag != etag:
+        snapshot = ExamSnapshot.objects.filter(quiz_id=quiz_id).first()
+        if snapshot is None:
+            return None
+        snapshot.blob = bytes(snapshot.blob)
+        cache.set(key, snapshot, getattr(settings, 'EXAM_SNAPSHOT_CACHE_SECONDS', 3600))
+    return snapshot
@@ -0,0 +1,5 @@
+import logging
+
+# Access records and other INFO logs of the code under test would drown the
+# test output; tests that check a log use assertLogs, which lowers the level
+logging.getLogger('quiz_api').setLevel(logging.WARNING)
@@ -0,0 +1,119 @@
+from unittest import mock
+
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+
+from quiz_api.analytics import quiz_summary, rebuild_rollups
+from quiz_api.grading import grade_submission
+from quiz_api.management.commands._benchmark import make_attempts, make_quiz, make_users
+from quiz_api.models import QuizAttempt, QuizStats, QuestionStats
+
+
+class RebuildRollupsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_users(1, role='teacher')[0]
+        cls.students = make_users(4)
+        cls.quiz = make_quiz(cls.teacher, questions=3, choices=2)
+        cls.attempts = make_attempts(cls.quiz, cls.students)
+        cls.empty_quiz = make_quiz(cls.teacher, questions=1, choices=2, title='No attempts')
+
+    def test_rebuild_replaces_drifted_rows_in_place(self):
+        QuizStats.objects.create(quiz=self.quiz, attempt_count=99, score_sum=1000)
+        QuizStats.objects.create(quiz=self.empty_quiz, attempt_count=5, min_score=1, max_score=2)
+        QuestionStats.objects.create(question=self.empty_quiz.questions.get(), answer_count=7, correct_count=7)
+
+        self.assertEqual(rebuild_rollups(), (2, 4))
+
+        summary = quiz_summary(self.quiz)
+        scores = [attempt.score for attempt in self.attempts]
+        self.assertEqual(summary['total_attempts'], 4)
+        self.assertEqual(summary['unique_students'], 4)
+        self.assertAlmostEqual(summary['average_score'], sum(scores) / len(scores))
+        self.assertEqual(summary['highest_score'], max(scores))
+        self.assertEqual(summary['lowest_score'], min(scores))
+
+        empty = QuizStats.objects.get(quiz=self.empty_quiz)
+        self.assertEqual((empty.attempt_count, empty.min_score, empty.max_score), (0, None, None))
+        self.assertEqual(QuestionStats.objects.get(question__quiz=self.empty_quiz).answer_count, 0)
+        for stats in QuestionStats.objects.filter(question__quiz=self.quiz):
+            self.assertEqual(stats.answer_count, 4)
+
+    def test_rebuild_limited_to_quizzes(self):
+        QuizStats.objects.create(quiz=self.empty_quiz, attempt_count=5)
+        self.assertEqual(rebuild_rollups([self.quiz.id]), (1, 3))
+        self.assertEqual(QuizStats.objects.get(quiz=self.empty_quiz).attempt_count, 5)
+
+    def test_submit_after_rebuild_counts_on_top(self):
+        rebuild_rollups([self.quiz.id])
+        student = make_users(1, prefix='late')[0]
+        grade_submission(QuizAttempt(user=student, quiz=self.quiz), [])
+        self.assertEqual(QuizStats.objects.get(quiz=self.quiz).attempt_count, 5)
+        self.assertEqual(QuizStats.objects.get(quiz=self.quiz).student_count, 5)
+
+
+class DeletedAttemptsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_users(1, role='teacher')[0]
+        cls.students = make_users(3)
+        cls.quiz = make_quiz(cls.teacher, questions=2, choices=2)
+        make_attempts(cls.quiz, cls.students)
+        rebuild_rollups()
+
+    def stats(self):
+        return QuizStats.objects.get(quiz=self.quiz)
+
+    def test_deleting_an_attempt_rebuilds_its_quiz(self):
+        attempt = QuizAttempt.objects.filter(quiz=self.quiz).order_by('-score').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            attempt.delete()
+        stats = self.stats()
+        self.assertEqual((stats.attempt_count, stats.student_count), (2, 2))
+        self.assertEqual(stats.max_score, QuizAttempt.objects.filter(quiz=self.quiz).order_by('-score')[0].score)
+        for question_stats in QuestionStats.objects.filter(question__quiz=self.quiz):
+            self.assertEqual(question_stats.answer_count, 2)
+
+    def test_cascade_from_user_rebuilds_once(self):
+        with mock.patch('quiz_api.analytics.rebuild_rollups', wraps=rebuild_rollups) as rebuilt:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.students[0].delete()
+                QuizAttempt.objects.filter(user=self.students[1]).delete()
+        rebuilt.assert_called_once_with({self.quiz.id})
+        self.assertEqual((self.stats().attempt_count, self.stats().student_count), (1, 1))
+
+    def test_rolled_back_delete_is_rebuilt_with_the_next(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                QuizAttempt.objects.filter(user=self.students[0]).delete()
+                transaction.set_rollback(True)
+        self.assertEqual(self.stats().attempt_count, 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            QuizAttempt.objects.filter(user=self.students[1]).delete()
+        self.assertEqual(self.stats().attempt_count, 2)
+
+
+class BackfillMigrationTests(TransactionTestCase):
+    before = [('quiz_api', '0004_quiz_schedule_idx')]
+    after = [('quiz_api', '0005_analytics_rollups')]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_existing_attempts_are_counted(self):
+        teacher = make_users(1, role='teacher')[0]
+        quiz = make_quiz(teacher, questions=2, choices=2)
+        make_attempts(quiz, make_users(3))
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        executor.loader.build_graph()
+        executor.migrate(self.after)
+
+        apps = executor.loader.project_state(self.after).apps
+        stats = apps.get_model('quiz_api', 'QuizStats').objects.get(quiz_id=quiz.id)
+        self.assertEqual((stats.attempt_count, stats.student_count), (3, 3))
+        answers = apps.get_model('quiz_api', 'QuestionStats').objects.filter(question__quiz_id=quiz.id)
+        self.assertEqual(sorted(answers.values_list('answer_count', flat=True)), [3, 3])
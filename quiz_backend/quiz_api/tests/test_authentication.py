@@ -0,0 +1,83 @@
+from django.test import RequestFactory, TestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from quiz_api.authentication import authenticate_request, principal_cache
+from quiz_api.management.commands._benchmark import graphql, make_users
+from quiz_api.models import User
+
+SUSPEND = 'mutation S($id: String!) { suspendUser(userId: $id, isSuspended: true) { success message } }'
+ROLE = 'mutation R($id: String!) { updateUserRole(userId: $id, role: "teacher") { success message } }'
+DELETE = 'mutation D($id: String!) { deleteUser(userId: $id) { success message } }'
+PASSWORD = 'mutation P { changePassword(currentPassword: "old-password", newPassword: "new-password") { success } }'
+
+
+class PrincipalCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_users(1, role='admin')[0]
+        cls.student = make_users(1)[0]
+        cls.student.set_password('old-password')
+        cls.student.save()
+
+    def setUp(self):
+        principal_cache.clear()
+        self.token = f'Bearer {RefreshToken.for_user(self.student).access_token}'
+
+    def authenticate(self):
+        return authenticate_request(RequestFactory().get('/', HTTP_AUTHORIZATION=self.token))
+
+    def assertRejected(self, reason):
+        with self.assertLogs('quiz_api.authentication', 'INFO') as logs:
+            self.assertIsNone(self.authenticate())
+        self.assertIn(reason, logs.output[0])
+
+    def admin_mutation(self, query):
+        with self.captureOnCommitCallbacks(execute=True):
+            payload, _, _ = graphql(self.admin, query, {'id': str(self.student.id)})
+        self.assertTrue(list(payload['data'].values())[0]['success'], payload)
+
+    def test_cached_principal_needs_no_query(self):
+        with self.assertNumQueries(1):
+            self.authenticate()
+        with self.assertNumQueries(0):
+            user, _ = self.authenticate()
+        self.assertEqual(user.pk, self.student.pk)
+        # Each request gets its own copy
+        self.assertIsNot(user, self.authenticate()[0])
+
+    def test_suspending_evicts(self):
+        self.authenticate()
+        self.admin_mutation(SUSPEND)
+        self.assertRejected('User is inactive')
+
+    def test_deactivating_outside_the_api_evicts(self):
+        self.authenticate()
+        user = User.objects.get(pk=self.student.pk)
+        user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        self.assertRejected('User is inactive')
+
+    def test_role_change_evicts(self):
+        self.assertEqual(self.authenticate()[0].role, 'student')
+        self.admin_mutation(ROLE)
+        self.assertEqual(self.authenticate()[0].role, 'teacher')
+
+    def test_password_change_evicts(self):
+        old_hash = self.authenticate()[0].password
+        with self.captureOnCommitCallbacks(execute=True):
+            payload, _, _ = graphql(self.student, PASSWORD)
+        self.assertTrue(payload['data']['changePassword']['success'])
+        self.assertIsNone(principal_cache.get(str(self.student.pk)))
+        user, _ = self.authenticate()
+        self.assertNotEqual(user.password, old_hash)
+        self.assertTrue(user.check_password('new-password'))
+
+    def test_deleted_user_token_fails(self):
+        self.authenticate()
+        self.admin_mutation(DELETE)
+        self.assertRejected('User not found')
+
+    def test_deleted_user_token_fails_without_cache(self):
+        User.objects.filter(pk=self.student.pk).delete()
+        self.assertRejected('User not found')
@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from quiz_api.management.commands._benchmark import graphql, make_quiz, make_users
+from quiz_api.models import AttemptSession, Quiz, SavedAnswer
+
+START = 'mutation Start($quizId: String!) { startQuizAttempt(quizId: $quizId) { success message session { id } } }'
+SAVE = '''mutation Save($sessionId: String!, $questionId: String!, $choiceId: String) {
+  saveAnswer(sessionId: $sessionId, questionId: $questionId, choiceId: $choiceId) { success message }
+}'''
+SUBMIT = '''mutation Submit($quizId: String!, $sessionId: String) {
+  submitQuiz(quizId: $quizId, sessionId: $sessionId) { success message attempt { id score } }
+}'''
+
+
+class SaveAnswerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_users(1, role='teacher')[0]
+        cls.student = make_users(1)[0]
+        cls.quiz = make_quiz(cls.teacher, questions=2, choices=2, time_limit=30)
+        cls.question = cls.quiz.questions.order_by('order').first()
+        cls.correct = cls.question.choices.get(is_correct=True)
+
+    def setUp(self):
+        cache.clear()
+        payload, _, _ = graphql(self.student, START, {'quizId': str(self.quiz.id)})
+        self.session_id = payload['data']['startQuizAttempt']['session']['id']
+
+    def save(self):
+        payload, _, _ = graphql(self.student, SAVE, {
+            'sessionId': self.session_id, 'questionId': str(self.question.id), 'choiceId': str(self.correct.id)})
+        return payload['data']['saveAnswer']
+
+    def test_saved_answers_are_graded_and_pruned_on_submit(self):
+        self.assertEqual(self.save(), {'success': True, 'message': 'Answer saved'})
+        self.assertEqual(SavedAnswer.objects.filter(session_id=self.session_id).count(), 1)
+
+        payload, _, _ = graphql(self.student, SUBMIT, {'quizId': str(self.quiz.id), 'sessionId': self.session_id})
+        result = payload['data']['submitQuiz']
+        self.assertTrue(result['success'], result['message'])
+        self.assertEqual(result['attempt']['score'], 1)
+        self.assertFalse(SavedAnswer.objects.filter(session_id=self.session_id).exists())
+        self.assertEqual(str(AttemptSession.objects.get(pk=self.session_id).attempt_id), result['attempt']['id'])
+
+    def test_save_refused_after_quiz_closes(self):
+        Quiz.objects.filter(pk=self.quiz.pk).update(scheduled_end=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(self.save(), {'success': False, 'message': 'Quiz is not available'})
+        self.assertFalse(SavedAnswer.objects.exists())
+
+    def test_save_refused_after_time_limit(self):
+        AttemptSession.objects.filter(pk=self.session_id).update(
+            started_at=timezone.now() - timedelta(minutes=31))
+        self.assertEqual(self.save(), {'success': False, 'message': 'Time limit exceeded'})
+        self.assertFalse(SavedAnswer.objects.exists())
+
+    def test_save_within_grace_period(self):
+        AttemptSession.objects.filter(pk=self.session_id).update(
+            started_at=timezone.now() - timedelta(minutes=30, seconds=10))
+        self.assertTrue(self.save()['success'])
+
+    def test_no_time_limit(self):
+        Quiz.objects.filter(pk=self.quiz.pk).update(time_limit=0)
+        AttemptSession.objects.filter(pk=self.session_id).update(started_at=timezone.now() - timedelta(days=1))
+        self.assertTrue(self.save()['success'])
@@ -0,0 +1,164 @@
+import threading
+import time
+import uuid
+
+from django.db import IntegrityError, connection
+from django.test import TransactionTestCase, override_settings
+
+from quiz_api.batching import GroupCommit, SubmissionCoalescer, _Batch
+from quiz_api.management.commands._benchmark import make_quiz, make_users
+from quiz_api.models import Answer, QuizAttempt, QuizStats
+
+PRIMER = object()
+
+
+class HeldCoalescer(SubmissionCoalescer):
+    """Holds a primer write open so the next writes find a write in flight and group up"""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+        self.writes = []
+
+    def write(self, values):
+        if values == [PRIMER]:
+            self.release.wait(5)
+            return
+        self.writes.append(len(values))
+        super().write(values)
+
+
+@override_settings(SUBMISSION_BATCH_WINDOW_MS=2000, SUBMISSION_BATCH_MAX_SIZE=3)
+class GroupCommitTests(TransactionTestCase):
+    def setUp(self):
+        self.teacher = make_users(1, role='teacher')[0]
+        self.students = make_users(3)
+        self.quiz = make_quiz(self.teacher, questions=2, choices=2)
+        self.question = self.quiz.questions.order_by('order').first()
+        self.correct = self.question.choices.get(is_correct=True)
+
+    def run_threads(self, coalescer, values):
+        results = {}
+
+        def submit(name, value):
+            try:
+                results[name] = coalescer.commit(value)
+            except Exception as e:
+                results[name] = e
+            finally:
+                connection.close()
+
+        primer = threading.Thread(target=submit, args=('primer', PRIMER))
+        primer.start()
+        while not coalescer._in_flight:
+            time.sleep(0.001)
+        threads = [threading.Thread(target=submit, args=(name, value)) for name, value in values.items()]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        coalescer.release.set()
+        primer.join()
+        return results
+
+    def submission(self, student):
+        attempt = QuizAttempt(user=student, quiz=self.quiz)
+        return attempt, [{'questionId': str(self.question.id), 'choiceId': str(self.correct.id)}]
+
+    def test_batch_commits_together(self):
+        coalescer = HeldCoalescer()
+        results = self.run_threads(coalescer, {
+            student.username: self.submission(student) for student in self.students})
+
+        self.assertEqual(coalescer.writes, [3])
+        self.assertEqual(coalescer.stats()['max_batch_size'], 3)
+        for student in self.students:
+            attempt, _ = results[student.username]
+            self.assertEqual((attempt.user_id, attempt.score), (student.id, 1))
+        self.assertEqual(QuizAttempt.objects.count(), 3)
+        self.assertEqual(QuizStats.objects.get(quiz=self.quiz).attempt_count, 3)
+
+    def test_failing_member_does_not_fail_its_batch(self):
+        # No such quiz: the batch transaction fails and each submission is retried alone
+        coalescer = HeldCoalescer()
+        good, other, bad = self.students
+        with self.assertLogs('quiz_api.batching', 'ERROR'):
+            results = self.run_threads(coalescer, {
+                'good': self.submission(good),
+                'other': self.submission(other),
+                'bad': (QuizAttempt(user=bad, quiz_id=uuid.uuid4()), []),
+            })
+
+        self.assertEqual(coalescer.writes, [3, 1, 1, 1])
+        self.assertIsInstance(results['bad'], IntegrityError)
+        for name, student in (('good', good), ('other', other)):
+            attempt, _ = results[name]
+            self.assertEqual(QuizAttempt.objects.get(pk=attempt.pk).user_id, student.id)
+        self.assertFalse(QuizAttempt.objects.filter(user=bad).exists())
+        self.assertEqual(Answer.objects.count(), 2)
+        self.assertEqual(QuizStats.objects.get(quiz=self.quiz).attempt_count, 2)
+
+
+class StuckCoalescer(GroupCommit):
+    """Batches of more than one write hang until released"""
+    window_setting = 'SUBMISSION_BATCH_WINDOW_MS'
+    max_size_setting = 'SUBMISSION_BATCH_MAX_SIZE'
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+        self.writes = []
+
+    def write(self, values):
+        if len(values) > 1 or values == [PRIMER]:
+            self.release.wait(5)
+        self.writes.append(values)
+
+
+@override_settings(SUBMISSION_BATCH_WINDOW_MS=50, SUBMISSION_BATCH_MAX_SIZE=2, BATCH_LEASE_SECONDS=0.2)
+class LeaderTimeoutTests(TransactionTestCase):
+    def commit(self, coalescer, value, results):
+        try:
+            results[value] = coalescer.commit(value)
+        except Exception as e:
+            results[value] = e
+        finally:
+            connection.close()
+
+    def test_follower_of_a_leader_that_never_flushes_writes_alone(self):
+        coalescer = StuckCoalescer()
+        # A leader that opened the batch and then vanished
+        coalescer._batch = _Batch()
+        coalescer._in_flight = 1
+        results = {}
+        started = time.monotonic()
+        with self.assertLogs('quiz_api.batching', 'WARNING'):
+            self.commit(coalescer, 'orphan', results)
+        self.assertEqual(results, {'orphan': 'orphan'})
+        self.assertEqual(coalescer.writes, [['orphan']])
+        self.assertEqual(coalescer._batch.items, [])
+        self.assertGreaterEqual(time.monotonic() - started, 0.25)
+
+    def test_follower_of_a_hung_flush_times_out(self):
+        coalescer = StuckCoalescer()
+        results = {}
+        primer = threading.Thread(target=self.commit, args=(coalescer, PRIMER, results))
+        primer.start()
+        while not coalescer._in_flight:
+            time.sleep(0.001)
+        leader = threading.Thread(target=self.commit, args=(coalescer, 'leader', results))
+        leader.start()
+        while coalescer._batch is None:
+            time.sleep(0.001)
+        started = time.monotonic()
+        self.commit(coalescer, 'follower', results)
+        elapsed = time.monotonic() - started
+        coalescer.release.set()
+        leader.join()
+        primer.join()
+
+        self.assertIsInstance(results['follower'], TimeoutError)
+        self.assertLess(elapsed, 2)
+        # The hung batch still committed both writes once it got going
+        self.assertEqual(results['leader'], 'leader')
+        self.assertIn(['leader', 'follower'], coalescer.writes)
@@ -0,0 +1,159 @@
+import threading
+import time
+import uuid
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from quiz_api import cache as quiz_cache
+from quiz_api.authentication import principal_cache
+from quiz_api.cache import single_flight
+from quiz_api.management.commands._benchmark import graphql, make_quiz, make_users
+from quiz_api.models import Quiz
+
+
+class SingleFlightTests(SimpleTestCase):
+    key = 'tests:single_flight'
+
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_misses_build_once(self):
+        builds = []
+        start = threading.Barrier(8)
+
+        def build():
+            builds.append(1)
+            time.sleep(0.1)
+            return 'value'
+
+        results = []
+
+        def worker():
+            start.wait()
+            results.append(single_flight(self.key, build, 60))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['value'] * 8)
+        self.assertEqual(len(builds), 1)
+        self.assertEqual(quiz_cache._fill_locks, {})
+
+    @override_settings(CACHE_FILL_LOCK_SECONDS=2)
+    def test_lock_is_kept_while_threads_wait(self):
+        # A build that fills nothing lets each waiter in turn try again, one at a
+        # time, queued on the lock rather than polling for another process's marker
+        running = []
+        overlaps = []
+
+        def build():
+            running.append(1)
+            overlaps.append(len(running))
+            time.sleep(0.1)
+            running.pop()
+            return None
+
+        # The third caller arrives while the second one builds
+        threads = [threading.Thread(target=single_flight, args=(self.key, build, 60)) for _ in range(3)]
+        started = time.monotonic()
+        for thread, pause in zip(threads, (0.02, 0.13, 0)):
+            thread.start()
+            time.sleep(pause)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(overlaps, [1, 1, 1])
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(quiz_cache._fill_locks, {})
+
+    @override_settings(CACHE_FILL_LOCK_SECONDS=0.2)
+    def test_other_process_marker_is_left_alone(self):
+        cache.set(f'{self.key}:filling', 'other', 60)
+        self.assertEqual(single_flight(self.key, lambda: 'value', 60), 'value')
+        self.assertEqual(cache.get(f'{self.key}:filling'), 'other')
+
+    def test_own_marker_is_removed(self):
+        single_flight(self.key, lambda: 'value', 60)
+        self.assertIsNone(cache.get(f'{self.key}:filling'))
+
+
+class AvailableQuizzesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_users(1, role='teacher')[0]
+        cls.student = make_users(1)[0]
+
+    def query_count(self):
+        cache.clear()
+        principal_cache.clear()
+        payload, queries, _ = graphql(self.student, '{ availableQuizzes { title questionCount } }')
+        self.assertNotIn('errors', payload)
+        return payload['data']['availableQuizzes'], queries
+
+    def test_question_count_is_annotated(self):
+        make_quiz(self.teacher, questions=3)
+        quizzes, one = self.query_count()
+        self.assertEqual([quiz['questionCount'] for quiz in quizzes], [3])
+        for i in range(9):
+            make_quiz(self.teacher, questions=i)
+        quizzes, ten = self.query_count()
+        self.assertEqual(sorted(quiz['questionCount'] for quiz in quizzes), [0, 1, 2, 3, 3, 4, 5, 6, 7, 8])
+        self.assertEqual(one, ten)
+
+
+class QuizDetailTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_users(1, role='teacher')[0]
+        cls.quiz = make_quiz(cls.teacher, questions=2, choices=2)
+
+    def setUp(self):
+        cache.clear()
+
+    def texts(self):
+        quiz = quiz_cache.quiz_detail(self.quiz.id)
+        return quiz.title, [
+            (question.question_text, [choice.choice_text for choice in question.choices.all()])
+            for question in quiz.questions.all()
+        ]
+
+    def assertCached(self):
+        with self.assertNumQueries(1):
+            return self.texts()
+
+    def test_tree_is_cached_until_the_quiz_changes(self):
+        self.texts()
+        self.assertCached()
+        self.quiz.title = 'Renamed'
+        self.quiz.save(update_fields=['title'])
+        self.assertEqual(self.texts()[0], 'Renamed')
+        self.assertCached()
+
+    def test_question_and_choice_writes_retire_the_tree(self):
+        self.texts()
+        question = self.quiz.questions.order_by('order').first()
+        question.question_text = 'Edited question'
+        question.save()
+        self.assertEqual(self.texts()[1][0][0], 'Edited question')
+
+        choice = question.choices.order_by('order').first()
+        choice.choice_text = 'Edited choice'
+        choice.save()
+        self.assertEqual(self.texts()[1][0][1][0], 'Edited choice')
+        choice.delete()
+        self.assertEqual(len(self.texts()[1][0][1]), 1)
+        question.delete()
+        self.assertEqual(len(self.texts()[1]), 1)
+
+    def test_version_is_read_from_the_database(self):
+        # Another process renewing the version is seen without sharing the cache
+        self.texts()
+        self.quiz.questions.update(question_text='Bulk edit')
+        Quiz.objects.filter(pk=self.quiz.pk).update(content_version=uuid.uuid4())
+        self.assertEqual({text for text, _ in self.texts()[1]}, {'Bulk edit'})
+
+    def test_missing_quiz(self):
+        with self.assertRaises(Quiz.DoesNotExist):
+            quiz_cache.quiz_detail(uuid.uuid4())
@@ -0,0 +1,96 @@
+import json
+
+from django.test import TestCase
+
+from quiz_api.management.commands._benchmark import make_quiz, make_users
+from quiz_api.models import Answer, AttemptSession, Choice, QuizAttempt, SavedAnswer
+from quiz_api.schema import sync_choices
+
+
+class SyncChoicesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_users(1, role='teacher')[0]
+        cls.student = make_users(1)[0]
+        cls.quiz = make_quiz(cls.teacher, questions=2, choices=3)
+
+    def setUp(self):
+        self.question, self.other_question = self.quiz.questions.order_by('order')
+        # Choice 0 is correct
+        self.a, self.b, self.c = self.question.choices.order_by('order')
+        attempt = QuizAttempt.objects.create(user=self.student, quiz=self.quiz)
+        session = AttemptSession.objects.create(user=self.student, quiz=self.quiz)
+        self.answers = {
+            choice.id: (
+                Answer.objects.create(attempt=attempt, question=self.question, selected_choice=choice),
+                SavedAnswer.objects.create(session=session, question=self.question, selected_choice=choice),
+            )
+            for choice in (self.a, self.b, self.c)
+        }
+
+    def payload(self, choice, **changes):
+        data = {'id': str(choice.id), 'text': choice.choice_text, 'isCorrect': choice.is_correct}
+        data.update(changes)
+        return data
+
+    def choices(self):
+        return list(self.question.choices.order_by('order').values_list('id', 'choice_text', 'is_correct'))
+
+    def assertStillPointsAt(self, choice):
+        answer, saved = self.answers[choice.id]
+        answer.refresh_from_db()
+        saved.refresh_from_db()
+        self.assertEqual((answer.selected_choice_id, saved.selected_choice_id), (choice.id, choice.id))
+
+    def test_match_by_id_updates_in_place(self):
+        key_changed = sync_choices(self.question, [
+            self.payload(self.a), self.payload(self.b, text='Edited'), self.payload(self.c)])
+        self.assertFalse(key_changed)
+        self.assertEqual(self.choices(), [
+            (self.a.id, 'Choice 0', True), (self.b.id, 'Edited', False), (self.c.id, 'Choice 2', False)])
+        for choice in (self.a, self.b, self.c):
+            self.assertStillPointsAt(choice)
+
+    def test_match_by_text_without_ids(self):
+        # Reordered, no ids, as an older client sends them
+        key_changed = sync_choices(self.question, [
+            json.dumps({'text': 'Choice 2'}), json.dumps({'text': 'Choice 0', 'isCorrect': True}),
+            json.dumps({'text': 'Choice 1'})])
+        self.assertFalse(key_changed)
+        self.assertEqual(self.choices(), [
+            (self.c.id, 'Choice 2', False), (self.a.id, 'Choice 0', True), (self.b.id, 'Choice 1', False)])
+        for choice in (self.a, self.b, self.c):
+            self.assertStillPointsAt(choice)
+
+    def test_repeated_text_matches_distinct_choices(self):
+        Choice.objects.filter(pk=self.b.pk).update(choice_text='Choice 0')
+        sync_choices(self.question, [{'text': 'Choice 0', 'isCorrect': True}, {'text': 'Choice 0'}])
+        self.assertEqual(self.choices(), [(self.a.id, 'Choice 0', True), (self.b.id, 'Choice 0', False)])
+
+    def test_choices_not_sent_are_deleted(self):
+        sync_choices(self.question, [self.payload(self.a), {'text': 'New'}])
+        rows = self.choices()
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0], (self.a.id, 'Choice 0', True))
+        self.assertNotIn(rows[1][0], {self.b.id, self.c.id})
+        self.assertEqual(rows[1][1:], ('New', False))
+        self.assertStillPointsAt(self.a)
+        answer, saved = self.answers[self.b.id]
+        answer.refresh_from_db()
+        saved.refresh_from_db()
+        self.assertEqual((answer.selected_choice_id, saved.selected_choice_id), (None, None))
+
+    def test_unchanged_list_writes_nothing(self):
+        with self.assertNumQueries(1):
+            key_changed = sync_choices(self.question, [self.payload(c) for c in (self.a, self.b, self.c)])
+        self.assertFalse(key_changed)
+
+    def test_moving_the_correct_answer_changes_the_key(self):
+        self.assertTrue(sync_choices(self.question, [
+            self.payload(self.a, isCorrect=False), self.payload(self.b, isCorrect=True), self.payload(self.c)]))
+        self.assertStillPointsAt(self.b)
+
+    def test_id_of_another_question_is_rejected(self):
+        foreign = self.other_question.choices.first()
+        with self.assertRaises(ValueError):
+            sync_choices(self.question, [self.payload(foreign)])
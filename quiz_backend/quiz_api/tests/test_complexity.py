@@ -0,0 +1,98 @@
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.test import SimpleTestCase, override_settings
+from graphql import get_operation_ast, parse
+
+from quiz_api.complexity import LIST_SIZES, QueryCostError, analyze_operation, check_operation
+from quiz_api.models import User
+from quiz_api.schema import schema
+
+CONNECTION = 'allQuizzesConnection(first: {}) {{ edges {{ node {{ id }} }} }}'
+
+
+def operation(query):
+    document = parse(query)
+    return document, get_operation_ast(document)
+
+
+def analyze(query, variables=None):
+    return analyze_operation(schema.graphql_schema, *operation(query), variables)
+
+
+def check(query, user):
+    return check_operation(schema.graphql_schema, *operation(query), None, user)
+
+
+def query_of_depth(depth):
+    """quizAttempt > quiz > attempts > quiz ... nested down to an id at ``depth``"""
+    fields = (['quizAttempt(id: "1")'] + ['quiz', 'attempts'] * depth)[:depth - 1]
+    return '{ ' + ' { '.join(fields) + ' { id' + ' }' * (depth - 1) + ' }'
+
+
+def query_of_cost(cost):
+    """Connections of 100 quizzes (300 each) topped up with single objects (1 each)"""
+    connections = [f'c{i}: {CONNECTION.format(100)}' for i in range(cost // 300)]
+    objects = [f'o{i}: userProfile {{ id }}' for i in range(cost % 300)]
+    return '{ ' + ' '.join(connections + objects) + ' }'
+
+
+class QueryLimitTests(SimpleTestCase):
+    def users(self):
+        yield 'anonymous', AnonymousUser()
+        for role in ('student', 'teacher', 'admin'):
+            yield role, User(username=role, role=role)
+
+    def test_helpers_build_what_they_say(self):
+        self.assertEqual(analyze(query_of_depth(2)), (2, 1))
+        self.assertEqual(analyze(query_of_cost(301)), (4, 301))
+
+    @mock.patch.dict(LIST_SIZES, {'QuizType.attempts': 1})
+    def test_depth_limit_per_role(self):
+        for role, user in self.users():
+            limit = settings.GRAPHQL_QUERY_LIMITS[role]['depth']
+            with self.subTest(role=role):
+                self.assertEqual(check(query_of_depth(limit), user)['depth'], limit)
+                with self.assertRaisesMessage(QueryCostError, f'Query depth {limit + 1} exceeds the limit of {limit}'):
+                    check(query_of_depth(limit + 1), user)
+
+    def test_cost_limit_per_role(self):
+        for role, user in self.users():
+            limit = settings.GRAPHQL_QUERY_LIMITS[role]['cost']
+            with self.subTest(role=role):
+                self.assertEqual(check(query_of_cost(limit), user)['cost'], limit)
+                with self.assertRaisesMessage(QueryCostError, f'Query cost {limit + 1} exceeds the limit of {limit}') as error:
+                    check(query_of_cost(limit + 1), user)
+                self.assertEqual(error.exception.extensions['code'], 'QUERY_TOO_COMPLEX')
+                self.assertEqual(error.exception.extensions['cost']['maxCost'], limit)
+
+    @override_settings(GRAPHQL_QUERY_LIMITS={'anonymous': {'depth': 3, 'cost': 10}})
+    def test_limits_come_from_settings(self):
+        # Roles missing from the settings fall back to the anonymous limits
+        with self.assertRaisesMessage(QueryCostError, 'Query cost 11 exceeds the limit of 10'):
+            check(query_of_cost(11), User(role='admin'))
+
+
+@override_settings(GRAPHQL_DEFAULT_PAGE_SIZE=20, GRAPHQL_MAX_PAGE_SIZE=100, GRAPHQL_COST_LIST_SIZE=20)
+class ListCostTests(SimpleTestCase):
+    def cost(self, query, variables=None):
+        return analyze(query, variables)[1]
+
+    def test_first_scales_connection_cost(self):
+        five = self.cost(f'{{ {CONNECTION.format(5)} }}')
+        self.assertEqual(five, 15)
+        self.assertEqual(self.cost(f'{{ {CONNECTION.format(10)} }}'), 2 * five)
+        self.assertEqual(self.cost('{ allQuizzesConnection { edges { node { id } } } }'), 4 * five)
+        self.assertEqual(self.cost(f'{{ {CONNECTION.format(1000)} }}'), 20 * five)
+        query = 'query Q($first: Int) { allQuizzesConnection(first: $first) { edges { node { id } } } }'
+        self.assertEqual(self.cost(query, {'first': 10}), 2 * five)
+
+    def test_first_scales_nested_lists(self):
+        nested = '{{ allQuizzesConnection(first: {}) {{ edges {{ node {{ questions {{ id }} }} }} }} }}'
+        self.assertEqual(self.cost(nested.format(2)), 2 * self.cost(nested.format(1)))
+
+    def test_plain_lists_use_expected_sizes(self):
+        self.assertEqual(self.cost('{ allQuizzes { id } }'), 20)
+        self.assertEqual(self.cost('{ allQuizzes { attempts { id } } }'), 20 * (1 + 100))
+        self.assertEqual(self.cost('{ allQuizzes { questionCount } }'), 20 * (1 + 2))
@@ -0,0 +1,61 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+from graphql import validate
+
+from quiz_api import documents
+from quiz_api.documents import LRUCache, document_cache, parse_and_validate
+from quiz_api.schema import schema
+
+
+class LRUCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = LRUCache('tests', maxsize=2)
+        self.addCleanup(documents.ALL_CACHES.remove, self.cache)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.assertEqual(self.cache.get('a'), 1)
+        self.cache.set('c', 3)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual((self.cache.get('a'), self.cache.get('c')), (1, 3))
+        stats = self.cache.stats()
+        self.assertEqual((stats['size'], stats['hits'], stats['misses']), (2, 3, 1))
+
+    def test_entries_expire_after_ttl(self):
+        self.cache.ttl = 10
+        with mock.patch('quiz_api.documents.time.monotonic', return_value=100):
+            self.cache.set('a', 1)
+        with mock.patch('quiz_api.documents.time.monotonic', return_value=109):
+            self.assertEqual(self.cache.get('a'), 1)
+        with mock.patch('quiz_api.documents.time.monotonic', return_value=110):
+            self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.stats()['size'], 0)
+
+
+class ParseAndValidateTests(SimpleTestCase):
+    def setUp(self):
+        document_cache.clear()
+        self.addCleanup(document_cache.clear)
+
+    def test_cache_hit_skips_parse_and_validation(self):
+        query = '{ allSubjects { id name } }'
+        with mock.patch('quiz_api.documents.validate', wraps=validate) as validated:
+            first = parse_and_validate(schema.graphql_schema, query)
+            second = parse_and_validate(schema.graphql_schema, query)
+        self.assertEqual(validated.call_count, 1)
+        self.assertIs(first, second)
+        self.assertEqual(first[1], [])
+        self.assertEqual(document_cache.stats()['hits'], 1)
+
+    def test_errors_are_cached_too(self):
+        with mock.patch('quiz_api.documents.validate', wraps=validate) as validated:
+            for _ in range(2):
+                document, errors = parse_and_validate(schema.graphql_schema, '{ noSuchField }')
+                self.assertIsNotNone(document)
+                self.assertEqual(len(errors), 1)
+            for _ in range(2):
+                document, errors = parse_and_validate(schema.graphql_schema, '{ broken')
+                self.assertIsNone(document)
+        self.assertEqual(validated.call_count, 1)
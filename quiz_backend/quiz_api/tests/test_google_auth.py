@@ -0,0 +1,148 @@
+import json
+import os
+import tempfile
+import time
+from unittest import mock
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from quiz_api import google_auth
+from quiz_api.google_auth import FileKeySource, GoogleTokenError, SigningKeyCache, verify_id_token
+from quiz_api.management.commands._benchmark import graphql
+from quiz_api.models import User
+
+CLIENT_ID = 'test-client.apps.googleusercontent.com'
+
+
+class SigningKey:
+    """An RSA key pair and its JWKS entry, as Google publishes them"""
+
+    def __init__(self, kid):
+        self.kid = kid
+        self.private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    def jwk(self):
+        jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(self.private_key.public_key()))
+        return {**jwk, 'kid': self.kid, 'alg': 'RS256', 'use': 'sig'}
+
+    def sign(self, **claims):
+        now = int(time.time())
+        payload = {
+            'iss': 'https://accounts.google.com', 'aud': CLIENT_ID, 'sub': '1234567890',
+            'email': 'student@example.com', 'email_verified': True, 'iat': now, 'exp': now + 3600,
+        }
+        payload.update(claims)
+        return jwt.encode(payload, self.private_key, algorithm='RS256', headers={'kid': self.kid})
+
+
+class JwksFileMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.current = SigningKey('key-1')
+        cls.rotated = SigningKey('key-2')
+        cls.stranger = SigningKey('key-1')
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.jwks_path = os.path.join(directory.name, 'jwks.json')
+        self.publish(self.current)
+        self.keys = SigningKeyCache(FileKeySource(self.jwks_path), min_refresh=0)
+
+    def publish(self, *keys):
+        with open(self.jwks_path, 'w') as f:
+            json.dump({'keys': [key.jwk() for key in keys]}, f)
+
+
+@override_settings(GOOGLE_CLIENT_ID=f'other-client,{CLIENT_ID}', GOOGLE_TOKEN_LEEWAY=30)
+class VerifyIdTokenTests(JwksFileMixin, SimpleTestCase):
+    def assertRejected(self, token, message):
+        with self.assertRaisesMessage(GoogleTokenError, message):
+            verify_id_token(token, self.keys)
+
+    def test_valid_token(self):
+        claims = verify_id_token(self.current.sign(), self.keys)
+        self.assertEqual((claims['sub'], claims['email']), ('1234567890', 'student@example.com'))
+        self.assertEqual(verify_id_token(self.current.sign(iss='accounts.google.com'), self.keys)['aud'], CLIENT_ID)
+
+    def test_wrong_audience(self):
+        self.assertRejected(self.current.sign(aud='someone-else'), 'Audience')
+
+    def test_wrong_issuer(self):
+        self.assertRejected(self.current.sign(iss='https://evil.example.com'), 'Invalid issuer')
+
+    def test_expired(self):
+        now = int(time.time())
+        self.assertRejected(self.current.sign(iat=now - 7200, exp=now - 60), 'expired')
+        # Within the leeway
+        verify_id_token(self.current.sign(iat=now - 7200, exp=now - 10), self.keys)
+
+    def test_missing_claim(self):
+        now = int(time.time())
+        token = jwt.encode({'iss': 'accounts.google.com', 'aud': CLIENT_ID, 'iat': now, 'exp': now + 60},
+                           self.current.private_key, algorithm='RS256', headers={'kid': 'key-1'})
+        self.assertRejected(token, 'sub')
+
+    def test_forged_signature(self):
+        self.assertRejected(self.stranger.sign(), 'Signature verification failed')
+
+    def test_unknown_kid(self):
+        self.assertRejected(self.rotated.sign(), 'unknown key')
+
+    def test_refetch_after_rotation(self):
+        verify_id_token(self.current.sign(), self.keys)
+        self.publish(self.rotated)
+        self.assertEqual(verify_id_token(self.rotated.sign(), self.keys)['sub'], '1234567890')
+        self.assertRejected(self.current.sign(), 'unknown key')
+
+    def test_unknown_kid_refetch_is_rate_limited(self):
+        keys = SigningKeyCache(FileKeySource(self.jwks_path), min_refresh=3600)
+        verify_id_token(self.current.sign(), keys)
+        self.publish(self.current, self.rotated)
+        with self.assertRaises(GoogleTokenError):
+            verify_id_token(self.rotated.sign(), keys)
+
+    def test_failed_refresh_keeps_keys(self):
+        verify_id_token(self.current.sign(), self.keys)
+        with open(self.jwks_path, 'w') as f:
+            f.write('not json')
+        with self.assertLogs('quiz_api.google_auth', 'ERROR'):
+            self.keys.refresh()
+        verify_id_token(self.current.sign(), self.keys)
+
+    @override_settings(GOOGLE_CLIENT_ID='')
+    def test_client_id_required(self):
+        self.assertRejected(self.current.sign(), 'GOOGLE_CLIENT_ID')
+
+
+@override_settings(GOOGLE_CLIENT_ID=CLIENT_ID)
+class GoogleAuthMutationTests(JwksFileMixin, TestCase):
+    query = 'mutation G($t: String) { googleAuth(idToken: $t) { success message user { email } } }'
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(google_auth, 'signing_keys', self.keys)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def sign_in(self, token):
+        payload, _, _ = graphql(None, self.query, {'t': token})
+        return payload['data']['googleAuth']
+
+    def test_signs_in_with_a_verified_token(self):
+        result = self.sign_in(self.current.sign())
+        self.assertTrue(result['success'], result['message'])
+        self.assertEqual(User.objects.get(email='student@example.com').google_id, '1234567890')
+
+    def test_unverified_email_is_refused(self):
+        result = self.sign_in(self.current.sign(email_verified=False))
+        self.assertEqual(result['message'], 'Google account email is not verified')
+        self.assertFalse(User.objects.exists())
+
+    def test_bad_token_is_refused(self):
+        result = self.sign_in(self.current.sign(aud='someone-else'))
+        self.assertFalse(result['success'])
+        self.assertTrue(result['message'].startswith('Google token verification failed'))
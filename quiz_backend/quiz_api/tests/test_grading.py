@@ -0,0 +1,114 @@
+import uuid
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from quiz_api.grading import grade_submission, grade_submissions
+from quiz_api.management.commands._benchmark import make_quiz, make_users
+from quiz_api.models import Answer, QuizAttempt
+
+
+class GradeSubmissionsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_users(1, role='teacher')[0]
+        cls.students = make_users(3)
+        cls.quiz = make_quiz(cls.teacher, questions=4, choices=3)
+        cls.questions = list(cls.quiz.questions.order_by('order'))
+        for question in cls.questions:
+            question.correct, question.wrong = (
+                list(question.choices.filter(is_correct=True)), list(question.choices.filter(is_correct=False)))
+
+    def answer(self, question, choice=None):
+        answer = {'questionId': str(question.id)}
+        if choice is not None:
+            answer['choiceId'] = str(choice if isinstance(choice, uuid.UUID) else choice.id)
+        return answer
+
+    def submit(self, answers, student=None):
+        attempt = QuizAttempt(user=student or self.students[0], quiz=self.quiz)
+        return grade_submission(attempt, answers)
+
+    def test_scores_correct_and_wrong_answers(self):
+        q1, q2, q3, q4 = self.questions
+        attempt = self.submit([
+            self.answer(q1, q1.correct[0]),
+            self.answer(q2, q2.correct[0]),
+            self.answer(q3, q3.wrong[0]),
+        ])
+        attempt.refresh_from_db()
+        self.assertEqual((attempt.score, attempt.correct_answers, attempt.total_questions), (2, 2, 4))
+        self.assertEqual(attempt.percentage, 50)
+        self.assertEqual(attempt.status, 'poor')
+        self.assertEqual(attempt.answers.count(), 3)
+        self.assertEqual(attempt.answers.filter(is_correct=True).count(), 2)
+
+    def test_choice_of_another_question_is_skipped(self):
+        q1, q2, _, _ = self.questions
+        with self.assertLogs('quiz_api.grading', 'INFO'):
+            attempt = self.submit([self.answer(q1, q2.correct[0])])
+        self.assertEqual((attempt.score, attempt.correct_answers), (0, 0))
+        self.assertFalse(attempt.answers.exists())
+
+    def test_duplicate_answers_keep_the_first(self):
+        q1 = self.questions[0]
+        attempt = self.submit([self.answer(q1, q1.wrong[0]), self.answer(q1, q1.correct[0])])
+        self.assertEqual((attempt.score, attempt.correct_answers), (0, 0))
+        self.assertEqual(list(attempt.answers.values_list('selected_choice', flat=True)), [q1.wrong[0].id])
+
+    def test_missing_choice(self):
+        q1, q2, _, _ = self.questions
+        with self.assertLogs('quiz_api.grading', 'INFO'):
+            attempt = self.submit([self.answer(q1), self.answer(q2, uuid.uuid4())])
+        self.assertEqual((attempt.score, attempt.correct_answers), (0, 0))
+        # No choice is a wrong answer; a choice that does not exist is skipped
+        answer = attempt.answers.get()
+        self.assertEqual((answer.question_id, answer.selected_choice_id, answer.is_correct), (q1.id, None, False))
+
+    def test_unknown_question_and_malformed_answers_are_skipped(self):
+        q1 = self.questions[0]
+        with self.assertLogs('quiz_api.grading', 'INFO') as logs:
+            attempt = self.submit([
+                {'questionId': str(uuid.uuid4()), 'choiceId': str(q1.correct[0].id)},
+                {'questionId': 'not-a-uuid'},
+                '{not json',
+                self.answer(q1, q1.correct[0]),
+            ])
+        self.assertEqual(len(logs.records), 3)
+        self.assertEqual((attempt.score, attempt.correct_answers), (1, 1))
+        self.assertEqual(attempt.answers.count(), 1)
+
+    def test_json_encoded_answers(self):
+        q1 = self.questions[0]
+        attempt = self.submit([f'{{"questionId": "{q1.id}", "choiceId": "{q1.correct[0].id}"}}'])
+        self.assertEqual(attempt.score, 1)
+
+    def test_batch_is_stored_with_a_constant_number_of_queries(self):
+        def full_marks(question):
+            return self.answer(question, question.correct[0])
+
+        with CaptureQueriesContext(connection) as single:
+            grade_submissions([(QuizAttempt(user=self.students[0], quiz=self.quiz),
+                                [full_marks(self.questions[0])])])
+        submissions = [
+            (QuizAttempt(user=student, quiz=self.quiz), [full_marks(question) for question in self.questions])
+            for student in self.students
+        ]
+        with CaptureQueriesContext(connection) as batch:
+            attempts = grade_submissions(submissions)
+
+        self.assertEqual(len(batch), len(single))
+        self.assertEqual([attempt.score for attempt in attempts], [4, 4, 4])
+        self.assertEqual(QuizAttempt.objects.filter(pk__in=[a.pk for a in attempts]).count(), 3)
+        self.assertEqual(Answer.objects.filter(attempt__in=attempts).count(), 12)
+        self.assertEqual(sum('INSERT INTO "quiz_api_answer"' in q['sql'] for q in batch.captured_queries), 1)
+
+    def test_pending_attempt_is_updated(self):
+        q1 = self.questions[0]
+        attempt = QuizAttempt.objects.create(
+            user=self.students[0], quiz=self.quiz, grading_status=QuizAttempt.GRADING_PENDING)
+        grade_submission(attempt, [self.answer(q1, q1.correct[0])])
+        attempt.refresh_from_db()
+        self.assertEqual((attempt.grading_status, attempt.score), (QuizAttempt.GRADED, 1))
+        self.assertEqual(QuizAttempt.objects.filter(user=self.students[0]).count(), 1)
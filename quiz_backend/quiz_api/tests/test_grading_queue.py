@@ -0,0 +1,150 @@
+import json
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from quiz_api import grading_queue
+from quiz_api.grading_queue import claim_job, enqueue_submission, grading_pool, process_next_job
+from quiz_api.management.commands._benchmark import graphql, make_quiz, make_users
+from quiz_api.models import GradingJob, QuizAttempt
+
+SUBMIT = '''mutation Submit($quizId: String!, $answers: [JSONString]) {
+  submitQuiz(quizId: $quizId, answers: $answers, deferGrading: true) {
+    success message attempt { id gradingStatus }
+  }
+}'''
+POLL = 'query Poll($id: String!) { quizAttempt(id: $id) { gradingStatus score correctAnswers status } }'
+
+
+def correct_answers(quiz):
+    return [
+        {'questionId': str(question.id), 'choiceId': str(question.choices.get(is_correct=True).id)}
+        for question in quiz.questions.all()
+    ]
+
+
+class ClaimJobTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_users(1, role='teacher')[0]
+        cls.students = make_users(2)
+        cls.quiz = make_quiz(cls.teacher, questions=2, choices=2)
+
+    def enqueue(self, student=None):
+        return enqueue_submission(student or self.students[0], self.quiz, correct_answers(self.quiz), 30)
+
+    def test_racing_workers_claim_different_jobs(self):
+        first, second = self.enqueue(), self.enqueue(self.students[1])
+        GradingJob.objects.filter(pk=second.pk).update(created_at=timezone.now() + timedelta(seconds=1))
+        claimed = {}
+        claimable = grading_queue._claimable
+        calls = []
+
+        def racing(now):
+            calls.append(now)
+            if len(calls) == 2:
+                # The other worker takes the job between our read and our UPDATE
+                claimed['other'] = claim_job()
+            return claimable(now)
+
+        with mock.patch('quiz_api.grading_queue._claimable', side_effect=racing):
+            claimed['ours'] = claim_job()
+        self.assertEqual((claimed['other'].pk, claimed['ours'].pk), (first.pk, second.pk))
+        self.assertIsNone(claim_job())
+
+    def test_expired_lease_is_claimed_again(self):
+        attempt = self.enqueue()
+        self.assertEqual(claim_job().pk, attempt.pk)
+        self.assertIsNone(claim_job())
+        GradingJob.objects.filter(pk=attempt.pk).update(claimed_at=timezone.now() - timedelta(seconds=59))
+        self.assertIsNone(claim_job())
+        GradingJob.objects.filter(pk=attempt.pk).update(claimed_at=timezone.now() - timedelta(seconds=61))
+        self.assertEqual(claim_job().pk, attempt.pk)
+
+    @override_settings(GRADING_MAX_TRIES=3)
+    def test_failing_job_ends_failed_after_max_tries(self):
+        attempt = self.enqueue()
+        with mock.patch('quiz_api.grading_queue.grade_submission', side_effect=RuntimeError('boom')):
+            for tries in range(1, 4):
+                with self.assertLogs('quiz_api.grading_queue', 'ERROR'):
+                    self.assertTrue(process_next_job())
+                job = GradingJob.objects.get(pk=attempt.pk)
+                self.assertEqual((job.tries, job.last_error, job.claimed_at), (tries, 'boom', None))
+                expected = QuizAttempt.GRADING_FAILED if tries == 3 else QuizAttempt.GRADING_PENDING
+                self.assertEqual(QuizAttempt.objects.get(pk=attempt.pk).grading_status, expected)
+        # Out of tries: left in the table for inspection but never claimed again
+        self.assertFalse(process_next_job())
+
+    def test_successful_job_is_graded_and_removed(self):
+        attempt = self.enqueue()
+        self.assertTrue(process_next_job())
+        attempt.refresh_from_db()
+        self.assertEqual((attempt.grading_status, attempt.correct_answers, attempt.percentage),
+                         (QuizAttempt.GRADED, 2, 100))
+        self.assertFalse(GradingJob.objects.exists())
+        self.assertFalse(process_next_job())
+
+
+@override_settings(GRADING_WORKERS=1, GRADING_POLL_SECONDS=0.05)
+class DeferredSubmitTests(TransactionTestCase):
+    def setUp(self):
+        self.teacher = make_users(1, role='teacher')[0]
+        self.student = make_users(1)[0]
+        self.quiz = make_quiz(self.teacher, questions=3, choices=2)
+        self.addCleanup(grading_pool.stop)
+
+    def test_threads_never_claim_a_job_twice(self):
+        students = make_users(8, prefix='race')
+        # Only the racing threads below may claim these
+        with mock.patch.object(grading_pool, 'notify'):
+            for student in students:
+                enqueue_submission(student, self.quiz, [], 0)
+        start = threading.Barrier(4)
+        claims = []
+
+        def worker():
+            start.wait()
+            try:
+                while True:
+                    try:
+                        job = claim_job()
+                    except OperationalError:
+                        # The shared-cache test database fails a concurrent
+                        # write at once where a busy timeout would wait
+                        continue
+                    if job is None:
+                        break
+                    claims.append(job.pk)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(claims), sorted(GradingJob.objects.values_list('pk', flat=True)))
+        self.assertEqual(len(claims), 8)
+
+    def test_submit_then_poll_until_graded(self):
+        payload, _, _ = graphql(self.student, SUBMIT, {
+            'quizId': str(self.quiz.id), 'answers': [json.dumps(answer) for answer in correct_answers(self.quiz)]})
+        result = payload['data']['submitQuiz']
+        self.assertTrue(result['success'], result['message'])
+        self.assertEqual(result['attempt']['gradingStatus'], 'PENDING')
+
+        deadline = time.monotonic() + 5
+        while True:
+            payload, _, _ = graphql(self.student, POLL, {'id': result['attempt']['id']})
+            # A poll colliding with the worker's write fails on the test database; poll again
+            attempt = (payload.get('data') or {}).get('quizAttempt')
+            if attempt and attempt['gradingStatus'] != 'PENDING' or time.monotonic() > deadline:
+                break
+            time.sleep(0.05)
+        self.assertEqual(attempt, {'gradingStatus': 'GRADED', 'score': 3.0, 'correctAnswers': 3, 'status': 'EXCELLENT'})
+        self.assertFalse(GradingJob.objects.exists())
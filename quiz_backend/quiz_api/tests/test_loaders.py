@@ -0,0 +1,91 @@
+import uuid
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from quiz_api.authentication import principal_cache
+from quiz_api.loaders import Loaders
+from quiz_api.management.commands._benchmark import graphql, make_attempts, make_quiz, make_users
+from quiz_api.models import Quiz
+
+# availableQuizzes returns a plain list, so every nested level is served by the loaders
+NESTED = '''{
+  availableQuizzes {
+    id title
+    createdBy { username }
+    questions { id questionText choices { id choiceText } }
+    attempts { id score user { username } }
+  }
+}'''
+
+
+class NestedListQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teachers = make_users(2, role='teacher')
+        cls.students = make_users(3)
+        # The nested selection costs more than a student may spend
+        cls.admin = make_users(1, role='admin')[0]
+
+    def add_quizzes(self, count):
+        for i in range(count):
+            quiz = make_quiz(self.teachers[i % 2], questions=3, choices=2, title=f'Quiz {i}')
+            make_attempts(quiz, self.students)
+
+    def run_query(self):
+        cache.clear()
+        principal_cache.clear()
+        payload, queries, _ = graphql(self.admin, NESTED)
+        self.assertNotIn('errors', payload)
+        return payload['data']['availableQuizzes'], queries
+
+    def test_query_count_does_not_grow_with_quizzes(self):
+        self.add_quizzes(1)
+        quizzes, one = self.run_query()
+        self.assertEqual(len(quizzes), 1)
+        self.add_quizzes(49)
+        quizzes, fifty = self.run_query()
+        self.assertEqual(len(quizzes), 50)
+        self.assertEqual(one, fifty)
+        for quiz in quizzes:
+            self.assertEqual(len(quiz['questions']), 3)
+            self.assertTrue(all(len(question['choices']) == 2 for question in quiz['questions']))
+            self.assertEqual(len(quiz['attempts']), 3)
+
+
+class LoadersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        teacher = make_users(1, role='teacher')[0]
+        for i in range(3):
+            make_quiz(teacher, questions=2, choices=2, title=f'Quiz {i}')
+
+    def test_primed_keys_load_with_one_query_per_level(self):
+        loaders = Loaders()
+        quizzes = list(Quiz.objects.all())
+        loaders.prime_from(quizzes)
+        with self.assertNumQueries(1):
+            questions = loaders.questions_by_quiz.load(quizzes[0].pk)
+            for quiz in quizzes[1:]:
+                self.assertEqual(len(loaders.questions_by_quiz.load(quiz.pk)), 2)
+        # Loading the questions queued their choices
+        with self.assertNumQueries(1):
+            for quiz in quizzes:
+                for question in loaders.questions_by_quiz.load(quiz.pk):
+                    self.assertEqual(len(loaders.choices_by_question.load(question.pk)), 2)
+        with self.assertNumQueries(1):
+            users = loaders.user.load_many(quiz.created_by_id for quiz in quizzes)
+        self.assertEqual({user.pk for user in users}, {quizzes[0].created_by_id})
+        self.assertEqual(len(questions), 2)
+
+    def test_missing_keys_get_the_default(self):
+        loaders = Loaders()
+        self.assertEqual(loaders.questions_by_quiz.load(uuid.uuid4()), [])
+        self.assertIsNone(loaders.quiz.load(uuid.uuid4()))
+
+    def test_deferred_columns_are_not_primed(self):
+        loaders = Loaders()
+        with self.assertNumQueries(1):
+            loaders.prime_from(Quiz.objects.only('id'))
+        self.assertEqual(loaders.user._queue, set())
+        self.assertEqual(len(loaders.questions_by_quiz._queue), 3)
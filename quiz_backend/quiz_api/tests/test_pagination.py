@@ -0,0 +1,85 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from quiz_api.management.commands._benchmark import graphql, make_quiz, make_users
+from quiz_api.models import Quiz
+from quiz_api.pagination import decode_cursor, encode_cursor
+
+PAGE = '''query Page($first: Int, $after: String) {
+  allQuizzesConnection(first: $first, after: $after) {
+    edges { cursor node { id title } }
+    pageInfo { hasNextPage hasPreviousPage endCursor }
+  }
+}'''
+UNCOUNTED = '''query Page($first: Int) {
+  allQuizzesConnection(first: $first) { edges { node { id } } }
+}'''
+COUNTED = '''query Page($first: Int) {
+  allQuizzesConnection(first: $first) { totalCount edges { node { id } } }
+}'''
+
+
+class PaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_users(1, role='teacher')[0]
+        cls.student = make_users(1)[0]
+        for i in range(7):
+            make_quiz(cls.teacher, questions=0, title=f'Quiz {i}')
+        make_quiz(cls.teacher, questions=0, title='Draft', is_published=False)
+        # Ties on created_at are broken by the primary key
+        Quiz.objects.update(created_at=timezone.now())
+
+    def page(self, first=None, after=None):
+        payload, _, _ = graphql(self.student, PAGE, {'first': first, 'after': after})
+        return payload
+
+    def test_cursors_walk_every_row_once(self):
+        seen = []
+        after = None
+        while True:
+            connection_ = self.page(first=3, after=after)['data']['allQuizzesConnection']
+            seen.extend(edge['node']['id'] for edge in connection_['edges'])
+            self.assertEqual(connection_['pageInfo']['hasPreviousPage'], after is not None)
+            if not connection_['pageInfo']['hasNextPage']:
+                break
+            after = connection_['pageInfo']['endCursor']
+        self.assertEqual(len(seen), 7)
+        expected = Quiz.objects.filter(is_published=True).order_by('-created_at', '-id')
+        self.assertEqual(seen, [str(pk) for pk in expected.values_list('id', flat=True)])
+
+    def test_cursor_round_trip(self):
+        values = [timezone.now(), '1234']
+        self.assertEqual(decode_cursor(encode_cursor(values), 2), [str(value) for value in values])
+
+    def test_invalid_cursors_are_rejected(self):
+        for cursor in ('not base64!', encode_cursor(['only one']), encode_cursor(['not a date', 'x'])):
+            payload = self.page(first=3, after=cursor)
+            self.assertEqual(payload['errors'][0]['message'], 'Invalid cursor')
+
+    @override_settings(GRAPHQL_MAX_PAGE_SIZE=4, GRAPHQL_DEFAULT_PAGE_SIZE=2)
+    def test_first_is_clamped(self):
+        def size(first):
+            return len(self.page(first=first)['data']['allQuizzesConnection']['edges'])
+
+        self.assertEqual(size(None), 2)
+        self.assertEqual(size(3), 3)
+        self.assertEqual(size(100), 4)
+        self.assertEqual(size(0), 0)
+        self.assertEqual(self.page(first=-1)['errors'][0]['message'], 'first must be a positive integer')
+
+    def count_queries(self, query):
+        with CaptureQueriesContext(connection) as queries:
+            payload, _, _ = graphql(self.student, query, {'first': 2})
+        self.assertNotIn('errors', payload)
+        return payload['data']['allQuizzesConnection'], [query['sql'] for query in queries if 'COUNT(' in query['sql']]
+
+    def test_total_count_only_when_selected(self):
+        connection_, counts = self.count_queries(UNCOUNTED)
+        self.assertEqual(counts, [])
+        connection_, counts = self.count_queries(COUNTED)
+        self.assertEqual(connection_['totalCount'], 7)
+        self.assertEqual(len(connection_['edges']), 2)
+        self.assertEqual(len(counts), 1)
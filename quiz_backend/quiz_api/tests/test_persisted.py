@@ -0,0 +1,51 @@
+import json
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from quiz_api.documents import query_hash
+from quiz_api.models import PersistedQuery
+from quiz_api.persisted import persisted_cache
+
+
+class AutomaticPersistedQueryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        persisted_cache.clear()
+
+    def post(self, query=None, sha256=None):
+        body = {'extensions': {'persistedQuery': {'version': 1, 'sha256Hash': sha256 or query_hash(query)}}}
+        if query is not None:
+            body['query'] = query
+        return self.client.post('/graphql/', json.dumps(body), content_type='application/json').json()
+
+    def test_valid_query_is_registered_and_served_by_hash(self):
+        query = 'query Typename { __typename }'
+        self.assertEqual(self.post(query)['data'], {'__typename': 'Query'})
+        self.assertTrue(PersistedQuery.objects.filter(sha256=query_hash(query)).exists())
+        self.assertEqual(self.post(sha256=query_hash(query))['data'], {'__typename': 'Query'})
+
+    def test_invalid_queries_are_not_registered(self):
+        for query in ('query Broken { __typename', 'query Unknown { noSuchField }'):
+            self.assertTrue(self.post(query)['errors'])
+        self.assertFalse(PersistedQuery.objects.exists())
+
+    def test_hash_mismatch_is_rejected(self):
+        payload = self.post('{ __typename }', sha256=query_hash('{ other }'))
+        self.assertEqual(payload['errors'][0]['extensions']['code'], 'PERSISTED_QUERY_HASH_MISMATCH')
+        self.assertFalse(PersistedQuery.objects.exists())
+
+    @override_settings(GRAPHQL_PERSISTED_ANONYMOUS_REGISTRATIONS=2)
+    def test_anonymous_registrations_are_capped(self):
+        queries = [f'query Q{i} {{ __typename }}' for i in range(3)]
+        for query in queries:
+            self.assertEqual(self.post(query)['data'], {'__typename': 'Query'})
+        self.assertEqual(
+            set(PersistedQuery.objects.values_list('sha256', flat=True)),
+            {query_hash(query) for query in queries[:2]},
+        )
+
+    @override_settings(GRAPHQL_PERSISTED_ANONYMOUS_REGISTRATIONS=0)
+    def test_anonymous_registration_can_be_disabled(self):
+        self.assertEqual(self.post('{ __typename }')['data'], {'__typename': 'Query'})
+        self.assertFalse(PersistedQuery.objects.exists())
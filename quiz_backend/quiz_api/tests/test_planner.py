@@ -0,0 +1,66 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from quiz_api.management.commands._benchmark import graphql, make_quiz, make_users
+
+FRAGMENTS = '''
+query {
+  allQuizzes {
+    ...QuizFields
+    ... on QuizType { createdBy { username } }
+  }
+}
+fragment QuizFields on QuizType {
+  title
+  questions { ...QuestionFields }
+}
+fragment QuestionFields on QuestionType { questionText }
+'''
+
+
+class PlannerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_users(1, role='teacher')[0]
+        cls.student = make_users(1)[0]
+        make_quiz(cls.teacher, questions=2, choices=2, description='Not selected')
+
+    def run_query(self, query):
+        with CaptureQueriesContext(connection) as queries:
+            payload, _, _ = graphql(self.student, query)
+        self.assertNotIn('errors', payload)
+        return payload['data'], [query['sql'] for query in queries]
+
+    def find(self, queries, table):
+        return [sql for sql in queries if sql.startswith('SELECT') and f'FROM "{table}"' in sql]
+
+    def test_fragments_prune_columns(self):
+        data, queries = self.run_query(FRAGMENTS)
+        quiz = data['allQuizzes'][0]
+        self.assertEqual(quiz['title'], 'Benchmark Quiz')
+        self.assertEqual(quiz['createdBy']['username'], self.teacher.username)
+        self.assertEqual(len(quiz['questions']), 2)
+
+        [quiz_sql] = self.find(queries, 'quiz_api_quiz')
+        self.assertIn('"quiz_api_quiz"."title"', quiz_sql)
+        self.assertNotIn('"quiz_api_quiz"."description"', quiz_sql)
+        # The inline fragment's relation is joined, reading only what it selects
+        self.assertIn('"quiz_api_user"."username"', quiz_sql)
+        self.assertNotIn('"quiz_api_user"."email"', quiz_sql)
+        [question_sql] = self.find(queries, 'quiz_api_question')
+        self.assertIn('"quiz_api_question"."question_text"', question_sql)
+        self.assertNotIn('"quiz_api_question"."points"', question_sql)
+        self.assertFalse(self.find(queries, 'quiz_api_choice'))
+
+    def test_computed_fields_load_their_columns(self):
+        data, queries = self.run_query('{ allQuizzes { isAvailable } }')
+        self.assertTrue(data['allQuizzes'][0]['isAvailable'])
+        [quiz_sql] = self.find(queries, 'quiz_api_quiz')
+        self.assertIn('"quiz_api_quiz"."scheduled_start"', quiz_sql)
+        self.assertNotIn('"quiz_api_quiz"."title"', quiz_sql)
+
+    def test_stats_are_annotated_on_the_list(self):
+        data, queries = self.run_query('{ allQuizzes { title questionCount } }')
+        self.assertEqual(data['allQuizzes'][0]['questionCount'], 2)
+        self.assertEqual(len(self.find(queries, 'quiz_api_quiz')), 1)
@@ -0,0 +1,235 @@
+import os
+import tempfile
+import threading
+import time
+import uuid
+from unittest import skipUnless
+
+from django.db import OperationalError, connection, connections, transaction
+from django.db.utils import load_backend
+from django.test import SimpleTestCase, TransactionTestCase
+
+from quiz_api.db_backends.pool import ConnectionPool, PoolTimeout, get_pool
+
+
+class FakeConnection:
+    def __init__(self):
+        self.broken = False
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def ping(conn):
+    if conn.broken:
+        raise RuntimeError('server closed the connection unexpectedly')
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def pool(self, **options):
+        options = {'max_size': 2, 'timeout': 0.1, **options}
+        return ConnectionPool('test', 'test', **options)
+
+    def test_checkout_and_return(self):
+        pool = self.pool()
+        first = pool.acquire(FakeConnection, ping)
+        second = pool.acquire(FakeConnection, ping)
+        self.assertIsNot(first, second)
+        pool.release(first)
+        self.assertIs(pool.acquire(FakeConnection, ping), first)
+        stats = pool.stats()
+        self.assertEqual((stats['created'], stats['acquired'], stats['in_use'], stats['size']), (2, 3, 2, 2))
+
+    def test_exhausted_pool_times_out(self):
+        pool = self.pool()
+        pool.acquire(FakeConnection, ping)
+        pool.acquire(FakeConnection, ping)
+        started = time.monotonic()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(FakeConnection, ping)
+        self.assertGreaterEqual(time.monotonic() - started, 0.1)
+        stats = pool.stats()
+        self.assertEqual((stats['timeouts'], stats['waiting'], stats['in_use'], stats['created']), (1, 0, 2, 2))
+
+    def test_waiter_gets_the_returned_connection(self):
+        pool = self.pool(max_size=1, timeout=5)
+        held = pool.acquire(FakeConnection, ping)
+        borrowed = []
+        waiter = threading.Thread(target=lambda: borrowed.append(pool.acquire(FakeConnection, ping)))
+        waiter.start()
+        while not pool.stats()['waiting']:
+            time.sleep(0.001)
+        pool.release(held)
+        waiter.join()
+        self.assertEqual(borrowed, [held])
+        self.assertEqual(pool.stats()['created'], 1)
+
+    def test_broken_idle_connection_is_replaced(self):
+        pool = self.pool(ping_after=0)
+        conn = pool.acquire(FakeConnection, ping)
+        pool.release(conn)
+        conn.broken = True
+        with self.assertLogs('quiz_api.db_backends.pool', 'INFO'):
+            replacement = pool.acquire(FakeConnection, ping)
+        self.assertIsNot(replacement, conn)
+        self.assertTrue(conn.closed)
+        stats = pool.stats()
+        self.assertEqual((stats['size'], stats['discarded'], stats['created']), (1, 1, 2))
+
+    def test_unreusable_connection_is_closed(self):
+        pool = self.pool()
+        conn = pool.acquire(FakeConnection, ping)
+        pool.release(conn, reusable=False)
+        self.assertTrue(conn.closed)
+        self.assertEqual((pool.stats()['size'], pool.stats()['idle']), (0, 0))
+
+    def test_old_connection_is_retired(self):
+        pool = self.pool(max_lifetime=0)
+        conn = pool.acquire(FakeConnection, ping)
+        pool.release(conn)
+        self.assertTrue(conn.closed)
+        self.assertIsNot(pool.acquire(FakeConnection, ping), conn)
+
+    def test_failed_connect_frees_its_slot(self):
+        pool = self.pool(max_size=1)
+
+        def refuse():
+            raise OSError('connection refused')
+
+        with self.assertRaises(OSError):
+            pool.acquire(refuse, ping)
+        self.assertEqual(pool.stats()['size'], 0)
+        pool.acquire(FakeConnection, ping)
+
+
+class PooledBackendTests:
+    """Checkout, exhaustion and discarding through a pooled DatabaseWrapper"""
+    engine = None
+
+    def setUp(self):
+        self.alias = f'pool_test_{uuid.uuid4().hex[:8]}'
+        self.settings_dict = {
+            **connection.settings_dict,
+            **self.database(),
+            'ENGINE': self.engine,
+            'CONN_MAX_AGE': 0,
+            'POOL': {'MAX_SIZE': 2, 'TIMEOUT': 0.2, 'PING_AFTER': 0},
+        }
+        self.addCleanup(lambda: self.pool.close_idle())
+
+    def database(self):
+        return {}
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict)
+
+    def wrapper(self):
+        backend = load_backend(self.settings_dict['ENGINE'])
+        db = backend.DatabaseWrapper(dict(self.settings_dict), self.alias)
+        self.addCleanup(db.close)
+        return db
+
+    def query(self, db, sql='SELECT 1'):
+        with db.cursor() as cursor:
+            cursor.execute(sql)
+            return cursor.fetchone()
+
+    def test_checkout_and_return(self):
+        first = self.wrapper()
+        self.assertEqual(self.query(first), (1,))
+        raw = first.connection
+        first.close()
+        self.assertEqual(self.pool.stats()['idle'], 1)
+
+        second = self.wrapper()
+        self.query(second)
+        self.assertIs(second.connection, raw)
+        self.assertTrue(second.get_autocommit())
+        stats = self.pool.stats()
+        self.assertEqual((stats['created'], stats['acquired'], stats['in_use']), (1, 2, 1))
+
+    def test_exhausted_pool_times_out(self):
+        held = [self.wrapper(), self.wrapper()]
+        for db in held:
+            self.query(db)
+        with self.assertLogs('quiz_api.db_backends.pool', 'WARNING'):
+            with self.assertRaises(OperationalError):
+                self.query(self.wrapper())
+        self.assertEqual(self.pool.stats()['timeouts'], 1)
+        held[0].close()
+        self.query(self.wrapper())
+
+    def test_threads_share_the_pool(self):
+        errors = []
+
+        def work():
+            try:
+                for _ in range(5):
+                    db = load_backend(self.settings_dict['ENGINE']).DatabaseWrapper(
+                        dict(self.settings_dict), self.alias)
+                    self.query(db)
+                    db.close()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=work) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        stats = self.pool.stats()
+        self.assertLessEqual(stats['created'], 2)
+        self.assertLessEqual(stats['peak_in_use'], 2)
+        self.assertEqual((stats['acquired'], stats['in_use']), (30, 0))
+
+    def test_connection_with_errors_is_discarded(self):
+        db = self.wrapper()
+        with self.assertRaises(Exception):
+            self.query(db, 'SELECT * FROM no_such_table')
+        raw = db.connection
+        db.close()
+        stats = self.pool.stats()
+        self.assertEqual((stats['size'], stats['idle'], stats['discarded']), (0, 0, 1))
+        other = self.wrapper()
+        self.query(other)
+        self.assertIsNot(other.connection, raw)
+
+    def test_connection_closed_in_a_transaction_is_discarded(self):
+        db = connections[self.alias] = self.wrapper()
+        self.addCleanup(connections.__delitem__, self.alias)
+        with transaction.atomic(using=self.alias):
+            self.query(db)
+            db.close()
+        stats = self.pool.stats()
+        self.assertEqual((stats['size'], stats['discarded']), (0, 1))
+
+    def test_dead_idle_connection_is_replaced(self):
+        db = self.wrapper()
+        self.query(db)
+        raw = db.connection
+        db.close()
+        # The server dropped it while it sat idle
+        raw.close()
+        other = self.wrapper()
+        with self.assertLogs('quiz_api.db_backends.pool', 'INFO'):
+            self.assertEqual(self.query(other), (1,))
+        self.assertIsNot(other.connection, raw)
+        self.assertEqual(self.pool.stats()['created'], 2)
+
+
+class SQLitePoolTests(PooledBackendTests, TransactionTestCase):
+    engine = 'quiz_api.db_backends.sqlite3'
+
+    def database(self):
+        # A file: the backend keeps in-memory databases out of the pool
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        return {'NAME': os.path.join(directory.name, 'pool.sqlite3')}
+
+
+@skipUnless(connection.vendor == 'postgresql', 'DATABASE_URL does not point at PostgreSQL')
+class PostgresPoolTests(PooledBackendTests, TransactionTestCase):
+    engine = 'quiz_api.db_backends.postgresql'
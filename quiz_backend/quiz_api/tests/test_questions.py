@@ -0,0 +1,114 @@
+import json
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from quiz_api.authentication import principal_cache
+from quiz_api.management.commands._benchmark import graphql, make_attempts, make_quiz, make_users
+from quiz_api.models import Choice, Question
+
+CREATE = '''mutation Create($quizId: String!, $questions: [JSONString]!) {
+  createQuestions(quizId: $quizId, questions: $questions) {
+    success message questions { id questionText order choices { choiceText } }
+  }
+}'''
+REPLACE = '''mutation Replace($quizId: String!, $questions: [JSONString]!) {
+  replaceQuizQuestions(quizId: $quizId, questions: $questions) {
+    success message questions { id order }
+  }
+}'''
+
+
+def question(text='New question', **fields):
+    fields.setdefault('choices', [{'text': 'Right', 'isCorrect': True}, {'text': 'Wrong'}])
+    return {'questionText': text, **fields}
+
+
+class BatchQuestionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_users(1, role='teacher')[0]
+        cls.student = make_users(1)[0]
+        cls.quiz = make_quiz(cls.teacher, questions=2, choices=2)
+
+    def run_mutation(self, mutation, questions, quiz=None):
+        # Start every request from cold caches so query counts compare
+        cache.clear()
+        principal_cache.clear()
+        payload, queries, _ = graphql(self.teacher, mutation, {
+            'quizId': str((quiz or self.quiz).id),
+            'questions': [json.dumps(item) if isinstance(item, dict) else item for item in questions],
+        })
+        self.assertNotIn('errors', payload)
+        return next(iter(payload['data'].values())), queries
+
+    def test_questions_are_numbered_after_existing_ones(self):
+        Question.objects.filter(quiz=self.quiz, order=1).update(order=5)
+        result, _ = self.run_mutation(CREATE, [question('A'), question('B', points=2)])
+        self.assertTrue(result['success'], result['message'])
+        self.assertEqual(result['message'], '2 questions saved')
+        self.assertEqual([(q['questionText'], q['order']) for q in result['questions']], [('A', 6), ('B', 7)])
+        self.assertEqual(result['questions'][0]['choices'], [{'choiceText': 'Right'}, {'choiceText': 'Wrong'}])
+        self.assertEqual(self.quiz.questions.count(), 4)
+        self.assertEqual(Question.objects.get(question_text='B').points, 2)
+
+    def test_invalid_payloads_write_nothing(self):
+        rejections = {
+            json.dumps([1, 2]): 'malformed payload',
+            json.dumps(question(points='many')): 'malformed payload',
+            json.dumps(question('  ')): 'questionText is required',
+            json.dumps(question(questionType='essay')): "unknown questionType 'essay'",
+            json.dumps(question(points=-1)): 'points must not be negative',
+            json.dumps(question(choices=[{'text': 'Only', 'isCorrect': True}])): 'needs at least two choices',
+            json.dumps(question(choices=[{'text': 'A'}, {'text': 'B'}])): 'needs a correct choice',
+            json.dumps(question(choices=[{'text': 'A', 'isCorrect': True}, {'text': ' '}])): 'choices need a text',
+        }
+        counts = Question.objects.count(), Choice.objects.count()
+        for payload, message in rejections.items():
+            with self.subTest(message=message):
+                result, _ = self.run_mutation(CREATE, [question(), payload])
+                self.assertFalse(result['success'])
+                self.assertTrue(result['message'].startswith('Question 2: '), result['message'])
+                self.assertIn(message, result['message'])
+                self.assertEqual((Question.objects.count(), Choice.objects.count()), counts)
+
+    def test_short_answer_needs_no_choices(self):
+        result, _ = self.run_mutation(CREATE, [question(questionType='short_answer', choices=[])])
+        self.assertTrue(result['success'], result['message'])
+
+    def test_empty_batch_is_refused(self):
+        result, _ = self.run_mutation(CREATE, [])
+        self.assertEqual((result['success'], result['message']), (False, 'No questions given'))
+
+    @override_settings(QUESTION_BATCH_MAX_SIZE=3)
+    def test_batch_size_is_capped(self):
+        result, _ = self.run_mutation(CREATE, [question()] * 4)
+        self.assertEqual((result['success'], result['message']), (False, 'At most 3 questions per request'))
+        self.assertEqual(self.quiz.questions.count(), 2)
+        result, _ = self.run_mutation(CREATE, [question()] * 3)
+        self.assertTrue(result['success'], result['message'])
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        _, one = self.run_mutation(CREATE, [question()])
+        _, many = self.run_mutation(CREATE, [question(f'Q{n}') for n in range(50)])
+        self.assertEqual(one, many)
+
+    def test_replace_starts_over(self):
+        old = set(self.quiz.questions.values_list('pk', flat=True))
+        result, _ = self.run_mutation(REPLACE, [question('A'), question('B')])
+        self.assertTrue(result['success'], result['message'])
+        self.assertEqual([q['order'] for q in result['questions']], [0, 1])
+        self.assertFalse(Question.objects.filter(pk__in=old).exists())
+        self.assertEqual(self.quiz.questions.count(), 2)
+
+    def test_replace_refused_once_attempted(self):
+        make_attempts(self.quiz, [self.student])
+        result, _ = self.run_mutation(REPLACE, [question()])
+        self.assertEqual((result['success'], result['message']),
+                         (False, 'Quiz already has attempts; edit its questions one by one'))
+        self.assertEqual(self.quiz.questions.count(), 2)
+
+    def test_other_teachers_quiz(self):
+        quiz = make_quiz(make_users(1, role='teacher', prefix='other')[0], questions=0)
+        result, _ = self.run_mutation(CREATE, [question()], quiz=quiz)
+        self.assertEqual((result['success'], result['message']), (False, 'Quiz not found'))
@@ -0,0 +1,136 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from quiz_api.management.commands._benchmark import make_attempts, make_quiz, make_users
+from quiz_api.models import Answer, QuizAttempt, QuizStats, RegradeJob
+from quiz_api.regrade import (
+    _percentage, _status, enqueue_regrade, process_next_regrade, regrade_attempts,
+)
+
+
+class StatusExpressionTests(TestCase):
+    def test_sql_matches_python_at_every_ratio(self):
+        teacher = make_users(1, role='teacher')[0]
+        student = make_users(1)[0]
+        quiz = make_quiz(teacher, questions=0)
+        # Every k/n up to n=30 covers 60/70/80/90 exactly (3/5, 7/10, 4/5, 9/10)
+        # as well as ratios whose float product lands just below a bound
+        attempts = QuizAttempt.objects.bulk_create([
+            QuizAttempt(user=student, quiz=quiz, total_questions=total, correct_answers=correct)
+            for total in range(31)
+            for correct in range(total + 1)
+        ])
+        rows = QuizAttempt.objects.annotate(sql_percentage=_percentage(), sql_status=_status())
+        by_pk = {attempt.pk: attempt for attempt in attempts}
+        seen = set()
+        for row in rows:
+            attempt = by_pk[row.pk]
+            self.assertEqual(row.sql_percentage, attempt.calculate_percentage(), (row.correct_answers, row.total_questions))
+            self.assertEqual(row.sql_status, attempt.determine_status(), (row.correct_answers, row.total_questions))
+            seen.add(row.sql_status)
+        self.assertEqual(seen, {'excellent', 'very_good', 'good', 'fair', 'poor'})
+
+
+class RegradeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_users(1, role='teacher')[0]
+        cls.students = make_users(5)
+        cls.quiz = make_quiz(cls.teacher, questions=2, choices=2)
+        cls.q1, cls.q2 = cls.quiz.questions.order_by('order')
+        # Students 0, 2 and 4 answer q1 right and q2 wrong; 1 and 3 the reverse
+        make_attempts(cls.quiz, cls.students)
+
+    def regrade(self, question=None):
+        job = enqueue_regrade(self.quiz.id, question.id if question else None)
+        self.assertTrue(process_next_regrade())
+        job.refresh_from_db()
+        self.assertEqual(job.status, RegradeJob.DONE)
+        return job
+
+    def attempts(self):
+        return {
+            attempt.user_id: attempt
+            for attempt in QuizAttempt.objects.filter(quiz=self.quiz)
+        }
+
+    def test_points_change_regrades_only_that_question(self):
+        self.q1.points = 3
+        self.q1.save()
+        # Left alone by a regrade scoped to q1
+        Answer.objects.filter(question=self.q2, is_correct=True).update(points_earned=7)
+        job = self.regrade(self.q1)
+        self.assertEqual((job.total_attempts, job.processed_attempts), (5, 5))
+        for n, student in enumerate(self.students):
+            attempt = self.attempts()[student.id]
+            self.assertEqual(attempt.score, 3 if n % 2 == 0 else 7)
+            self.assertEqual(attempt.correct_answers, 1)
+        self.assertEqual(QuizStats.objects.get(quiz=self.quiz).score_sum, 3 * 3 + 2 * 7)
+
+    def test_answer_key_change_flips_results(self):
+        right, wrong = self.q1.choices.order_by('order')
+        right.is_correct = False
+        right.save()
+        wrong.is_correct = True
+        wrong.save()
+        self.regrade(self.q1)
+        for n, student in enumerate(self.students):
+            attempt = self.attempts()[student.id]
+            expected = 0 if n % 2 == 0 else 2
+            self.assertEqual((attempt.correct_answers, attempt.score), (expected, expected))
+            self.assertEqual(attempt.percentage, attempt.calculate_percentage())
+            self.assertEqual(attempt.status, attempt.determine_status())
+        stats = QuizStats.objects.get(quiz=self.quiz)
+        self.assertEqual((stats.pass_count, stats.max_score, stats.min_score), (2, 2, 0))
+
+    def test_regrade_attempts_is_idempotent(self):
+        ids = list(QuizAttempt.objects.filter(quiz=self.quiz).values_list('pk', flat=True))
+        before = sorted(QuizAttempt.objects.values_list('score', 'correct_answers', 'percentage', 'status'))
+        regrade_attempts(ids)
+        regrade_attempts(ids, [self.q1.id])
+        self.assertEqual(sorted(QuizAttempt.objects.values_list('score', 'correct_answers', 'percentage', 'status')),
+                         before)
+
+    @override_settings(REGRADE_CHUNK_SIZE=2)
+    def test_progress_is_recorded_per_chunk(self):
+        progress = []
+
+        def record(chunk, question_ids):
+            # Progress committed by the previous chunks
+            progress.append(RegradeJob.objects.get().processed_attempts)
+            regrade_attempts(chunk, question_ids)
+
+        with mock.patch('quiz_api.regrade.regrade_attempts', side_effect=record) as regraded:
+            job = self.regrade()
+        self.assertEqual([len(call.args[0]) for call in regraded.call_args_list], [2, 2, 1])
+        self.assertEqual(progress, [0, 2, 4])
+        self.assertEqual((job.total_attempts, job.processed_attempts, job.progress), (5, 5, 1.0))
+
+
+class EnqueueRegradeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_users(1, role='teacher')[0]
+        cls.quiz = make_quiz(cls.teacher, questions=2, choices=2)
+        cls.q1, cls.q2 = cls.quiz.questions.order_by('order')
+
+    def test_queued_job_is_reused(self):
+        job = enqueue_regrade(self.quiz.id, self.q1.id)
+        self.assertEqual(enqueue_regrade(self.quiz.id, self.q1.id).pk, job.pk)
+        self.assertEqual(RegradeJob.objects.get().question_id, self.q1.id)
+
+    def test_different_scope_widens_to_the_whole_quiz(self):
+        job = enqueue_regrade(self.quiz.id, self.q1.id)
+        widened = enqueue_regrade(self.quiz.id, self.q2.id)
+        self.assertEqual((widened.pk, widened.question_id), (job.pk, None))
+        self.assertIsNone(RegradeJob.objects.get().question_id)
+        # A whole-quiz job covers any later question
+        self.assertIsNone(enqueue_regrade(self.quiz.id, self.q1.id).question_id)
+        self.assertEqual(RegradeJob.objects.count(), 1)
+
+    def test_running_job_is_not_reused(self):
+        job = enqueue_regrade(self.quiz.id, self.q1.id)
+        RegradeJob.objects.filter(pk=job.pk).update(status=RegradeJob.RUNNING)
+        self.assertNotEqual(enqueue_regrade(self.quiz.id, self.q1.id).pk, job.pk)
+        self.assertEqual(RegradeJob.objects.count(), 2)
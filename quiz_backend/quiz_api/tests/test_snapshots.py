@@ -0,0 +1,144 @@
+import gzip
+import json
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from quiz_api.management.commands._benchmark import make_quiz, make_users
+from quiz_api.models import Choice, ExamSnapshot, Question, Quiz
+from quiz_api.snapshots import EXAM_SNAPSHOT_KEY, build_snapshot, get_snapshot
+
+
+def auth(user):
+    return {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(user).access_token}'}
+
+
+class SnapshotSyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_users(1, role='teacher')[0]
+        cls.student = make_users(1)[0]
+        cls.quiz = make_quiz(cls.teacher, questions=2, choices=2)
+        build_snapshot(cls.quiz)
+
+    def setUp(self):
+        cache.clear()
+
+    def exam(self):
+        return self.client.get(f'/api/quiz/{self.quiz.pk}/exam/', **auth(self.student))
+
+    def package(self):
+        return json.loads(self.exam().content)
+
+    def patch(self, url, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(url, json.dumps(data), content_type='application/json', **auth(self.teacher))
+        self.assertEqual(response.status_code, 200)
+
+    def test_rest_unpublish_drops_the_snapshot(self):
+        self.assertEqual(self.exam().status_code, 200)
+        self.patch(f'/api/quiz/{self.quiz.pk}/', {'is_published': False})
+        self.assertFalse(ExamSnapshot.objects.filter(quiz=self.quiz).exists())
+        self.assertEqual(self.exam().status_code, 404)
+
+    def test_rest_question_edit_rebuilds_the_snapshot(self):
+        before = self.exam()
+        question = self.quiz.questions.order_by('order').first()
+        self.patch(f'/api/questions/{question.pk}/', {'question_text': 'Edited over REST'})
+        after = self.exam()
+        self.assertNotEqual(after['ETag'], before['ETag'])
+        self.assertEqual(json.loads(after.content)['questions'][0]['questionText'], 'Edited over REST')
+
+    def test_model_writes_sync_once_per_transaction(self):
+        question = self.quiz.questions.order_by('order').first()
+        with mock.patch('quiz_api.snapshots.build_snapshot', wraps=build_snapshot) as built:
+            with self.captureOnCommitCallbacks(execute=True):
+                question.question_text = 'Edited'
+                question.save()
+                Choice.objects.create(question=question, choice_text='Added', order=9)
+                self.quiz.save()
+        self.assertEqual(built.call_count, 1)
+        package = self.package()
+        self.assertEqual(package['questions'][0]['questionText'], 'Edited')
+        self.assertEqual(len(package['questions'][0]['choices']), 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            question.delete()
+        self.assertEqual(len(self.package()['questions']), 1)
+
+    def test_stale_cached_snapshot_is_replaced(self):
+        # Another process rebuilt the row; this process still caches the old blob
+        old = get_snapshot(self.quiz.pk)
+        Question.objects.filter(quiz=self.quiz).update(question_text='Rebuilt elsewhere')
+        build_snapshot(Quiz.objects.get(pk=self.quiz.pk))
+        cache.set(EXAM_SNAPSHOT_KEY.format(self.quiz.pk), old)
+        self.assertNotEqual(get_snapshot(self.quiz.pk).etag, old.etag)
+        ExamSnapshot.objects.filter(quiz=self.quiz).delete()
+        self.assertIsNone(get_snapshot(self.quiz.pk))
+
+
+class ExamEndpointTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_users(1, role='teacher')[0]
+        cls.student = make_users(1)[0]
+        cls.quiz = make_quiz(cls.teacher, questions=2, choices=3)
+        cls.etag = build_snapshot(cls.quiz).etag
+
+    def setUp(self):
+        cache.clear()
+
+    def exam(self, user=None, quiz_id=None, **headers):
+        url = f'/api/quiz/{quiz_id or self.quiz.pk}/exam/'
+        return self.client.get(url, **auth(user or self.student), **headers)
+
+    def test_identity_response(self):
+        response = self.exam()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], f'"{self.etag}"')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+        package = json.loads(response.content)
+        self.assertEqual(package['id'], str(self.quiz.pk))
+        self.assertEqual([len(question['choices']) for question in package['questions']], [3, 3])
+
+    def test_gzip_response_has_its_own_etag(self):
+        response = self.exam(HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['ETag'], f'"{self.etag}-gzip"')
+        self.assertEqual(json.loads(gzip.decompress(response.content)), json.loads(self.exam().content))
+
+    def test_either_etag_revalidates(self):
+        for encoding in ('', 'gzip'):
+            for etag in (f'"{self.etag}"', f'"{self.etag}-gzip"', f'"other", "{self.etag}"'):
+                with self.subTest(encoding=encoding, etag=etag):
+                    response = self.exam(HTTP_ACCEPT_ENCODING=encoding, HTTP_IF_NONE_MATCH=etag)
+                    self.assertEqual(response.status_code, 304)
+                    self.assertEqual(response.content, b'')
+                    self.assertEqual(response['ETag'], f'"{self.etag}-gzip"' if encoding else f'"{self.etag}"')
+        self.assertEqual(self.exam(HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_correct_answers_are_hidden(self):
+        raw = self.exam().content.decode()
+        self.assertNotIn('isCorrect', raw)
+        self.assertNotIn('is_correct', raw)
+        for question in json.loads(raw)['questions']:
+            for choice in question['choices']:
+                self.assertEqual(set(choice), {'id', 'choiceText', 'order'})
+
+    def test_students_are_refused_outside_the_window(self):
+        quiz = make_quiz(self.teacher, questions=1, scheduled_start=timezone.now() + timedelta(hours=1))
+        build_snapshot(quiz)
+        self.assertEqual(self.exam(quiz_id=quiz.pk).status_code, 403)
+        # Teachers may preview it
+        self.assertEqual(self.exam(self.teacher, quiz_id=quiz.pk).status_code, 200)
+
+    def test_unknown_and_unpublished_quizzes(self):
+        draft = make_quiz(self.teacher, questions=1, is_published=False)
+        for quiz_id in (draft.pk, '00000000-0000-0000-0000-000000000000', 'not-a-uuid'):
+            self.assertEqual(self.exam(quiz_id=quiz_id).status_code, 404)
@@ -0,0 +1,115 @@
+# quiz_api/tracing.py
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+
+class Trace:
+    """Timings for one sampled GraphQL operation"""
+
+    def __init__(self, operation_name):
+        self.operation_name = operation_name or 'anonymous'
+        self.started_at = timezone.now()
+        self.duration = 0.0
+        self.sql_count = 0
+        self.sql_time = 0.0
+        # "allQuizzes.questions.choices" -> [calls, seconds]
+        self.resolvers = {}
+        self._start = time.perf_counter()
+
+    def sql(self, execute, sql, params, many, context):
+        """``connection.execute_wrapper`` hook counting and timing every query"""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_count += 1
+            self.sql_time += time.perf_counter() - start
+
+    def add_resolver(self, path, seconds):
+        timing = self.resolvers.setdefault(path, [0, 0.0])
+        timing[0] += 1
+        timing[1] += seconds
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._start
+
+    def slowest_resolvers(self, limit=10):
+        ranked = sorted(self.resolvers.items(), key=lambda item: item[1][1], reverse=True)
+        return [
+            {'path': path, 'calls': calls, 'total_ms': seconds * 1000}
+            for path, (calls, seconds) in ranked[:limit]
+        ]
+
+
+class TraceBuffer:
+    """Fixed-size in-process ring buffer of finished traces"""
+
+    def __init__(self, maxlen):
+        self._traces = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def record(self, trace):
+        with self._lock:
+            self._traces.append(trace)
+
+    def clear(self):
+        with self._lock:
+            self._traces.clear()
+
+    def slowest(self, limit=10, operation_name=None):
+        with self._lock:
+            traces = list(self._traces)
+        if operation_name:
+            traces = [trace for trace in traces if trace.operation_name == operation_name]
+        return sorted(traces, key=lambda trace: trace.duration, reverse=True)[:limit]
+
+
+trace_buffer = TraceBuffer(getattr(settings, 'GRAPHQL_TRACE_BUFFER_SIZE', 500))
+
+
+def start_trace(operation_name):
+    """A new Trace for this operation, or None when it is not sampled"""
+    rate = getattr(settings, 'GRAPHQL_TRACE_SAMPLE_RATE', 0)
+    if rate <= 0 or random.random() >= rate:
+        return None
+    return Trace(operation_name)
+
+
+@contextmanager
+def record_trace(trace):
+    """Time SQL for the enclosed execution and store ``trace`` when it ends"""
+    if trace is None:
+        yield
+        return
+    try:
+        with connection.execute_wrapper(trace.sql):
+            yield
+    finally:
+        trace.finish()
+        trace_buffer.record(trace)
+
+
+class TracingMiddleware:
+    """
+    Graphene middleware timing each resolver of sampled operations. List
+    indexes are dropped from the path, so the timings of every item in a
+    list add up under one entry.
+    """
+
+    def resolve(self, next, root, info, **kwargs):
+        trace = getattr(info.context, 'trace', None)
+        if trace is None:
+            return next(root, info, **kwargs)
+        start = time.perf_counter()
+        try:
+            return next(root, info, **kwargs)
+        finally:
+            path = '.'.join(key for key in info.path.as_list() if isinstance(key, str))
+            trace.add_resolver(path, time.perf_counter() - start)
@@ -1,8 +1,18 @@
-from django.http import JsonResponse
+import gzip
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.http import HttpResponse, JsonResponse, HttpResponseNotAllowed, HttpResponseNotModified
+from django.http.response import HttpResponseBadRequest
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
-from graphene_django.views import GraphQLView
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.settings import graphene_settings
+from graphene_django.views import GraphQLView, HttpError
+from graphql import ExecutionResult, OperationType, execute_sync, get_operation_ast
 from django.contrib.auth.models import AnonymousUser
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
@@ -10,6 +20,17 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from .models import User, Subject, Quiz, Question
 from .serializers import UserSerializer, SubjectSerializer, QuizSerializer, QuestionSerializer
+from .loaders import Loaders
+from .documents import (
+    parse_and_validate, is_introspection, introspection_key, introspection_cache,
+)
+from .persisted import resolve_query, register_validated, PersistedQueryError
+from .complexity import check_operation, QueryCostError
+from .tracing import start_trace, record_trace
+from .snapshots import get_snapshot
+from .authentication import authenticate_request
+from .logs import operation_name_var
+from .executors import orm_executor
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,22 +42,20 @@ class CustomGraphQLView(GraphQLView):
     """
     
     def dispatch(self, request, *args, **kwargs):
-        # Authenticate the request using JWT
-        auth = JWTAuthentication()
-        try:
-            user_auth_tuple = auth.authenticate(request)
-            if user_auth_tuple is not None:
-                user, validated_token = user_auth_tuple
-                request.user = user
-                logger.info(f"GraphQL: User authenticated: {user.email} (role: {user.role})")
-            else:
-                request.user = AnonymousUser()
-                logger.info("GraphQL: No authentication - anonymous user")
-        except Exception as e:
-            logger.error(f"GraphQL: Authentication failed: {str(e)}")
-            request.user = AnonymousUser()
+        # JWTAuthenticationMiddleware already decoded the token; this reuses its result
+        user_auth_tuple = authenticate_request(request)
+        request.user = user_auth_tuple[0] if user_auth_tuple is not None else AnonymousUser()
+        
+        response = super().dispatch(request, *args, **kwargs)
         
-        return super().dispatch(request, *args, **kwargs)
+        # Hash-only GET requests have a stable URL, so let HTTP caches keep them
+        max_age = getattr(settings, 'GRAPHQL_PERSISTED_GET_MAX_AGE', 0)
+        if getattr(request, 'persisted_query_hash', None) and request.method == 'GET' \
+                and response.status_code == 200 and max_age:
+            visibility = 'private' if request.user.is_authenticated else 'public'
+            patch_cache_control(response, max_age=max_age, **{visibility: True})
+            patch_vary_headers(response, ['Authorization'])
+        return response
     
     def get_context(self, request):
         """
@@ -45,8 +64,130 @@ class CustomGraphQLView(GraphQLView):
         context = super().get_context(request)
         # Make sure the user is available in the context
         context.user = getattr(request, 'user', AnonymousUser())
-        logger.info(f"GraphQL Context: User is {context.user} (authenticated: {context.user.is_authenticated})")
+        # Fresh batching loaders per request so nested fields share one query per level
+        context.loaders = Loaders()
         return context
+    
+    def execute_graphql_request(self, request, data, query, variables, operation_name, show_graphiql=False):
+        """
+        Same flow as GraphQLView, but persisted query hashes are resolved
+        first (new ones are registered only once the document is valid),
+        parsed/validated documents come from an LRU cache,
+        operations over the caller's depth/cost budget are rejected before
+        they run and introspection results are reused across requests.
+        """
+        request.query_cost = None
+        extensions = request.GET.get("extensions") or data.get("extensions")
+        try:
+            query, request.persisted_query_hash, unregistered = resolve_query(query, extensions)
+        except PersistedQueryError as e:
+            return ExecutionResult(errors=[e])
+        
+        if not query:
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseBadRequest("Must provide query string."))
+        
+        document, errors = parse_and_validate(self.schema.graphql_schema, query)
+        if errors:
+            return ExecutionResult(data=None, errors=errors)
+        
+        operation_ast = get_operation_ast(document, operation_name)
+        operation_name = operation_name or (operation_ast.name.value if operation_ast and operation_ast.name else None)
+        # Tags every log record of this request (see quiz_api.logs)
+        operation_name_var.set(operation_name)
+        request.operation_name = operation_name
+        if request.method.lower() == "get" and operation_ast and operation_ast.operation != OperationType.QUERY:
+            if show_graphiql:
+                return None
+            raise HttpError(
+                HttpResponseNotAllowed(
+                    ["POST"],
+                    "Can only perform a {} operation from a POST request.".format(operation_ast.operation.value),
+                )
+            )
+        
+        if operation_ast is not None:
+            try:
+                request.query_cost = check_operation(
+                    self.schema.graphql_schema, document, operation_ast, variables, request.user)
+            except QueryCostError as e:
+                request.query_cost = e.extensions['cost']
+                return ExecutionResult(errors=[e])
+        
+        # Only documents that parsed, validated and fit the budget are stored
+        if unregistered:
+            register_validated(query, request.persisted_query_hash, operation_name,
+                               request.user, request.META.get('REMOTE_ADDR', ''))
+        
+        cache_key = None
+        if is_introspection(operation_ast):
+            cache_key = introspection_key(query, operation_name, variables)
+            cached = introspection_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        try:
+            context = self.get_context(request)
+            # Sampled operations record resolver and SQL timings (see quiz_api.tracing)
+            context.trace = start_trace(operation_name)
+            options = {
+                "root_value": self.get_root_value(request),
+                "variable_values": variables,
+                "operation_name": operation_name,
+                "context_value": context,
+                "middleware": self.get_middleware(request),
+            }
+            if self.execution_context_class:
+                options["execution_context_class"] = self.execution_context_class
+            
+            with record_trace(context.trace):
+                if (
+                    operation_ast
+                    and operation_ast.operation == OperationType.MUTATION
+                    and (
+                        graphene_settings.ATOMIC_MUTATIONS is True
+                        or connection.settings_dict.get("ATOMIC_MUTATIONS", False) is True
+                    )
+                ):
+                    with transaction.atomic():
+                        result = execute_sync(self.schema.graphql_schema, document, **options)
+                        if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                            transaction.set_rollback(True)
+                    return result
+                
+                result = execute_sync(self.schema.graphql_schema, document, **options)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+        
+        if cache_key is not None and not result.errors:
+            introspection_cache.set(cache_key, result)
+        return result
+    
+    def json_encode(self, request, d, pretty=False):
+        """Report the analyzed query cost under ``extensions`` so limits can be tuned"""
+        cost = getattr(request, 'query_cost', None)
+        if cost is not None and isinstance(d, dict):
+            d = {**d, 'extensions': {'cost': cost}}
+        return super().json_encode(request, d, pretty)
+
+
+class AsyncGraphQLView(CustomGraphQLView):
+    """
+    CustomGraphQLView for ASGI deployments (GRAPHQL_ASYNC). Parsing,
+    execution and the ORM work of resolvers run on the bounded ORM pool
+    (quiz_api.executors) while the event loop holds every waiting request,
+    so in-flight requests are not limited by threads; password hashing and
+    token signing move on to the CPU pool through cpu_bound().
+    """
+    # GraphQLView has no get()/post() handlers for View to inspect
+    view_is_async = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        response = await orm_executor.run(super().dispatch, request, *args, **kwargs)
+        # The pool thread ran in a copy of this context; report the operation in the access log
+        operation_name_var.set(getattr(request, 'operation_name', None))
+        return response
 
 # REST API ViewSets (for backward compatibility)
 class AuthViewSet(viewsets.ViewSet):
@@ -70,6 +211,37 @@ class QuizViewSet(viewsets.ModelViewSet):
     queryset = Quiz.objects.all()
     serializer_class = QuizSerializer
     permission_classes = [IsAuthenticated]
+    
+    @action(detail=True, methods=['get'])
+    def exam(self, request, pk=None):
+        """
+        Exam package of a published quiz (settings plus ordered questions and
+        choices, without correct answers), served from its precompiled gzip
+        snapshot. Each encoding has its own strong ETag, the gzip one with a
+        "-gzip" suffix; either revalidates. Never reads the question tables.
+        """
+        try:
+            snapshot = get_snapshot(pk)
+        except ValidationError:
+            snapshot = None
+        if snapshot is None:
+            return Response({'detail': 'Quiz not found or not published'}, status=status.HTTP_404_NOT_FOUND)
+        if request.user.role == 'student' and not snapshot.is_available_now():
+            return Response({'detail': 'Quiz is not available'}, status=status.HTTP_403_FORBIDDEN)
+
+        identity_etag, gzip_etag = f'"{snapshot.etag}"', f'"{snapshot.etag}-gzip"'
+        use_gzip = 'gzip' in request.headers.get('Accept-Encoding', '')
+        if {identity_etag, gzip_etag} & set(parse_etags(request.headers.get('If-None-Match', ''))):
+            response = HttpResponseNotModified()
+        elif use_gzip:
+            response = HttpResponse(snapshot.blob, content_type='application/json')
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(gzip.decompress(snapshot.blob), content_type='application/json')
+        response['ETag'] = gzip_etag if use_gzip else identity_etag
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Accept-Encoding', 'Authorization'])
+        return response
 
 class QuestionViewSet(viewsets.ModelViewSet):
     """Question management endpoints"""
@@ -10,7 +10,16 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 import os
 
 from django.core.asgi import get_asgi_application
+from dotenv import load_dotenv
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'quiz_backend.settings')
+# Values in .env win over the ASGI defaults below
+load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env'))
+# Serve GraphQL from the async view (see GRAPHQL_ASYNC in settings)
+os.environ.setdefault('GRAPHQL_ASYNC', '1')
+# Sync code outside the executors runs on a new thread per request, where a
+# persistent connection would be left behind; pool connections instead
+# (DB_POOL_MAX_SIZE, see settings)
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
@@ -1,15 +1,18 @@
 """
 URL configuration for quiz_backend project.
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 from django.views.decorators.csrf import csrf_exempt
 from graphene_django.views import GraphQLView
 from quiz_api.schema import schema
-from quiz_api.views import CustomGraphQLView
+from quiz_api.views import CustomGraphQLView, AsyncGraphQLView
+
+graphql_view = AsyncGraphQLView if settings.GRAPHQL_ASYNC else CustomGraphQLView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('quiz_api.urls')),
-    path('graphql/', csrf_exempt(CustomGraphQLView.as_view(schema=schema, graphiql=True))),
+    path('graphql/', csrf_exempt(graphql_view.as_view(schema=schema, graphiql=True))),
 ]
\ No newline at end of file
@@ -1019,7 +1019,7 @@ class _CreateQuestionDialogState extends State<CreateQuestionDialog> {
       _pointsController.text = widget.question!.points.toString();
       _questionType = widget.question!.questionType;
       _choices = widget.question!.choices
-          .map((c) => {'text': c.choiceText, 'isCorrect': c.isCorrect})
+          .map((c) => {'id': c.id, 'text': c.choiceText, 'isCorrect': c.isCorrect})
           .toList();
       
       // Initialize True/False answer if it's a true_false question